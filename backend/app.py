@@ -2,7 +2,10 @@
 SkillPilot AI - Flask Backend Application
 Production-ready REST API for learning management with AI integration
 """
-from flask import Flask, jsonify
+import hmac
+import os
+
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
@@ -17,6 +20,11 @@ from routes_analytics import analytics_bp
 from routes_ai import ai_bp
 from routes_lessons import lessons_bp
 from services.ai_service import AIService
+from services.ai_cache import ai_cache
+from services.ai_metrics import ai_metrics
+from services.topic_cache import topic_cache
+from services.rate_limiter import rate_limiter, RateLimitExceeded
+from commands import register_commands
 
 
 def create_app(config_name='default'):
@@ -31,6 +39,8 @@ def create_app(config_name='default'):
     db.init_app(app)
     migrate = Migrate(app, db)
     jwt = JWTManager(app)
+    AIService.init_app(app)
+    rate_limiter.init_app(app)
     
     # Configure CORS - Allow all origins for development
     CORS(app, 
@@ -77,6 +87,13 @@ def create_app(config_name='default'):
             'message': 'Please login again'
         }), 401
     
+    # AI quota exhausted (raised by services.rate_limiter)
+    @app.errorhandler(RateLimitExceeded)
+    def rate_limit_exceeded(error):
+        response = jsonify(error.to_dict())
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response, 429
+    
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(goals_bp)
@@ -85,6 +102,9 @@ def create_app(config_name='default'):
     app.register_blueprint(ai_bp)
     app.register_blueprint(lessons_bp)
     
+    # CLI commands (job worker, maintenance)
+    register_commands(app)
+    
     # Root route
     @app.route('/')
     def index():
@@ -119,7 +139,31 @@ def create_app(config_name='default'):
     # Health check
     @app.route('/health')
     def health():
-        return jsonify({'status': 'healthy'}), 200
+        # Always 200: a degraded AI provider is served with fallbacks, not an outage
+        ai_health = AIService.get_health()
+        return jsonify({
+            'status': 'degraded' if ai_health['degraded'] else 'healthy',
+            'ai': ai_health
+        }), 200
+    
+    # Internal AI metrics (counters are per worker process, see "pid")
+    @app.route('/internal/metrics')
+    def internal_metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if token:
+            if not hmac.compare_digest(request.headers.get('X-Metrics-Token', ''), token):
+                return jsonify({'error': 'Not found'}), 404
+        elif request.remote_addr not in ('127.0.0.1', '::1'):
+            # Without a token, only reachable from the host itself
+            return jsonify({'error': 'Not found'}), 404
+        
+        return jsonify({
+            'pid': os.getpid(),
+            'ai': ai_metrics.snapshot(),
+            'response_cache': ai_cache.get_stats(),
+            'topic_cache': topic_cache.get_stats(),
+            'circuit_breakers': AIService.get_health()['models']
+        }), 200
     
     # Create tables
     with app.app_context():
@@ -0,0 +1,186 @@
+"""
+Flask CLI Commands for SkillPilot AI
+Background workers and maintenance tasks (run with `flask --app app <command>`)
+"""
+import json
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from models import db, Goal, Progress, DailyCompletionStat
+from services.ai_service import AIService
+from services.fake_groq import LatencyModel, create_fake_groq_app
+from services.goal_analytics import GoalAnalytics, NUMPY_AVAILABLE
+from services.job_queue import JobQueue
+from services.pregeneration import PregenerationService
+
+jobs_cli = AppGroup('jobs', help='Background job queue')
+progress_cli = AppGroup('progress', help='Denormalized progress counters')
+analytics_cli = AppGroup('analytics', help='Analytics rollups')
+
+
+@jobs_cli.command('worker')
+@click.option('--concurrency', default=2, show_default=True, help='Max jobs run at once by this worker')
+@click.option('--kind', 'kinds', multiple=True, help='Only run these job kinds (repeatable)')
+@click.option('--once', is_flag=True, help='Exit once no runnable jobs are left')
+def jobs_worker(concurrency, kinds, once):
+    """Run a job worker process"""
+    app = current_app._get_current_object()
+    if app.config.get('AI_WARMUP', True):
+        AIService.warm_up()
+    JobQueue.run_worker(app, concurrency=concurrency, kinds=list(kinds) or None, once=once)
+
+
+@click.command('pregenerate')
+@click.option('--goal-id', 'goal_ids', type=int, multiple=True, help='Goal to pre-generate (repeatable)')
+@click.option('--all', 'all_goals', is_flag=True, help='Every goal with an AI roadmap that is still missing content')
+@click.option('--inline', is_flag=True, help='Generate in this process instead of queueing jobs')
+def pregenerate(goal_ids, all_goals, inline):
+    """Pre-generate lessons and quizzes for goals"""
+    if all_goals:
+        goal_ids = [goal_id for (goal_id,) in db.session.query(Goal.id).filter_by(roadmap_generated=True).order_by(Goal.id)]
+    if not goal_ids:
+        raise click.UsageError('Pass --goal-id or --all')
+    
+    for goal_id in goal_ids:
+        if not PregenerationService.missing_content(goal_id):
+            continue
+        
+        if inline:
+            stats = PregenerationService.pregenerate_goal(goal_id)
+            click.echo(f"Goal {goal_id}: {stats}")
+        else:
+            goal = Goal.query.get(goal_id)
+            if goal:
+                job = PregenerationService.enqueue(goal.id, user_id=goal.user_id)
+                db.session.commit()
+                click.echo(f"Goal {goal_id}: queued job {job.id}")
+
+
+@progress_cli.command('repair')
+@click.option('--goal-id', 'goal_ids', type=int, multiple=True, help='Goal to repair (repeatable; default all)')
+@click.option('--check', is_flag=True, help='Only report goals whose stored progress is off')
+def progress_repair(goal_ids, check):
+    """Recompute progress counters and streaks from the tasks"""
+    fields = ('completed_count', 'total_count', 'streak_length', 'longest_streak', 'last_completion_date',
+              'activity_bits', 'task_bits')
+    query = db.session.query(Goal.id).order_by(Goal.id)
+    if goal_ids:
+        query = query.filter(Goal.id.in_(goal_ids))
+    
+    mismatched = 0
+    for (goal_id,) in query.all():
+        progress = Progress.query.filter_by(goal_id=goal_id).first()
+        if progress is None:
+            progress = Progress(goal_id=goal_id)
+            db.session.add(progress)
+        
+        stored = {field: getattr(progress, field) for field in fields}
+        progress.recompute()
+        diff = {field: (stored[field], getattr(progress, field)) for field in fields if stored[field] != getattr(progress, field)}
+        
+        if diff:
+            mismatched += 1
+            click.echo(f"Goal {goal_id}: " + ', '.join(f"{field} {old} -> {new}" for field, (old, new) in diff.items()))
+        
+        if check:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    
+    click.echo(f"{mismatched} goal(s) {'out of sync' if check else 'repaired'}")
+
+
+@analytics_cli.command('backfill')
+@click.option('--goal-id', 'goal_ids', type=int, multiple=True, help='Goal to backfill (repeatable; default all)')
+def analytics_backfill(goal_ids):
+    """Rebuild the daily_completion_stats rollup from completed tasks"""
+    query = db.session.query(Goal.id).order_by(Goal.id)
+    if goal_ids:
+        query = query.filter(Goal.id.in_(goal_ids))
+    
+    goals = days = 0
+    for (goal_id,) in query.all():
+        days += DailyCompletionStat.rebuild(goal_id)
+        db.session.commit()
+        goals += 1
+    
+    click.echo(f"Rebuilt {days} day(s) for {goals} goal(s)")
+
+
+@analytics_cli.command('report')
+@click.option('--goal-id', 'goal_ids', type=int, multiple=True, help='Goal to report (repeatable; default all)')
+@click.option('--batch-size', default=500, show_default=True, help='Goals loaded per query')
+@click.option('--json', 'as_json', is_flag=True, help='One JSON object per goal instead of a summary line')
+def analytics_report(goal_ids, batch_size, as_json):
+    """Pace, velocity and projected finish of many goals (vectorized, needs numpy)"""
+    if not NUMPY_AVAILABLE:
+        raise click.ClickException('numpy is required for analytics reports')
+    
+    query = db.session.query(Goal.id).order_by(Goal.id)
+    if goal_ids:
+        query = query.filter(Goal.id.in_(goal_ids))
+    ids = [goal_id for (goal_id,) in query.all()]
+    
+    behind = 0
+    for start in range(0, len(ids), max(batch_size, 1)):
+        for goal_id, report in GoalAnalytics.compute(ids[start:start + batch_size]).items():
+            behind += report['pace']['status'] == 'behind'
+            if as_json:
+                click.echo(json.dumps({'goal_id': goal_id, **report}))
+            else:
+                tasks = report['tasks']
+                click.echo(
+                    f"Goal {goal_id}: {tasks['completed']}/{tasks['total']} done, {report['pace']['status']}, "
+                    f"{report['velocity']['last_7_days']}/day, finish {report['projected_completion_date'] or '-'}"
+                )
+    
+    click.echo(f"{len(ids)} goal(s), {behind} behind pace", err=as_json)
+
+
+@click.command('fake-groq')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=8090, show_default=True)
+@click.option('--mode', type=click.Choice(['synthetic', 'record', 'replay']), default='synthetic', show_default=True,
+              help='Generate responses, record real ones through --upstream, or replay the cassette')
+@click.option('--cassette', type=click.Path(dir_okay=False), help='JSON-lines cassette file (record/replay)')
+@click.option('--upstream', default='https://api.groq.com', show_default=True, help='Real API used when recording')
+@click.option('--latency-ms', type=float, help='Median response latency [default: 400, or recorded when replaying]')
+@click.option('--latency-sigma', default=0.5, show_default=True, help='Log-normal spread of latency (0 = fixed)')
+@click.option('--error-rate', default=0.0, show_default=True, help='Fraction of requests answered with a 500')
+@click.option('--rate-limit-rate', default=0.0, show_default=True, help='Fraction of requests answered with a 429')
+@click.option('--hang-rate', default=0.0, show_default=True, help='Fraction of requests held for --hang-seconds')
+@click.option('--hang-seconds', default=60.0, show_default=True)
+@click.option('--seed', type=int, help='Seed latency and error injection for repeatable runs')
+def fake_groq(host, port, mode, cassette, upstream, latency_ms, latency_sigma, error_rate,
+              rate_limit_rate, hang_rate, hang_seconds, seed):
+    """Run a local Groq-compatible server for load and latency tests"""
+    from werkzeug.serving import run_simple
+    
+    latency = None
+    if latency_ms is not None or mode != 'replay':
+        latency = LatencyModel(latency_ms if latency_ms is not None else 400, latency_sigma, seed)
+    
+    server = create_fake_groq_app(
+        mode=mode,
+        cassette_path=cassette,
+        upstream=upstream,
+        latency=latency,
+        error_rate=error_rate,
+        rate_limit_rate=rate_limit_rate,
+        hang_rate=hang_rate,
+        hang_seconds=hang_seconds,
+        seed=seed
+    )
+    click.echo(f"Fake Groq ({mode}) on http://{host}:{port} - set GROQ_BASE_URL to this address")
+    run_simple(host, port, server, threaded=True)
+
+
+def register_commands(app):
+    """Attach CLI command groups to the app"""
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(progress_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(pregenerate)
+    app.cli.add_command(fake_groq)
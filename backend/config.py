@@ -3,7 +3,7 @@ Flask Configuration for SkillPilot AI Backend
 """
 import os
 from datetime import timedelta
-from decouple import config
+from decouple import config, Csv
 
 class Config:
     """Base configuration"""
@@ -30,6 +30,134 @@ class Config:
         'CORS_ORIGINS',
         default='http://localhost:5173,http://localhost:5174,http://localhost:5175,http://localhost:5176,http://localhost:5177'
     ).split(',')
+    
+    # Chat context: rolling summary + recent messages within a token budget;
+    # the summary absorbs older messages every N turns. Opt-in: the summary
+    # jobs only run with a `flask jobs worker`
+    CHAT_SUMMARY_ENABLED = config('CHAT_SUMMARY_ENABLED', default=False, cast=bool)
+    CHAT_CONTEXT_TOKEN_BUDGET = config('CHAT_CONTEXT_TOKEN_BUDGET', default=1500, cast=int)
+    CHAT_CONTEXT_MAX_MESSAGES = config('CHAT_CONTEXT_MAX_MESSAGES', default=20, cast=int)
+    CHAT_SUMMARY_EVERY_TURNS = config('CHAT_SUMMARY_EVERY_TURNS', default=4, cast=int)
+    CHAT_SUMMARY_KEEP_RECENT = config('CHAT_SUMMARY_KEEP_RECENT', default=4, cast=int)  # messages left unsummarized
+    
+    # Groq API endpoint; point at `flask fake-groq` (e.g. http://127.0.0.1:8090) for offline load tests
+    GROQ_BASE_URL = config('GROQ_BASE_URL', default='')
+    
+    # Token for /internal/metrics (X-Metrics-Token header); empty: localhost only
+    METRICS_TOKEN = config('METRICS_TOKEN', default='')
+    
+    # AI response cache (in-process LRU in front of the database store)
+    AI_CACHE_ENABLED = config('AI_CACHE_ENABLED', default=True, cast=bool)
+    AI_CACHE_TTL = config('AI_CACHE_TTL', default=7 * 24 * 3600, cast=int)  # seconds
+    AI_CACHE_MEMORY_SIZE = config('AI_CACHE_MEMORY_SIZE', default=512, cast=int)
+    AI_CACHE_MAX_ENTRIES = config('AI_CACHE_MAX_ENTRIES', default=50000, cast=int)
+    
+    # Topic cache: answers rephrasings of a simplified concept or example topic
+    # ("What are closures?" / "closures") from the response cache; off with AI_CACHE_ENABLED
+    TOPIC_CACHE_ENABLED = config('TOPIC_CACHE_ENABLED', default=True, cast=bool)
+    
+    # Async AI calls: max in-flight Groq requests per worker process
+    AI_MAX_CONCURRENCY = config('AI_MAX_CONCURRENCY', default=8, cast=int)
+    AI_MAX_RETRIES = config('AI_MAX_RETRIES', default=1, cast=int)
+    # Groq HTTP connection pool per worker process; size it to the worker's threads
+    AI_HTTP_MAX_CONNECTIONS = config('AI_HTTP_MAX_CONNECTIONS', default=20, cast=int)
+    AI_HTTP_MAX_KEEPALIVE = config('AI_HTTP_MAX_KEEPALIVE', default=10, cast=int)
+    AI_HTTP_KEEPALIVE_EXPIRY = config('AI_HTTP_KEEPALIVE_EXPIRY', default=60.0, cast=float)  # seconds idle
+    # Open Groq connections when a gunicorn worker or job worker starts
+    AI_WARMUP = config('AI_WARMUP', default=True, cast=bool)
+    
+    # Model routing per AI request kind: models in preference order (the primary first,
+    # then faster fallbacks tried when it fails or misses its deadline) and a latency SLO
+    # in seconds for the whole call. A primary whose observed p95 exceeds the SLO is
+    # passed over, and responses from fallback models are not cached.
+    AI_MODEL_ROUTES = {
+        'roadmap': {
+            'models': config('AI_MODELS_ROADMAP', default='llama-3.3-70b-versatile,llama-3.1-8b-instant', cast=Csv()),
+            'slo': config('AI_SLO_ROADMAP', default=45.0, cast=float)
+        },
+        'chat': {
+            'models': config('AI_MODELS_CHAT', default='llama-3.1-8b-instant', cast=Csv()),
+            'slo': config('AI_SLO_CHAT', default=15.0, cast=float)
+        },
+        'summary': {
+            'models': config('AI_MODELS_SUMMARY', default='llama-3.1-8b-instant', cast=Csv()),
+            'slo': config('AI_SLO_SUMMARY', default=30.0, cast=float)
+        },
+        'simplify': {
+            'models': config('AI_MODELS_SIMPLIFY', default='llama-3.1-8b-instant', cast=Csv()),
+            'slo': config('AI_SLO_SIMPLIFY', default=15.0, cast=float)
+        },
+        'example': {
+            'models': config('AI_MODELS_EXAMPLE', default='llama-3.1-8b-instant', cast=Csv()),
+            'slo': config('AI_SLO_EXAMPLE', default=20.0, cast=float)
+        },
+        'lesson': {
+            'models': config('AI_MODELS_LESSON', default='llama-3.1-8b-instant', cast=Csv()),
+            'slo': config('AI_SLO_LESSON', default=20.0, cast=float)
+        },
+        'quiz': {
+            'models': config('AI_MODELS_QUIZ', default='llama-3.1-8b-instant', cast=Csv()),
+            'slo': config('AI_SLO_QUIZ', default=20.0, cast=float)
+        }
+    }
+    # Largest request (prompt + max_tokens) a model accepts; Groq rejects requests above
+    # the model's tokens-per-minute limit, so larger prompts are routed past it
+    AI_MODEL_MAX_REQUEST_TOKENS = {
+        'llama-3.3-70b-versatile': config('AI_MAX_REQUEST_TOKENS_70B', default=12000, cast=int),
+        'llama-3.1-8b-instant': config('AI_MAX_REQUEST_TOKENS_8B', default=6000, cast=int)
+    }
+    
+    # Circuit breaker per model: open after N consecutive upstream failures, probe again after the reset timeout
+    AI_BREAKER_FAILURE_THRESHOLD = config('AI_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+    AI_BREAKER_RESET_TIMEOUT = config('AI_BREAKER_RESET_TIMEOUT', default=30, cast=int)  # seconds
+    # Request timeout = p95 latency x multiplier, clamped (default until enough calls were seen)
+    AI_TIMEOUT_P95_MULTIPLIER = config('AI_TIMEOUT_P95_MULTIPLIER', default=2.0, cast=float)
+    AI_TIMEOUT_MIN = config('AI_TIMEOUT_MIN', default=5.0, cast=float)
+    AI_TIMEOUT_MAX = config('AI_TIMEOUT_MAX', default=60.0, cast=float)
+    AI_TIMEOUT_DEFAULT = config('AI_TIMEOUT_DEFAULT', default=30.0, cast=float)
+    
+    # AI rate limiting: token buckets sized in LLM tokens (each call costs its max_tokens)
+    AI_RATE_LIMIT_ENABLED = config('AI_RATE_LIMIT_ENABLED', default=True, cast=bool)
+    AI_RATE_LIMIT_STORAGE = config('AI_RATE_LIMIT_STORAGE', default='database')  # 'database' (shared) or 'memory'
+    AI_RATE_LIMIT_USER_CAPACITY = config('AI_RATE_LIMIT_USER_CAPACITY', default=5000, cast=int)
+    AI_RATE_LIMIT_USER_PER_MINUTE = config('AI_RATE_LIMIT_USER_PER_MINUTE', default=2000, cast=int)
+    AI_RATE_LIMIT_GLOBAL_CAPACITY = config('AI_RATE_LIMIT_GLOBAL_CAPACITY', default=100000, cast=int)
+    AI_RATE_LIMIT_GLOBAL_PER_MINUTE = config('AI_RATE_LIMIT_GLOBAL_PER_MINUTE', default=50000, cast=int)
+    
+    # Single-flight generation: lease lifetime and how long followers wait (seconds)
+    GENERATION_LEASE_TTL = config('GENERATION_LEASE_TTL', default=120, cast=int)
+    GENERATION_WAIT_TIMEOUT = config('GENERATION_WAIT_TIMEOUT', default=90, cast=int)
+    
+    # Background jobs (`flask jobs worker`). Async roadmaps need a running worker, so
+    # they are opt-in; without an AI client the roadmap is always built inline
+    ROADMAP_ASYNC_GENERATION = config('ROADMAP_ASYNC_GENERATION', default=False, cast=bool)
+    JOB_VISIBILITY_TIMEOUT = config('JOB_VISIBILITY_TIMEOUT', default=300, cast=int)  # seconds
+    JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=3, cast=int)
+    JOB_RETRY_BACKOFF = config('JOB_RETRY_BACKOFF', default=15, cast=int)  # seconds, doubled per attempt
+    JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=1.0, cast=float)
+    # Max jobs of a kind running at once across all workers
+    JOB_CONCURRENCY_LIMITS = {
+        'generate_roadmap': config('JOB_LIMIT_GENERATE_ROADMAP', default=4, cast=int),
+        'pregenerate_goal': config('JOB_LIMIT_PREGENERATE_GOAL', default=2, cast=int),
+        'summarize_conversation': config('JOB_LIMIT_SUMMARIZE_CONVERSATION', default=4, cast=int),
+        'prefetch_tasks': config('JOB_LIMIT_PREFETCH_TASKS', default=2, cast=int)
+    }
+    
+    # Lesson/quiz pre-generation: queue it once a goal's AI roadmap exists, and
+    # how many tasks are generated (in parallel) and written per transaction
+    PREGENERATE_AFTER_ROADMAP = config('PREGENERATE_AFTER_ROADMAP', default=False, cast=bool)
+    PREGENERATION_BATCH_SIZE = config('PREGENERATION_BATCH_SIZE', default=5, cast=int)
+    
+    # Questions generated per quiz bank (per topic and level); each task's quiz samples 5 of them
+    QUIZ_BANK_SIZE = config('QUIZ_BANK_SIZE', default=10, cast=int)
+    
+    # Speculative prefetch: when a task is completed or its lesson viewed, generate the
+    # next PREFETCH_AHEAD tasks' lessons and quizzes in the background, while the global
+    # AI bucket has more than PREFETCH_GLOBAL_RESERVE (fraction) left for user requests.
+    # Opt-in: the prefetch jobs only run with a `flask jobs worker`
+    PREFETCH_ENABLED = config('PREFETCH_ENABLED', default=False, cast=bool)
+    PREFETCH_AHEAD = config('PREFETCH_AHEAD', default=2, cast=int)
+    PREFETCH_GLOBAL_RESERVE = config('PREFETCH_GLOBAL_RESERVE', default=0.5, cast=float)
 
 
 class DevelopmentConfig(Config):
@@ -42,8 +170,18 @@ class ProductionConfig(Config):
     DEBUG = False
 
 
+class TestingConfig(Config):
+    """Test configuration (pytest sets FLASK_ENV=testing and a scratch DATABASE_URL)"""
+    TESTING = True
+    AI_WARMUP = False
+    AI_RATE_LIMIT_STORAGE = 'memory'
+    PREFETCH_ENABLED = False
+    ROADMAP_ASYNC_GENERATION = False
+
+
 config_dict = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
@@ -0,0 +1,37 @@
+"""
+Gunicorn configuration for SkillPilot AI
+Run with `gunicorn -c gunicorn.conf.py app:app`
+"""
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '2'))
+
+# Threads share each worker's Groq connection pool (AI_HTTP_MAX_CONNECTIONS)
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+
+# AI calls and SSE streams can run for a while
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+keepalive = 5
+
+# Import the app once in the master; workers fork from it
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Give each worker its own database pool and Groq clients, and warm them up before it takes requests"""
+    from app import app
+    from models import db
+    from services.ai_service import AIService
+    
+    # The master built the engine (create_all) before forking: drop the inherited pooled
+    # connections without closing them, since they are the master's sockets
+    with app.app_context():
+        db.engine.dispose(close=False)
+    
+    AIService.reset_client()
+    if app.config.get('AI_WARMUP', True):
+        with app.app_context():
+            AIService.warm_up()
@@ -0,0 +1,53 @@
+"""Shared lesson library: lesson_contents.lesson_key, nullable task_id, tasks.lesson_id
+
+Revision ID: 0b05b76dec8a
+Revises: 0f48131321e8
+Create Date: 2026-10-17 09:20:00.000000
+
+Existing lessons keep their task_id and are served as that task's own lesson.
+On SQLite, batch mode rebuilds lesson_contents to drop the NOT NULL on task_id.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b05b76dec8a'
+down_revision = '0f48131321e8'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {col['name']: col for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    lesson_columns = _columns('lesson_contents')
+    if 'lesson_key' not in lesson_columns or not lesson_columns['task_id']['nullable']:
+        with op.batch_alter_table('lesson_contents') as batch_op:
+            batch_op.alter_column('task_id', existing_type=sa.Integer(), nullable=True)
+            if 'lesson_key' not in lesson_columns:
+                batch_op.add_column(sa.Column('lesson_key', sa.String(length=64), nullable=True))
+                batch_op.create_unique_constraint('uq_lesson_contents_lesson_key', ['lesson_key'])
+
+    if 'lesson_id' not in _columns('tasks'):
+        with op.batch_alter_table('tasks') as batch_op:
+            batch_op.add_column(sa.Column('lesson_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_tasks_lesson_id', 'lesson_contents', ['lesson_id'], ['id'])
+            batch_op.create_index('ix_tasks_lesson_id', ['lesson_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_index('ix_tasks_lesson_id')
+        batch_op.drop_constraint('fk_tasks_lesson_id', type_='foreignkey')
+        batch_op.drop_column('lesson_id')
+
+    # Library lessons have no task and cannot survive the NOT NULL
+    op.execute(sa.text('DELETE FROM learning_resources WHERE lesson_id IN (SELECT id FROM lesson_contents WHERE task_id IS NULL)'))
+    op.execute(sa.text('DELETE FROM lesson_contents WHERE task_id IS NULL'))
+    with op.batch_alter_table('lesson_contents') as batch_op:
+        batch_op.drop_constraint('uq_lesson_contents_lesson_key', type_='unique')
+        batch_op.drop_column('lesson_key')
+        batch_op.alter_column('task_id', existing_type=sa.Integer(), nullable=False)
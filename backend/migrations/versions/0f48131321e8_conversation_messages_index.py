@@ -0,0 +1,29 @@
+"""Index conversation_messages by (user_id, created_at, id)
+
+Revision ID: 0f48131321e8
+Revises: a996eb34a426
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0f48131321e8'
+down_revision = 'a996eb34a426'
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table, name):
+    return name in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    if not _has_index('conversation_messages', 'ix_conversation_messages_user_created'):
+        op.create_index('ix_conversation_messages_user_created', 'conversation_messages', ['user_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_conversation_messages_user_created', table_name='conversation_messages')
@@ -0,0 +1,93 @@
+"""Day bitmaps: progress.activity_bits and task_bits
+
+Revision ID: 33e5efae1a05
+Revises: d123aefb5e3e
+Create Date: 2026-10-17 09:50:00.000000
+
+The bitmaps and the stored streak columns derived from them (streak, longest_streak,
+last_completion_date) are backfilled from the completed tasks, the same way
+Progress.recompute() builds them.
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+from services import bitmap
+
+
+# revision identifiers, used by Alembic.
+revision = '33e5efae1a05'
+down_revision = 'd123aefb5e3e'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table, column):
+    return column in {col['name'] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if _has_column('progress', 'activity_bits'):
+        return
+
+    op.add_column('progress', sa.Column('activity_bits', sa.LargeBinary(), nullable=True))
+    op.add_column('progress', sa.Column('task_bits', sa.LargeBinary(), nullable=True))
+
+    connection = op.get_bind()
+    goals = sa.table('goals', sa.column('id', sa.Integer), sa.column('created_at', sa.DateTime))
+    tasks = sa.table(
+        'tasks',
+        sa.column('goal_id', sa.Integer), sa.column('day_number', sa.Integer),
+        sa.column('status', sa.String), sa.column('completed_at', sa.DateTime)
+    )
+    progress = sa.table(
+        'progress',
+        sa.column('goal_id', sa.Integer), sa.column('activity_bits', sa.LargeBinary),
+        sa.column('task_bits', sa.LargeBinary), sa.column('streak', sa.Integer),
+        sa.column('longest_streak', sa.Integer), sa.column('last_completion_date', sa.Date)
+    )
+
+    starts = {goal_id: created_at.date() for goal_id, created_at in connection.execute(sa.select(goals.c.id, goals.c.created_at)) if created_at}
+    activity, days = {}, {}
+    for goal_id, day_number, completed_at in connection.execute(
+        sa.select(tasks.c.goal_id, tasks.c.day_number, tasks.c.completed_at).where(tasks.c.status == 'completed')
+    ):
+        days[goal_id] = days.get(goal_id, 0) | 1 << (day_number - 1)
+        start = starts.get(goal_id)
+        if start and completed_at and completed_at.date() >= start:
+            activity[goal_id] = activity.get(goal_id, 0) | 1 << (completed_at.date() - start).days
+
+    rows = []
+    for (goal_id,) in connection.execute(sa.select(progress.c.goal_id)):
+        bits = activity.get(goal_id, 0)
+        last = bits.bit_length() - 1
+        rows.append({
+            'target_goal_id': goal_id,
+            'activity_bits': bitmap.to_bytes(bits),
+            'task_bits': bitmap.to_bytes(days.get(goal_id, 0)),
+            'streak': bitmap.run_ending_at(bits, last) if last >= 0 else 0,
+            'longest_streak': bitmap.longest_run(bits),
+            'last_completion_date': starts[goal_id] + timedelta(days=last) if last >= 0 else None
+        })
+    if rows:
+        connection.execute(
+            progress.update().where(progress.c.goal_id == sa.bindparam('target_goal_id')).values(
+                activity_bits=sa.bindparam('activity_bits'),
+                task_bits=sa.bindparam('task_bits'),
+                streak=sa.bindparam('streak'),
+                longest_streak=sa.bindparam('longest_streak'),
+                last_completion_date=sa.bindparam('last_completion_date')
+            ),
+            rows
+        )
+
+    with op.batch_alter_table('progress') as batch_op:
+        batch_op.alter_column('activity_bits', existing_type=sa.LargeBinary(), nullable=False)
+        batch_op.alter_column('task_bits', existing_type=sa.LargeBinary(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('progress') as batch_op:
+        batch_op.drop_column('activity_bits')
+        batch_op.drop_column('task_bits')
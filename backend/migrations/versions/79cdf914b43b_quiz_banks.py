@@ -0,0 +1,48 @@
+"""Quiz banks: quizzes.bank_key, answer counters, nullable task_id
+
+Revision ID: 79cdf914b43b
+Revises: 0b05b76dec8a
+Create Date: 2026-10-17 09:30:00.000000
+
+Existing questions keep their task_id and stay that task's own quiz.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '79cdf914b43b'
+down_revision = '0b05b76dec8a'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {col['name']: col for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    columns = _columns('quizzes')
+    if 'bank_key' in columns and columns['task_id']['nullable']:
+        return
+
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.alter_column('task_id', existing_type=sa.Integer(), nullable=True)
+        if 'bank_key' not in columns:
+            batch_op.add_column(sa.Column('bank_key', sa.String(length=64), nullable=True))
+            batch_op.create_index('ix_quizzes_bank_key', ['bank_key'])
+        for name in ('attempt_count', 'correct_count'):
+            if name not in columns:
+                batch_op.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    # Bank questions have no task and cannot survive the NOT NULL
+    op.execute(sa.text('DELETE FROM quiz_attempts WHERE quiz_id IN (SELECT id FROM quizzes WHERE task_id IS NULL)'))
+    op.execute(sa.text('DELETE FROM quizzes WHERE task_id IS NULL'))
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.drop_index('ix_quizzes_bank_key')
+        batch_op.drop_column('bank_key')
+        batch_op.drop_column('attempt_count')
+        batch_op.drop_column('correct_count')
+        batch_op.alter_column('task_id', existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,71 @@
+"""Daily completion rollup: daily_completion_stats, backfilled from completed tasks
+
+Revision ID: 9c59cf148a6b
+Revises: 33e5efae1a05
+Create Date: 2026-10-17 10:00:00.000000
+
+The app creates the table on startup, so it usually exists but is still empty here.
+"""
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c59cf148a6b'
+down_revision = '33e5efae1a05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    if not sa.inspect(connection).has_table('daily_completion_stats'):
+        op.create_table(
+            'daily_completion_stats',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('goal_id', sa.Integer(), nullable=False),
+            sa.Column('date', sa.Date(), nullable=False),
+            sa.Column('completed', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['goal_id'], ['goals.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('goal_id', 'date', name='uq_daily_completion_stats_goal_date')
+        )
+
+    stats = sa.table(
+        'daily_completion_stats',
+        sa.column('goal_id', sa.Integer), sa.column('date', sa.Date),
+        sa.column('completed', sa.Integer), sa.column('updated_at', sa.DateTime)
+    )
+    if connection.execute(sa.select(sa.func.count()).select_from(stats)).scalar():
+        return
+
+    tasks = sa.table(
+        'tasks',
+        sa.column('id', sa.Integer), sa.column('goal_id', sa.Integer),
+        sa.column('status', sa.String), sa.column('completed_at', sa.DateTime)
+    )
+    day = sa.func.date(tasks.c.completed_at)
+    rows = connection.execute(
+        sa.select(tasks.c.goal_id, day, sa.func.count(tasks.c.id))
+        .where(tasks.c.status == 'completed', tasks.c.completed_at.isnot(None))
+        .group_by(tasks.c.goal_id, day)
+    ).all()
+
+    now = datetime.utcnow()
+    if rows:
+        op.bulk_insert(stats, [
+            {
+                'goal_id': goal_id,
+                'date': value if isinstance(value, date) else date.fromisoformat(str(value)[:10]),
+                'completed': count,
+                'updated_at': now
+            }
+            for goal_id, value, count in rows
+        ])
+
+
+def downgrade():
+    op.drop_table('daily_completion_stats')
@@ -0,0 +1,33 @@
+"""Add goals.generation_status for background roadmap generation
+
+Revision ID: a996eb34a426
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+Databases created by db.create_all() after this change already have the column,
+so every revision here only adds what is missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a996eb34a426'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table, column):
+    return column in {col['name'] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if not _has_column('goals', 'generation_status'):
+        # Existing goals were generated synchronously, so they are all ready
+        op.add_column('goals', sa.Column('generation_status', sa.String(length=20), nullable=True, server_default='ready'))
+
+
+def downgrade():
+    with op.batch_alter_table('goals') as batch_op:
+        batch_op.drop_column('generation_status')
@@ -0,0 +1,51 @@
+"""Denormalized progress counters: progress.completed_count and total_count
+
+Revision ID: d123aefb5e3e
+Revises: 79cdf914b43b
+Create Date: 2026-10-17 09:40:00.000000
+
+The counters are backfilled from the tasks; task toggles keep them current afterwards.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd123aefb5e3e'
+down_revision = '79cdf914b43b'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table, column):
+    return column in {col['name'] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if _has_column('progress', 'total_count'):
+        return
+
+    op.add_column('progress', sa.Column('completed_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('progress', sa.Column('total_count', sa.Integer(), nullable=False, server_default='0'))
+
+    progress = sa.table(
+        'progress',
+        sa.column('goal_id', sa.Integer), sa.column('completed_count', sa.Integer),
+        sa.column('total_count', sa.Integer), sa.column('completion_percentage', sa.Float)
+    )
+    tasks = sa.table('tasks', sa.column('goal_id', sa.Integer), sa.column('status', sa.String))
+    total = sa.select(sa.func.count()).where(tasks.c.goal_id == progress.c.goal_id).scalar_subquery()
+    completed = sa.select(sa.func.count()).where(
+        tasks.c.goal_id == progress.c.goal_id, tasks.c.status == 'completed'
+    ).scalar_subquery()
+    op.execute(progress.update().values(
+        total_count=total,
+        completed_count=completed,
+        completion_percentage=sa.case((total > 0, completed * 100.0 / total), else_=0.0)
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('progress') as batch_op:
+        batch_op.drop_column('completed_count')
+        batch_op.drop_column('total_count')
@@ -4,8 +4,12 @@ Production-ready models with full tracking
 """
 from datetime import datetime, date, timedelta
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import case, delete, func, insert, literal, null, update
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
 
+from services import bitmap
+
 db = SQLAlchemy()
 
 
@@ -68,15 +72,17 @@ class Goal(db.Model):
     time_per_day = db.Column(db.Integer, nullable=False)  # minutes
     deadline = db.Column(db.Date, nullable=True)
     roadmap_generated = db.Column(db.Boolean, default=False)
+    generation_status = db.Column(db.String(20), default='ready')  # generating, ready, failed
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     tasks = db.relationship('Task', backref='goal', lazy=True, cascade='all, delete-orphan')
     progress = db.relationship('Progress', backref='goal', uselist=False, cascade='all, delete-orphan')
+    daily_stats = db.relationship('DailyCompletionStat', backref='goal', lazy=True, cascade='all, delete-orphan')
     
     def create_default_tasks(self):
-        """Create 30 placeholder tasks for 30-day roadmap"""
+        """Create 30 placeholder tasks for 30-day roadmap (caller commits)"""
         for day in range(1, 31):
             task = Task(
                 goal_id=self.id,
@@ -85,7 +91,6 @@ class Goal(db.Model):
                 status='pending'
             )
             db.session.add(task)
-        db.session.commit()
     
     def to_dict(self, include_tasks=False, include_progress=False):
         """Serialize goal to dictionary"""
@@ -98,6 +103,7 @@ class Goal(db.Model):
             'time_per_day': self.time_per_day,
             'deadline': self.deadline.isoformat() if self.deadline else None,
             'roadmap_generated': self.roadmap_generated,
+            'generation_status': self.generation_status or 'ready',
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -123,28 +129,114 @@ class Task(db.Model):
     description = db.Column(db.Text, nullable=True)
     status = db.Column(db.String(20), default='pending')  # pending, completed
     completed_at = db.Column(db.DateTime, nullable=True)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lesson_contents.id'), nullable=True, index=True)  # shared library lesson
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Relationships
+    library_lesson = db.relationship('LessonContent', foreign_keys=[lesson_id])
+    
     def mark_complete(self):
         """Mark task as completed and update progress"""
-        self.status = 'completed'
-        self.completed_at = datetime.utcnow()
-        db.session.commit()
-        
-        # Update progress
-        if self.goal.progress:
-            self.goal.progress.update_completion()
+        self._set_status('completed', datetime.utcnow())
     
     def mark_pending(self):
         """Mark task as pending"""
-        self.status = 'pending'
-        self.completed_at = None
+        self._set_status('pending', None)
+    
+    def _set_status(self, status, completed_at):
+        """
+        Change the status and the goal's progress counters in one transaction
+        
+        The UPDATE only matches when the status actually changes, so a repeated or
+        concurrent toggle is counted exactly once.
+        """
+        table = Task.__table__
+        previous_completed_at = self.completed_at
+        result = db.session.execute(
+            update(table)
+            .where(table.c.id == self.id, table.c.status != status)
+            .values(status=status, completed_at=completed_at, updated_at=datetime.utcnow())
+        )
+        if result.rowcount:
+            completed = status == 'completed'
+            Progress.record_status_change(self.goal_id, 1 if completed else -1)
+            
+            # Day bitmaps: read-modify-write under a row lock
+            progress = Progress.query.filter_by(goal_id=self.goal_id).with_for_update().populate_existing().first()
+            on_date = completed_at or previous_completed_at
+            if progress:
+                progress.record_task(self.day_number, completed, on_date.date() if on_date else None)
+            if on_date:
+                DailyCompletionStat.record(self.goal_id, on_date.date(), 1 if completed else -1)
         db.session.commit()
+    
+    @staticmethod
+    def bulk_set_status(changes):
+        """
+        Apply many status changes with a single UPDATE, and their deltas to the progress
+        counters, day bitmaps and daily rollup (caller commits)
         
-        # Update progress
-        if self.goal.progress:
-            self.goal.progress.update_completion()
+        The tasks are read under a row lock first, so only the ones whose status really
+        changes are updated and counted, the same way _set_status counts one toggle.
+        
+        Args:
+            changes: Dict of task_id -> (status, completed_at)
+        
+        Returns:
+            Number of tasks whose status actually changed
+        """
+        if not changes:
+            return 0
+        
+        rows = db.session.query(Task.id, Task.goal_id, Task.day_number, Task.status, Task.completed_at).filter(
+            Task.id.in_(list(changes))
+        ).with_for_update().all()
+        changed = [row for row in rows if row.status != changes[row.id][0]]
+        if not changed:
+            return 0
+        
+        table = Task.__table__
+        changed_ids = [row.id for row in changed]
+        new_status = case({task_id: changes[task_id][0] for task_id in changed_ids}, value=table.c.id)
+        completed_at = case(
+            {
+                task_id: literal(changes[task_id][1], db.DateTime) if changes[task_id][1] else null()
+                for task_id in changed_ids
+            },
+            value=table.c.id
+        )
+        db.session.execute(
+            update(table)
+            .where(table.c.id.in_(changed_ids))
+            .values(status=new_status, completed_at=completed_at, updated_at=datetime.utcnow())
+        )
+        
+        by_goal = {}
+        for row in changed:
+            by_goal.setdefault(row.goal_id, []).append(row)
+        
+        for goal_id, goal_rows in by_goal.items():
+            Progress.record_status_change(goal_id, sum(1 if changes[row.id][0] == 'completed' else -1 for row in goal_rows))
+            
+            progress = Progress.query.filter_by(goal_id=goal_id).with_for_update().populate_existing().first()
+            day_deltas = {}
+            for row in goal_rows:
+                status, new_completed_at = changes[row.id]
+                completed = status == 'completed'
+                
+                # A reopened task leaves the day it was completed on
+                on_date = new_completed_at or row.completed_at
+                if progress:
+                    progress.record_task(row.day_number, completed, on_date.date() if on_date else None)
+                if on_date:
+                    day_deltas[on_date.date()] = day_deltas.get(on_date.date(), 0) + (1 if completed else -1)
+            
+            for day, delta in day_deltas.items():
+                if delta:
+                    DailyCompletionStat.record(goal_id, day, delta)
+        
+        return len(changed)
     
     def to_dict(self):
         """Serialize task to dictionary"""
@@ -161,52 +253,145 @@ class Task(db.Model):
 
 
 class Progress(db.Model):
-    """Progress tracking model with smart streak calculation"""
+    """
+    Progress tracking model
+    
+    Counters and streak state are denormalized: task status changes adjust them
+    in the same transaction (record_status_change, record_task), so nothing
+    rescans the goal's tasks. recompute() rebuilds them from the tasks and is only
+    meant for repairs (`flask --app app progress repair`).
+    
+    Two day bitmaps back the streak and schedule queries: activity_bits has bit i
+    set when a task was completed on calendar day i (UTC) since the goal started,
+    task_bits has bit i set when the task of day i + 1 is completed. The streak
+    counts consecutive active calendar days.
+    """
     __tablename__ = 'progress'
     
     id = db.Column(db.Integer, primary_key=True)
     goal_id = db.Column(db.Integer, db.ForeignKey('goals.id'), unique=True, nullable=False)
     completion_percentage = db.Column(db.Float, default=0.0)
-    streak = db.Column(db.Integer, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+    streak_length = db.Column('streak', db.Integer, default=0)  # run ending at last_completion_date
     longest_streak = db.Column(db.Integer, default=0)
     last_completion_date = db.Column(db.Date, nullable=True)
+    activity_bits = db.Column(db.LargeBinary, nullable=False, default=b'')  # calendar days with a completion
+    task_bits = db.Column(db.LargeBinary, nullable=False, default=b'')  # completed day_numbers
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def update_completion(self):
-        """Calculate completion percentage with proper streak logic"""
-        goal = self.goal
-        total_tasks = len(goal.tasks)
+    @property
+    def start_date(self):
+        """Calendar day 0 of the bitmaps: the day the goal was created"""
+        goal = self.goal or Goal.query.get(self.goal_id)
+        return goal.created_at.date() if goal and goal.created_at else datetime.utcnow().date()
+    
+    def day_index(self, day=None):
+        """Bitmap index of a calendar day (today by default)"""
+        return ((day or datetime.utcnow().date()) - self.start_date).days
+    
+    @property
+    def streak(self):
+        """Current streak: active days up to today, or up to yesterday while today is still open"""
+        bits = bitmap.to_int(self.activity_bits)
+        today = self.day_index()
+        return bitmap.run_ending_at(bits, today) or bitmap.run_ending_at(bits, today - 1)
+    
+    def is_day_completed(self, day_number):
+        return bitmap.has_bit(bitmap.to_int(self.task_bits), day_number - 1)
+    
+    def missed_day_numbers(self):
+        """Day numbers due by today (day 1 is the start date) whose task is not completed"""
+        due = min(self.day_index() + 1, self.total_count or 0)
+        return [index + 1 for index in bitmap.clear_positions(bitmap.to_int(self.task_bits), due)]
+    
+    @staticmethod
+    def record_status_change(goal_id, completed_delta):
+        """
+        Apply tasks completed (positive delta) or reopened (negative) to a goal's counters
         
-        if total_tasks > 0:
-            completed_tasks = sum(1 for task in goal.tasks if task.status == 'completed')
-            self.completion_percentage = (completed_tasks / total_tasks) * 100
+        One UPDATE with SQL-side arithmetic in the caller's transaction, safe under
+        concurrent toggles
+        """
+        table = Progress.__table__
+        completed = table.c.completed_count + completed_delta
+        db.session.execute(
+            update(table)
+            .where(table.c.goal_id == goal_id)
+            .values(
+                completed_count=completed,
+                completion_percentage=case((table.c.total_count > 0, completed * 100.0 / table.c.total_count), else_=0.0),
+                updated_at=datetime.utcnow()
+            )
+        )
+    
+    def record_task(self, day_number, completed, on_date=None):
+        """
+        Set or clear one task in the day bitmaps and refresh the stored streaks (caller commits)
         
-        # Smart streak calculation
-        self._calculate_streak()
+        on_date is the completion date (for a reopened task, its previous one). Its
+        activity bit is only cleared when no other task was completed that day.
+        """
+        self.task_bits = bitmap.set_bit(self.task_bits, day_number - 1, completed)
         
+        index = self.day_index(on_date) if on_date else -1
+        if index >= 0:
+            if completed:
+                self.activity_bits = bitmap.set_bit(self.activity_bits, index)
+            elif not Progress._has_completion_on(self.goal_id, on_date):
+                self.activity_bits = bitmap.set_bit(self.activity_bits, index, False)
+        
+        self._refresh_streaks()
+    
+    @staticmethod
+    def _has_completion_on(goal_id, day):
+        start = datetime.combine(day, datetime.min.time())
+        return db.session.query(
+            Task.query.filter(
+                Task.goal_id == goal_id,
+                Task.status == 'completed',
+                Task.completed_at >= start,
+                Task.completed_at < start + timedelta(days=1)
+            ).exists()
+        ).scalar()
+    
+    def _refresh_streaks(self):
+        """Stored streak columns from activity_bits (for readers that do not decode the bitmap)"""
+        bits = bitmap.to_int(self.activity_bits)
+        last = bits.bit_length() - 1
+        self.streak_length = bitmap.run_ending_at(bits, last) if last >= 0 else 0
+        self.longest_streak = bitmap.longest_run(bits)
+        self.last_completion_date = self.start_date + timedelta(days=last) if last >= 0 else None
+    
+    def recount(self):
+        """Set the task counters from two aggregate queries, e.g. after tasks were added (caller commits)"""
+        total, completed = db.session.query(
+            func.count(Task.id),
+            func.coalesce(func.sum(case((Task.status == 'completed', 1), else_=0)), 0)
+        ).filter(Task.goal_id == self.goal_id).one()
+        
+        self.total_count = total
+        self.completed_count = completed
+        self.completion_percentage = completed * 100.0 / total if total else 0.0
         self.updated_at = datetime.utcnow()
-        db.session.commit()
     
-    def _calculate_streak(self):
-        """Calculate consecutive days streak with missed day detection"""
-        goal = self.goal
-        sorted_tasks = sorted(goal.tasks, key=lambda t: t.day_number)
+    def recompute(self):
+        """Rebuild counters, day bitmaps and streaks from the goal's tasks (repair; caller commits)"""
+        self.recount()
         
-        current_streak = 0
-        max_streak = 0
+        start = self.start_date
+        activity = tasks = 0
+        for day_number, completed_at in db.session.query(Task.day_number, Task.completed_at).filter(
+            Task.goal_id == self.goal_id, Task.status == 'completed'
+        ):
+            tasks |= 1 << (day_number - 1)
+            if completed_at and completed_at.date() >= start:
+                activity |= 1 << (completed_at.date() - start).days
         
-        for task in sorted_tasks:
-            if task.status == 'completed':
-                current_streak += 1
-                if current_streak > max_streak:
-                    max_streak = current_streak
-                self.last_completion_date = task.completed_at.date() if task.completed_at else None
-            else:
-                current_streak = 0
-        
-        self.streak = current_streak
-        self.longest_streak = max(self.longest_streak, max_streak)
+        self.task_bits = bitmap.to_bytes(tasks)
+        self.activity_bits = bitmap.to_bytes(activity)
+        self._refresh_streaks()
     
     def to_dict(self):
         """Serialize progress to dictionary"""
@@ -214,6 +399,8 @@ class Progress(db.Model):
             'id': self.id,
             'goal_id': self.goal_id,
             'completion_percentage': round(self.completion_percentage, 2),
+            'completed_count': self.completed_count,
+            'total_count': self.total_count,
             'streak': self.streak,
             'longest_streak': self.longest_streak,
             'last_completion_date': self.last_completion_date.isoformat() if self.last_completion_date else None,
@@ -221,6 +408,78 @@ class Progress(db.Model):
         }
 
 
+class DailyCompletionStat(db.Model):
+    """
+    Completed tasks per goal and calendar day (UTC of completed_at)
+    
+    Rollup for the analytics endpoints, kept in step with task status changes;
+    rebuild() recomputes a goal's rows (`flask --app app analytics backfill`).
+    """
+    __tablename__ = 'daily_completion_stats'
+    __table_args__ = (db.UniqueConstraint('goal_id', 'date', name='uq_daily_completion_stats_goal_date'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    goal_id = db.Column(db.Integer, db.ForeignKey('goals.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @staticmethod
+    def record(goal_id, day, delta):
+        """Add delta completions to a goal's day, creating the row if needed (caller commits)"""
+        table = DailyCompletionStat.__table__
+        now = datetime.utcnow()
+        increment = (
+            update(table)
+            .where(table.c.goal_id == goal_id, table.c.date == day)
+            .values(completed=table.c.completed + delta, updated_at=now)
+        )
+        
+        if db.session.execute(increment).rowcount or delta < 0:
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(table).values(goal_id=goal_id, date=day, completed=delta, updated_at=now))
+        except IntegrityError:
+            # Created concurrently by another toggle
+            db.session.execute(increment)
+    
+    @staticmethod
+    def rebuild(goal_id):
+        """Replace a goal's rows with one aggregate over its completed tasks (caller commits)"""
+        table = DailyCompletionStat.__table__
+        day = func.date(Task.completed_at)
+        rows = db.session.query(day, func.count(Task.id)).filter(
+            Task.goal_id == goal_id, Task.status == 'completed', Task.completed_at.isnot(None)
+        ).group_by(day).all()
+        
+        now = datetime.utcnow()
+        db.session.execute(delete(table).where(table.c.goal_id == goal_id))
+        if rows:
+            db.session.execute(insert(table), [
+                {
+                    'goal_id': goal_id,
+                    'date': value if isinstance(value, date) else date.fromisoformat(str(value)[:10]),
+                    'completed': count,
+                    'updated_at': now
+                }
+                for value, count in rows
+            ])
+        return len(rows)
+    
+    @staticmethod
+    def completions_between(goal_id, start, end):
+        """{date: completed} for a goal's days in [start, end] with completions"""
+        return dict(
+            db.session.query(DailyCompletionStat.date, DailyCompletionStat.completed).filter(
+                DailyCompletionStat.goal_id == goal_id,
+                DailyCompletionStat.date >= start,
+                DailyCompletionStat.date <= end,
+                DailyCompletionStat.completed > 0
+            )
+        )
+
+
 class TokenBlocklist(db.Model):
     """Store blacklisted JWT tokens for logout"""
     __tablename__ = 'token_blocklist'
@@ -233,6 +492,10 @@ class TokenBlocklist(db.Model):
 class ConversationMessage(db.Model):
     """Store AI chat conversation history"""
     __tablename__ = 'conversation_messages'
+    __table_args__ = (
+        # Serves the per-user newest-first context and history page queries
+        db.Index('ix_conversation_messages_user_created', 'user_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -249,12 +512,30 @@ class ConversationMessage(db.Model):
         }
 
 
+class ConversationSummary(db.Model):
+    """Rolling summary of a user's older chat messages, used as compact prompt context"""
+    __tablename__ = 'conversation_summaries'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False)
+    summary = db.Column(db.Text, nullable=False, default='')
+    last_message_id = db.Column(db.Integer, nullable=False, default=0)  # messages up to this id are summarized
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class LessonContent(db.Model):
-    """Detailed lesson content for each daily task"""
+    """
+    Detailed lesson content
+    
+    Library lessons (lesson_key set, no task) are shared by every task with the same
+    normalized topic, level and goal domain; tasks point at them through Task.lesson_id.
+    A row with a task_id is that task's own override (a regenerated lesson).
+    """
     __tablename__ = 'lesson_contents'
     
     id = db.Column(db.Integer, primary_key=True)
-    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), unique=True, nullable=False)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), unique=True, nullable=True)
+    lesson_key = db.Column(db.String(64), unique=True, nullable=True)  # sha256 of topic|level|domain
     explanation = db.Column(db.Text, nullable=False)  # AI-generated detailed explanation
     key_concepts = db.Column(db.JSON, nullable=True)  # Array of key concepts
     example_code = db.Column(db.Text, nullable=True)  # Example code snippet
@@ -265,13 +546,14 @@ class LessonContent(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    task = db.relationship('Task', backref=db.backref('lesson_content', uselist=False))
+    task = db.relationship('Task', foreign_keys=[task_id], backref=db.backref('lesson_content', uselist=False))
     resources = db.relationship('LearningResource', backref='lesson', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self, include_resources=True):
         data = {
             'id': self.id,
             'task_id': self.task_id,
+            'shared': self.task_id is None,
             'explanation': self.explanation,
             'key_concepts': self.key_concepts or [],
             'example_code': self.example_code,
@@ -318,11 +600,18 @@ class LearningResource(db.Model):
 
 
 class Quiz(db.Model):
-    """Quiz questions for each task/lesson"""
+    """
+    Quiz questions
+    
+    Bank questions (bank_key set, no task) are shared by every task with the same
+    normalized topic and level; each task's quiz is a sample of its bank. Rows with a
+    task_id belong to that task alone (placeholders and quizzes from before the bank).
+    """
     __tablename__ = 'quizzes'
     
     id = db.Column(db.Integer, primary_key=True)
-    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=True)
+    bank_key = db.Column(db.String(64), nullable=True, index=True)  # sha256 of topic|level
     question = db.Column(db.Text, nullable=False)
     question_type = db.Column(db.String(20), default='multiple_choice')  # multiple_choice, code, true_false
     options = db.Column(db.JSON, nullable=True)  # Array of options for multiple choice
@@ -330,11 +619,18 @@ class Quiz(db.Model):
     explanation = db.Column(db.Text, nullable=True)  # Explanation of correct answer
     difficulty = db.Column(db.String(20), default='medium')  # easy, medium, hard
     points = db.Column(db.Integer, default=1)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)  # graded answers, for difficulty calibration
+    correct_count = db.Column(db.Integer, nullable=False, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     task = db.relationship('Task', backref='quizzes')
     
+    @property
+    def correct_rate(self):
+        """Share of answers that were correct, None before the first attempt"""
+        return self.correct_count / self.attempt_count if self.attempt_count else None
+    
     def to_dict(self, include_answer=False):
         data = {
             'id': self.id,
@@ -349,6 +645,7 @@ class Quiz(db.Model):
         if include_answer:
             data['correct_answer'] = self.correct_answer
             data['explanation'] = self.explanation
+            data['correct_rate'] = round(self.correct_rate, 3) if self.correct_rate is not None else None
         
         return data
 
@@ -428,3 +725,73 @@ class Assessment(db.Model):
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
 
+
+
+class AIResponseCache(db.Model):
+    """Persistent store for AI completions, keyed by a hash of the normalized prompt and model"""
+    __tablename__ = 'ai_response_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), unique=True, nullable=False)  # sha256 hex digest
+    model = db.Column(db.String(100), nullable=False)
+    response = db.Column(db.Text, nullable=False)
+    hit_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    last_accessed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class GenerationLease(db.Model):
+    """Cross-worker lease so only one process generates a given lesson/quiz at a time"""
+    __tablename__ = 'generation_leases'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    lease_key = db.Column(db.String(255), unique=True, nullable=False)  # e.g. "lesson:42"
+    owner = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class Job(db.Model):
+    """Background job queue entry (processed by `flask jobs worker`)"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False, index=True)  # generate_roadmap, ...
+    payload = db.Column(db.JSON, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # retry backoff
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)  # visibility timeout
+    result = db.Column(db.JSON, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'result': self.result,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class RateLimitBucket(db.Model):
+    """Token bucket shared by all workers (per user or global AI quota)"""
+    __tablename__ = 'rate_limit_buckets'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    bucket_key = db.Column(db.String(100), unique=True, nullable=False)  # e.g. "ai:user:42", "ai:global"
+    tokens = db.Column(db.Float, nullable=False)
+    refilled_at = db.Column(db.Float, nullable=False)  # unix timestamp of the last refill
+    version = db.Column(db.Integer, nullable=False, default=0)  # optimistic concurrency
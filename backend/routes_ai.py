@@ -4,8 +4,13 @@ Provides AI chat assistant functionality
 """
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import and_, or_
 from models import db, ConversationMessage
 from services.ai_service import AIService
+from services.lesson_service import LessonService
+from services.streaming import wants_event_stream, sse_event, sse_response
+from services.rate_limiter import rate_limiter, rate_limited
+from services.conversation_memory import ConversationMemory
 from datetime import datetime
 
 ai_bp = Blueprint('ai', __name__, url_prefix='/api/ai')
@@ -13,6 +18,7 @@ ai_bp = Blueprint('ai', __name__, url_prefix='/api/ai')
 
 @ai_bp.route('/chat', methods=['POST'])
 @jwt_required()
+@rate_limited('chat')
 def chat():
     """
     Send message to AI and get response
@@ -27,6 +33,11 @@ def chat():
         "response": "AI formatted explanation",
         "conversation_id": user_id (for history)
     }
+    
+    Streaming (?stream=1 or Accept: text/event-stream):
+    Server-Sent Events - "token" events with {"content": "..."} as they arrive,
+    then a "done" event with the stored message, or an "error" event if the reply
+    broke off (nothing is stored)
     """
     current_user_id = get_jwt_identity()
     data = request.get_json()
@@ -54,23 +65,18 @@ def chat():
         
         print(f"[DEBUG] User {current_user_id} sent: {user_message[:50]}...")
         
-        # Get conversation history
-        history = ConversationMessage.query.filter_by(
-            user_id=current_user_id
-        ).order_by(ConversationMessage.created_at).all()
+        # Get conversation context: rolling summary + recent messages within the token budget
+        summary, conversation_history = ConversationMemory.build_context(current_user_id, exclude_id=user_msg.id)
         
-        print(f"[DEBUG] Found {len(history)} messages in history")
+        print(f"[DEBUG] Using {len(conversation_history)} recent messages" + (" and summary" if summary else ""))
         
-        # Format history for AI
-        conversation_history = [
-            {"role": msg.role, "content": msg.content}
-            for msg in history[-10:]  # Last 10 messages for context
-        ]
+        if wants_event_stream():
+            return sse_response(_stream_chat_reply(current_user_id, user_message, conversation_history, summary))
         
         print(f"[DEBUG] Calling AIService.chat_with_ai...")
         
         # Get AI response
-        ai_response = AIService.chat_with_ai(user_message, conversation_history)
+        ai_response = AIService.chat_with_ai(user_message, conversation_history, summary)
         
         print(f"[DEBUG] Got response: {ai_response[:50]}...")
         
@@ -81,6 +87,7 @@ def chat():
             content=ai_response
         )
         db.session.add(assistant_msg)
+        ConversationMemory.schedule_summary(current_user_id)
         db.session.commit()
         
         return jsonify({
@@ -96,26 +103,114 @@ def chat():
         return jsonify({'error': f'Chat failed: {str(e)}'}), 500
 
 
+def _stream_chat_reply(user_id, user_message, conversation_history, summary=None):
+    """Forward AI tokens as SSE and store the assistant message only if the stream completes"""
+    chunks = []
+    stream = AIService.stream_chat(user_message, conversation_history, summary)
+    
+    try:
+        for delta in stream:
+            chunks.append(delta)
+            yield sse_event('token', {'content': delta})
+    except Exception as e:
+        # A truncated reply is not stored, so it never reaches the conversation context
+        print(f"[ERROR] Chat stream for user {user_id} failed after {len(chunks)} chunks: {str(e)}")
+        yield sse_event('error', {'error': 'The reply was interrupted. Please try again.'})
+        return
+    finally:
+        # Also runs when the client disconnects (generator closed): closing the AI stream
+        # stops the upstream generation and the partial reply is dropped
+        stream.close()
+    
+    ai_response = ''.join(chunks).strip()
+    assistant_msg = None
+    if ai_response:
+        assistant_msg = ConversationMessage(
+            user_id=user_id,
+            role='assistant',
+            content=ai_response
+        )
+        db.session.add(assistant_msg)
+        ConversationMemory.schedule_summary(user_id)
+        db.session.commit()
+    
+    yield sse_event('done', {
+        'response': ai_response,
+        'message': assistant_msg.to_dict() if assistant_msg else None,
+        'user_id': user_id,
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+
 @ai_bp.route('/chat/history', methods=['GET'])
 @jwt_required()
 def get_chat_history():
-    """Get conversation history for current user"""
+    """
+    Get conversation history for current user, one page at a time
+    
+    Query params:
+        limit: Page size (default 50, max 100)
+        before_id: Return messages older than this message (the previous page's
+                   next_before_id); omit for the newest page
+    """
     current_user_id = get_jwt_identity()
     limit = request.args.get('limit', 50, type=int)
+    before_id = request.args.get('before_id', type=int)
     
-    # Limit to max 100 messages
-    limit = min(limit, 100)
+    # Limit to max 100 messages per page
+    limit = max(1, min(limit, 100))
     
-    messages = ConversationMessage.query.filter_by(
-        user_id=current_user_id
-    ).order_by(ConversationMessage.created_at.desc()).limit(limit).all()
+    query = ConversationMessage.query.filter_by(user_id=current_user_id)
+    
+    if before_id is not None:
+        cursor = ConversationMessage.query.filter_by(id=before_id, user_id=current_user_id).first()
+        if not cursor:
+            return jsonify({'error': 'Invalid before_id'}), 400
+        
+        # Keyset on (created_at, id): an index range scan, however deep the page
+        query = query.filter(or_(
+            ConversationMessage.created_at < cursor.created_at,
+            and_(ConversationMessage.created_at == cursor.created_at, ConversationMessage.id < cursor.id)
+        ))
+    
+    # One extra row tells whether an older page exists
+    messages = query.order_by(
+        ConversationMessage.created_at.desc(),
+        ConversationMessage.id.desc()
+    ).limit(limit + 1).all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
     
     # Reverse to show oldest first
     messages = list(reversed(messages))
     
     return jsonify({
         'messages': [msg.to_dict() for msg in messages],
-        'count': len(messages)
+        'count': len(messages),
+        'has_more': has_more,
+        'next_before_id': messages[0].id if has_more else None
+    }), 200
+
+
+@ai_bp.route('/quota', methods=['GET'])
+@jwt_required()
+def get_quota():
+    """
+    Get the current user's remaining AI quota
+    
+    Quotas are token buckets measured in LLM tokens; each AI call costs the
+    amount listed in "costs" (answers served from the caches are free) and
+    buckets refill continuously
+    """
+    current_user_id = get_jwt_identity()
+    
+    return jsonify({
+        'enabled': rate_limiter.enabled,
+        'quota': rate_limiter.get_usage(current_user_id),
+        'costs': {
+            kind: rate_limiter.cost(kind, LessonService.quiz_bank_size())
+            for kind in ('chat', 'simplify', 'example', 'lesson', 'quiz')
+        }
     }), 200
 
 
@@ -126,6 +221,7 @@ def clear_chat_history():
     current_user_id = get_jwt_identity()
     
     ConversationMessage.query.filter_by(user_id=current_user_id).delete()
+    ConversationMemory.clear(current_user_id)
     db.session.commit()
     
     return jsonify({'message': 'Chat history cleared'}), 200
@@ -133,6 +229,7 @@ def clear_chat_history():
 
 @ai_bp.route('/simplify', methods=['POST'])
 @jwt_required()
+@rate_limited('simplify')
 def simplify_concept():
     """
     Get simplified explanation of a concept
@@ -170,6 +267,7 @@ def simplify_concept():
 
 @ai_bp.route('/generate-example', methods=['POST'])
 @jwt_required()
+@rate_limited('example')
 def generate_example():
     """
     Generate a practical example for a topic
@@ -187,37 +285,10 @@ def generate_example():
         return jsonify({'error': 'Topic is required'}), 400
     
     topic = data['topic'].strip()
-    language = data.get('language', 'javascript')
+    language = (data.get('language') or 'javascript').strip().lower()
     
     try:
-        prompt = f"""Generate a practical, beginner-friendly code example for: {topic}
-
-Programming Language: {language}
-
-Requirements:
-1. Keep it simple and under 20 lines
-2. Include comments explaining each step
-3. Show a real-world use case
-4. Make it runnable/executable
-
-Format as a code block with clear explanation before and after."""
-
-        from services.ai_service import openai
-        if not openai:
-            return jsonify({'error': 'AI service not available'}), 503
-        
-        import openai as openai_module
-        response = openai_module.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert programmer who creates clear code examples."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
-        
-        example = response.choices[0].message.content.strip()
+        example = AIService.generate_example(topic, language)
         
         return jsonify({
             'topic': topic,
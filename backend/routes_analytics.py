@@ -4,8 +4,9 @@ Provides detailed analytics and insights for goals
 """
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Goal, Task
+from models import db, Goal, Task, DailyCompletionStat
 from services.progress_service import ProgressService
+from services.goal_analytics import GoalAnalytics, NUMPY_AVAILABLE
 from datetime import datetime, timedelta
 
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/api')
@@ -44,8 +45,9 @@ def get_goal_insights(goal_id):
     start_date = goal.created_at.date()
     days_elapsed = max(1, (today - start_date).days)
     
-    completed_tasks = sum(1 for t in goal.tasks if t.status == 'completed')
-    velocity = completed_tasks / days_elapsed
+    progress = ProgressService.get_progress(goal)
+    velocity = progress.completed_count / days_elapsed
+    analytics = GoalAnalytics.for_goal(goal_id) if NUMPY_AVAILABLE else None
     
     return jsonify({
         'goal_id': goal_id,
@@ -57,7 +59,9 @@ def get_goal_insights(goal_id):
         'velocity': {
             'tasks_per_day': round(velocity, 2),
             'days_elapsed': days_elapsed,
-            'estimated_completion_days': round(len(goal.tasks) / velocity) if velocity > 0 else None
+            'estimated_completion_days': round(progress.total_count / velocity) if velocity > 0 else None,
+            'last_7_days': analytics['velocity']['last_7_days'] if analytics else None,
+            'projected_completion_date': analytics['projected_completion_date'] if analytics else None
         },
         'recommendations': ProgressService._generate_recommendations(goal_id)
     }), 200
@@ -70,20 +74,18 @@ def get_weekly_progress(goal_id):
     current_user_id = get_jwt_identity()
     goal = Goal.query.filter_by(id=goal_id, user_id=current_user_id).first_or_404()
     
-    # Get last 8 weeks
+    # Get last 8 weeks, from the daily rollup (at most 63 rows)
     today = datetime.utcnow().date()
     weekly_data = []
     
+    first_week_start = today - timedelta(days=today.weekday() + 7 * 8)
+    daily = DailyCompletionStat.completions_between(goal_id, first_week_start, first_week_start + timedelta(days=9 * 7 - 1))
+    
     for week_offset in range(8, -1, -1):  # Last 8 weeks
         week_start = today - timedelta(days=today.weekday() + 7 * week_offset)
         week_end = week_start + timedelta(days=6)
         
-        completed = sum(
-            1 for t in goal.tasks
-            if t.completed_at and
-            week_start <= t.completed_at.date() <= week_end and
-            t.status == 'completed'
-        )
+        completed = sum(count for day, count in daily.items() if week_start <= day <= week_end)
         
         weekly_data.append({
             'week_start': week_start.isoformat(),
@@ -107,12 +109,19 @@ def get_daily_breakdown(goal_id):
     
     daily_data = []
     
-    for task in sorted(goal.tasks, key=lambda t: t.day_number):
+    # Only the listed columns, sorted by the database
+    tasks = (
+        db.session.query(Task.day_number, Task.topic, Task.status, Task.completed_at)
+        .filter(Task.goal_id == goal_id)
+        .order_by(Task.day_number)
+    )
+    
+    for day_number, topic, status, completed_at in tasks:
         daily_data.append({
-            'day': task.day_number,
-            'topic': task.topic,
-            'status': task.status,
-            'completed_at': task.completed_at.isoformat() if task.completed_at else None
+            'day': day_number,
+            'topic': topic,
+            'status': status,
+            'completed_at': completed_at.isoformat() if completed_at else None
         })
     
     return jsonify({
@@ -176,13 +185,11 @@ def get_dashboard_overview():
     
     goals = user.goals
     
-    # Aggregate statistics
+    # Aggregate statistics (from each goal's progress counters)
     total_goals = len(goals)
-    total_tasks = sum(len(g.tasks) for g in goals)
-    completed_tasks = sum(
-        len([t for t in g.tasks if t.status == 'completed'])
-        for g in goals
-    )
+    progresses = [ProgressService.get_progress(g) for g in goals]
+    total_tasks = sum(p.total_count for p in progresses)
+    completed_tasks = sum(p.completed_count for p in progresses)
     
     total_completion = 0
     total_streak = 0
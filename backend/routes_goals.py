@@ -2,15 +2,21 @@
 Goals, Tasks, and Progress Routes for SkillPilot AI
 Includes AI-powered roadmap generation
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Goal, Task, Progress, User
+from models import db, Goal, Task, Progress, User, Job
 from services.ai_service import AIService
 from services.progress_service import ProgressService
-from datetime import datetime
+from services.goal_generation import GoalGenerationService, ROADMAP_DAYS
+from services.pregeneration import PregenerationService
+from services.prefetch import PrefetchService
+from datetime import datetime, timezone
 
 goals_bp = Blueprint('goals', __name__, url_prefix='/api')
 
+# Task status changes accepted by one bulk update request
+BULK_STATUS_MAX_UPDATES = 500
+
 
 @goals_bp.route('/goals', methods=['GET'])
 @jwt_required()
@@ -70,6 +76,11 @@ def create_goal():
     }
     
     Response: Goal with AI-generated tasks or fallback to default
+    
+    With ROADMAP_ASYNC_GENERATION enabled (and an AI client configured), AI goals
+    return 202 immediately with the goal in a "generating" state and a job to poll via
+    GET /api/jobs/<job_id>; a `flask jobs worker` process generates the roadmap and
+    inserts the tasks.
     """
     current_user_id = get_jwt_identity()
     data = request.get_json()
@@ -107,25 +118,29 @@ def create_goal():
     # Try to generate AI roadmap
     should_generate_ai = data.get('generate_ai', True)
     
+    # Without an AI client there is nothing to wait for: placeholders are written inline
+    if should_generate_ai and current_app.config.get('ROADMAP_ASYNC_GENERATION', False) and AIService.is_available():
+        job = GoalGenerationService.enqueue_roadmap(goal)
+        db.session.add(Progress(goal_id=goal.id))
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Goal created, roadmap is being generated',
+            'goal': goal.to_dict(include_tasks=True, include_progress=True),
+            'job': job.to_dict()
+        }), 202
+    
     if should_generate_ai:
         try:
             # Generate AI roadmap
             roadmap = AIService.generate_roadmap(
                 goal.title,
                 goal.level,
-                30
+                ROADMAP_DAYS
             )
             
             # Create tasks from roadmap
-            for item in roadmap:
-                task = Task(
-                    goal_id=goal.id,
-                    day_number=item['day'],
-                    topic=item['topic'],
-                    description=f"Estimated time: {item.get('estimated_time', 45)} minutes",
-                    status='pending'
-                )
-                db.session.add(task)
+            GoalGenerationService.add_roadmap_tasks(goal, roadmap)
             
             goal.roadmap_generated = True
             db.session.commit()
@@ -143,10 +158,12 @@ def create_goal():
     # Create progress tracker
     progress = Progress(goal_id=goal.id)
     db.session.add(progress)
+    PregenerationService.enqueue_after_roadmap(goal)
     db.session.commit()
     
-    # Update progress
-    progress.update_completion()
+    # Count the new tasks
+    progress.recount()
+    db.session.commit()
     
     return jsonify({
         'message': 'Goal created successfully' + (' with AI-generated roadmap' if goal.roadmap_generated else ''),
@@ -165,6 +182,38 @@ def get_goal(goal_id):
     return jsonify(goal.to_dict(include_tasks=True, include_progress=True)), 200
 
 
+@goals_bp.route('/goals/<int:goal_id>/generation', methods=['GET'])
+@jwt_required()
+def get_goal_generation(goal_id):
+    """Poll roadmap generation status for a goal"""
+    current_user_id = get_jwt_identity()
+    goal = Goal.query.filter_by(id=goal_id, user_id=current_user_id).first_or_404()
+    
+    response = {
+        'goal_id': goal.id,
+        'generation_status': goal.generation_status or 'ready',
+        'roadmap_generated': goal.roadmap_generated
+    }
+    
+    if response['generation_status'] == 'generating':
+        # Tasks are inserted as the roadmap streams in
+        response['tasks_ready'] = Task.query.filter_by(goal_id=goal.id).count()
+    else:
+        response['goal'] = goal.to_dict(include_tasks=True, include_progress=True)
+    
+    return jsonify(response), 200
+
+
+@goals_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Get the status of a background job started by the current user"""
+    current_user_id = get_jwt_identity()
+    job = Job.query.filter_by(id=job_id, user_id=current_user_id).first_or_404()
+    
+    return jsonify(job.to_dict()), 200
+
+
 @goals_bp.route('/goals/<int:goal_id>', methods=['DELETE'])
 @jwt_required()
 def delete_goal(goal_id):
@@ -207,12 +256,101 @@ def update_task_status(task_id):
     
     if status == 'completed':
         task.mark_complete()
+        # The next day is usually opened next: have its content ready by then
+        PrefetchService.schedule(task)
     else:
         task.mark_pending()
     
     return jsonify(task.to_dict()), 200
 
 
+@goals_bp.route('/goals/<int:goal_id>/tasks/status', methods=['PATCH'])
+@jwt_required()
+def bulk_update_task_status(goal_id):
+    """
+    Update the status of many tasks of a goal at once (catching up, offline sync)
+    Body: { updates: [{task_id: 1, status: "completed", completed_at: "2024-01-31T18:00:00"}] }
+    
+    completed_at is optional (defaults to now), must lie between the goal's creation
+    and now, and is ignored for pending tasks. The whole batch is rejected if any
+    entry is invalid or not a task of the goal; later entries for the same task win.
+    """
+    current_user_id = get_jwt_identity()
+    
+    data = request.get_json() or {}
+    updates = data.get('updates')
+    if not isinstance(updates, list) or not updates:
+        return jsonify({'error': 'updates must be a non-empty list'}), 400
+    if len(updates) > BULK_STATUS_MAX_UPDATES:
+        return jsonify({'error': f'At most {BULK_STATUS_MAX_UPDATES} updates per request'}), 400
+    
+    now = datetime.utcnow()
+    changes = {}
+    for entry in updates:
+        if not isinstance(entry, dict) or not isinstance(entry.get('task_id'), int):
+            return jsonify({'error': 'Each update needs an integer task_id'}), 400
+        
+        status = entry.get('status')
+        if status not in ['pending', 'completed']:
+            return jsonify({'error': 'Invalid status. Must be pending or completed', 'task_id': entry['task_id']}), 400
+        
+        completed_at = None
+        if status == 'completed':
+            completed_at = now
+            if entry.get('completed_at'):
+                try:
+                    completed_at = datetime.fromisoformat(str(entry['completed_at']).replace('Z', '+00:00'))
+                except ValueError:
+                    return jsonify({'error': 'Invalid completed_at. Use ISO 8601', 'task_id': entry['task_id']}), 400
+                if completed_at.tzinfo is not None:
+                    completed_at = completed_at.astimezone(timezone.utc).replace(tzinfo=None)
+                if completed_at > now:
+                    return jsonify({'error': 'completed_at is in the future', 'task_id': entry['task_id']}), 400
+        
+        changes[entry['task_id']] = (status, completed_at)
+    
+    # Ownership of the goal and every task, in one query
+    owned = dict(
+        db.session.query(Task.id, Task.day_number)
+        .join(Goal, Goal.id == Task.goal_id)
+        .filter(Goal.id == goal_id, Goal.user_id == current_user_id, Task.id.in_(list(changes)))
+        .all()
+    )
+    unknown = sorted(set(changes) - set(owned))
+    if unknown:
+        return jsonify({'error': 'Task not found', 'task_ids': unknown}), 404
+    
+    # Completions before day 0 would fall outside the goal's day bitmaps
+    goal_created_at = db.session.query(Goal.created_at).filter(Goal.id == goal_id).scalar()
+    early = sorted(
+        task_id for task_id, (_, completed_at) in changes.items()
+        if completed_at and goal_created_at and completed_at < goal_created_at
+    )
+    if early:
+        return jsonify({'error': 'completed_at is before the goal was created', 'task_ids': early}), 400
+    
+    # Counters, bitmaps and the daily rollup are adjusted per changed task
+    updated = Task.bulk_set_status(changes)
+    
+    progress = Progress.query.filter_by(goal_id=goal_id).first()
+    if not progress:
+        progress = Progress(goal_id=goal_id)
+        db.session.add(progress)
+        progress.recompute()
+    db.session.commit()
+    
+    # Prefetch after the furthest completed day, like a single completion would
+    completed = [task_id for task_id, (status, _) in changes.items() if status == 'completed']
+    if updated and completed:
+        PrefetchService.schedule(Task.query.get(max(completed, key=owned.get)))
+    
+    return jsonify({
+        'updated': updated,
+        'unchanged': len(changes) - updated,
+        'progress': progress.to_dict()
+    }), 200
+
+
 @goals_bp.route('/goals/<int:goal_id>/progress', methods=['GET'])
 @jwt_required()
 def get_progress(goal_id):
@@ -224,8 +362,8 @@ def get_progress(goal_id):
         # Create progress if doesn't exist
         progress = Progress(goal_id=goal.id)
         db.session.add(progress)
+        progress.recompute()
         db.session.commit()
-        progress.update_completion()
     
     return jsonify(goal.progress.to_dict()), 200
 
@@ -4,10 +4,15 @@ Handles interactive learning content, resources, quizzes, and analytics
 """
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Task, LessonContent, LearningResource, Quiz, QuizAttempt, Assessment, Goal
+from sqlalchemy.exc import IntegrityError
+from models import db, Task, LessonContent, QuizAttempt, Assessment, Goal
 from services.ai_service import AIService
+from services.lesson_service import LessonService
+from services.prefetch import PrefetchService
+from services.streaming import wants_event_stream, sse_event, sse_response
+from services.single_flight import single_flight, SingleFlightTimeout
+from services.rate_limiter import rate_limiter, rate_limited, RateLimitExceeded
 from datetime import datetime
-import json
 
 lessons_bp = Blueprint('lessons', __name__, url_prefix='/api/lessons')
 
@@ -18,6 +23,10 @@ def get_lesson_content(task_id):
     """
     Get detailed lesson content for a specific task
     Auto-generates if doesn't exist
+    
+    Streaming (?stream=1 or Accept: text/event-stream):
+    "token" events carry the raw lesson text as it is generated,
+    the "done" event carries the stored lesson
     """
     current_user_id = get_jwt_identity()
     
@@ -26,12 +35,30 @@ def get_lesson_content(task_id):
     if not task or task.goal.user_id != current_user_id:
         return jsonify({'error': 'Task not found'}), 404
     
-    # Check if lesson content already exists
-    lesson = LessonContent.query.filter_by(task_id=task_id).first()
+    # Check if lesson content already exists (the task's own or a shared library lesson)
+    lesson = LessonService.find_lesson(task)
+    
+    # Get the following days ready while this one is studied
+    PrefetchService.schedule(task)
+    
+    if wants_event_stream():
+        return sse_response(_stream_lesson_content(task, lesson))
     
     if not lesson:
-        # Generate lesson content using AI
-        lesson = generate_lesson_content(task)
+        # Generate lesson content using AI (once, even for concurrent requests);
+        # only the request that actually generates is charged to the AI quota
+        def generate():
+            rate_limiter.consume(current_user_id, 'lesson')
+            return generate_lesson_content(task)
+        
+        try:
+            lesson = single_flight.do(
+                f'lesson:{LessonService.task_lesson_key(task)}',
+                generate,
+                lambda: LessonService.find_lesson(task)
+            )
+        except SingleFlightTimeout:
+            return jsonify({'error': 'Lesson is still being generated, please retry shortly'}), 503
     
     return jsonify({
         'task': task.to_dict(),
@@ -39,24 +66,69 @@ def get_lesson_content(task_id):
     }), 200
 
 
+def _stream_lesson_content(task, lesson=None):
+    """Stream lesson generation as SSE; the lesson is stored only when the stream completes, else an "error" event is sent"""
+    if not lesson:
+        try:
+            with single_flight.lead(
+                f'lesson:{LessonService.task_lesson_key(task)}',
+                lambda: LessonService.find_lesson(task)
+            ) as existing:
+                lesson = existing
+                if not lesson:
+                    goal = task.goal
+                    rate_limiter.consume(goal.user_id, 'lesson')
+                    chunks = []
+                    stream = AIService.stream_lesson(task.topic, goal.level, goal.title)
+                    
+                    try:
+                        for delta in stream:
+                            chunks.append(delta)
+                            yield sse_event('token', {'content': delta})
+                    except Exception as e:
+                        # A lesson cut off mid-stream would be stored and shared as a library lesson
+                        print(f"[ERROR] Lesson stream for task {task.id} failed after {len(chunks)} chunks: {str(e)}")
+                        yield sse_event('error', {'error': 'Lesson generation was interrupted, please retry'})
+                        return
+                    finally:
+                        # On client disconnect this stops the upstream generation;
+                        # a half-received lesson is not stored
+                        stream.close()
+                    
+                    lesson_data = AIService.parse_lesson(''.join(chunks))
+                    lesson = save_lesson_content(task, lesson_data)
+        except SingleFlightTimeout:
+            yield sse_event('error', {'error': 'Lesson is still being generated, please retry shortly'})
+            return
+        except RateLimitExceeded as e:
+            yield sse_event('error', e.to_dict())
+            return
+    
+    yield sse_event('done', {
+        'task': task.to_dict(),
+        'lesson': lesson.to_dict(include_resources=True)
+    })
+
+
 @lessons_bp.route('/task/<int:task_id>/generate', methods=['POST'])
 @jwt_required()
+@rate_limited('lesson')
 def generate_lesson(task_id):
-    """Force regenerate lesson content with AI"""
+    """Force regenerate lesson content with AI; the new lesson is the task's own, the shared one is kept"""
     current_user_id = get_jwt_identity()
     
     task = Task.query.get(task_id)
     if not task or task.goal.user_id != current_user_id:
         return jsonify({'error': 'Task not found'}), 404
     
-    # Delete existing content
+    # Delete the task's previous override
     existing = LessonContent.query.filter_by(task_id=task_id).first()
     if existing:
         db.session.delete(existing)
         db.session.commit()
     
     # Generate new content
-    lesson = generate_lesson_content(task)
+    lesson = generate_lesson_content(task, override=True)
     
     return jsonify({
         'message': 'Lesson generated successfully',
@@ -68,8 +140,8 @@ def generate_lesson(task_id):
 @jwt_required()
 def get_quiz(task_id):
     """
-    Get quiz questions for a task
-    Auto-generates 5 questions if don't exist
+    Get quiz questions for a task: 5 questions sampled from the topic's quiz bank
+    Auto-generates the bank if it doesn't exist
     """
     current_user_id = get_jwt_identity()
     
@@ -78,11 +150,22 @@ def get_quiz(task_id):
         return jsonify({'error': 'Task not found'}), 404
     
     # Check if quiz exists
-    quizzes = Quiz.query.filter_by(task_id=task_id).all()
+    quizzes = LessonService.find_quiz(task)
     
-    if not quizzes or len(quizzes) == 0:
-        # Generate quiz using AI
-        quizzes = generate_quiz(task)
+    if not quizzes:
+        # Generate the quiz bank using AI (once, even for concurrent requests)
+        def generate():
+            rate_limiter.consume(current_user_id, 'quiz', count=LessonService.quiz_bank_size())
+            return generate_quiz(task)
+        
+        try:
+            quizzes = single_flight.do(
+                f'quiz:{LessonService.task_bank_key(task)}',
+                generate,
+                lambda: LessonService.find_quiz(task)
+            )
+        except SingleFlightTimeout:
+            return jsonify({'error': 'Quiz is still being generated, please retry shortly'}), 503
     
     return jsonify({
         'task_id': task_id,
@@ -114,18 +197,24 @@ def submit_quiz(task_id):
     correct_count = 0
     total_questions = len(answers)
     results = []
+    correct_ids, incorrect_ids = set(), set()
+    
+    quizzes = LessonService.quiz_questions_for(task, [a.get('quiz_id') for a in answers])
     
     for answer_data in answers:
         quiz_id = answer_data.get('quiz_id')
         user_answer = answer_data.get('answer', '').strip()
         
-        quiz = Quiz.query.get(quiz_id)
+        quiz = quizzes.get(quiz_id)
         if not quiz:
             continue
         
         is_correct = (user_answer.lower() == quiz.correct_answer.lower())
         if is_correct:
             correct_count += 1
+            correct_ids.add(quiz_id)
+        else:
+            incorrect_ids.add(quiz_id)
         
         # Save attempt
         attempt = QuizAttempt(
@@ -146,6 +235,8 @@ def submit_quiz(task_id):
             'explanation': quiz.explanation
         })
     
+    # Per-question correctness rates, for difficulty calibration
+    LessonService.record_quiz_results(correct_ids, incorrect_ids - correct_ids)
     db.session.commit()
     
     # Create assessment
@@ -199,154 +290,34 @@ def get_assessment(task_id):
 
 # Helper Functions
 
-def generate_lesson_content(task):
+def generate_lesson_content(task, override=False):
     """Generate lesson content using AI"""
     goal = task.goal
     
-    prompt = f"""Generate a detailed lesson for:
-Topic: {task.topic}
-Level: {goal.level}
-Goal: {goal.title}
+    # A regenerate must reach the AI, not the cached copy of the current lesson
+    lesson_data = AIService.generate_lesson(task.topic, goal.level, goal.title, refresh=override)
+    
+    return save_lesson_content(task, lesson_data, override)
 
-Provide:
-1. Comprehensive explanation (2-3 paragraphs)
-2. 3-5 key concepts (as array)
-3. Example code snippet (if applicable)
-4. Programming language used
 
-Return as JSON:
-{{
-  "explanation": "...",
-  "key_concepts": ["concept1", "concept2"],
-  "example_code": "...",
-  "programming_language": "python"
-}}
-"""
-    
+def save_lesson_content(task, lesson_data, override=False):
+    """Persist lesson content (placeholder if lesson_data is empty) with its resources"""
+    lesson = LessonService.add_lesson(task, lesson_data, override)
     try:
-        response = AIService.chat_with_ai(prompt, [])
-        # Parse JSON from response
-        lesson_data = json.loads(response)
-    except:
-        # Fallback to placeholder
-        lesson_data = {
-            "explanation": f"This lesson covers {task.topic}. You'll learn the fundamentals and practical applications.",
-            "key_concepts": ["Understanding basics", "Practical implementation", "Best practices"],
-            "example_code": "# Example code for " + task.topic,
-            "programming_language": "python"
-        }
-    
-    # Create lesson content
-    lesson = LessonContent(
-        task_id=task.id,
-        explanation=lesson_data.get('explanation', ''),
-        key_concepts=lesson_data.get('key_concepts', []),
-        example_code=lesson_data.get('example_code'),
-        programming_language=lesson_data.get('programming_language', 'python')
-    )
-    db.session.add(lesson)
-    db.session.commit()
-    
-    # Generate learning resources
-    generate_learning_resources(lesson, task)
+        db.session.commit()
+    except IntegrityError:
+        # Another worker stored the library lesson for this key first; use theirs
+        db.session.rollback()
+        lesson = LessonService.find_lesson(task)
     
     return lesson
 
 
-def generate_learning_resources(lesson, task):
-    """Generate YouTube video recommendations and resources"""
-    # For now, create placeholder resources
-    # In production, you'd use YouTube API or scraping
-    
-    resources_data = [
-        {
-            'type': 'video',
-            'title': f'{task.topic} - Complete Tutorial',
-            'url': f'https://www.youtube.com/results?search_query={task.topic.replace(" ", "+")}+tutorial',
-            'description': 'Comprehensive video tutorial',
-            'provider': 'youtube',
-            'order': 1
-        },
-        {
-            'type': 'video',
-            'title': f'{task.topic} - Beginner Guide',
-            'url': f'https://www.youtube.com/results?search_query={task.topic.replace(" ", "+")}+beginner',
-            'description': 'Beginner-friendly explanation',
-            'provider': 'youtube',
-            'order': 2
-        },
-        {
-            'type': 'article',
-            'title': f'{task.topic} - Documentation',
-            'url': f'https://www.google.com/search?q={task.topic.replace(" ", "+")}+documentation',
-            'description': 'Official documentation and guides',
-            'provider': 'google',
-            'order': 3
-        }
-    ]
-    
-    for res_data in resources_data:
-        resource = LearningResource(
-            lesson_id=lesson.id,
-            resource_type=res_data['type'],
-            title=res_data['title'],
-            url=res_data['url'],
-            description=res_data['description'],
-            provider=res_data['provider'],
-            recommended_order=res_data['order']
-        )
-        db.session.add(resource)
-    
-    db.session.commit()
-
-
 def generate_quiz(task):
-    """Generate 5 quiz questions using AI"""
-    prompt = f"""Generate 5 multiple-choice quiz questions for:
-Topic: {task.topic}
-Level: {task.goal.level}
-
-Return as JSON array:
-[
-  {{
-    "question": "What is...?",
-    "options": ["option_a", "option_b", "option_c", "option_d"],
-    "correct_answer": "option_a",
-    "explanation": "Explanation of answer",
-    "difficulty": "easy"
-  }}
-]
-"""
-    
-    try:
-        response = AIService.chat_with_ai(prompt, [])
-        questions = json.loads(response)
-    except:
-        # Fallback questions
-        questions = [
-            {
-                "question": f"What is the main concept of {task.topic}?",
-                "options": ["Option A", "Option B", "Option C", "Option D"],
-                "correct_answer": "Option A",
-                "explanation": "This covers the fundamental concept",
-                "difficulty": "easy"
-            }
-        ] * 5
-    
-    quizzes = []
-    for q_data in questions[:5]:  # Ensure only 5 questions
-        quiz = Quiz(
-            task_id=task.id,
-            question=q_data.get('question', ''),
-            question_type='multiple_choice',
-            options=q_data.get('options', []),
-            correct_answer=q_data.get('correct_answer', ''),
-            explanation=q_data.get('explanation', ''),
-            difficulty=q_data.get('difficulty', 'medium')
-        )
-        db.session.add(quiz)
-        quizzes.append(quiz)
+    """Fill the task's quiz bank using AI; returns the task's 5 questions"""
+    questions = AIService.generate_quiz_questions(task.topic, task.goal.level, count=LessonService.quiz_bank_size())
     
+    quizzes = LessonService.add_quiz(task, questions)
     db.session.commit()
     return quizzes
 
@@ -0,0 +1,219 @@
+"""
+AI Response Cache for SkillPilot AI
+Two-tier cache for AI completions: an in-process LRU in front of a database store
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from flask import has_app_context
+from sqlalchemy import delete, func, insert, select, update
+
+from models import db, AIResponseCache
+
+
+class AICache:
+    """Content-addressed cache for AI completions"""
+    
+    # Prune expired/excess database rows once every N writes
+    PRUNE_INTERVAL = 100
+    
+    def __init__(self, memory_size=512, ttl=7 * 24 * 3600, max_entries=50000, enabled=True):
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.app = None
+        
+        self._entries = OrderedDict()  # key -> (expires_at timestamp, response)
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._stats = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+            'errors': 0
+        }
+    
+    def init_app(self, app):
+        """Read cache settings from the Flask config"""
+        self.app = app
+        self.enabled = app.config.get('AI_CACHE_ENABLED', self.enabled)
+        self.ttl = app.config.get('AI_CACHE_TTL', self.ttl)
+        self.memory_size = app.config.get('AI_CACHE_MEMORY_SIZE', self.memory_size)
+        self.max_entries = app.config.get('AI_CACHE_MAX_ENTRIES', self.max_entries)
+    
+    @staticmethod
+    def normalize(text):
+        """Normalize prompt text so trivially different prompts share a key"""
+        return re.sub(r'\s+', ' ', str(text)).strip().lower()
+    
+    @staticmethod
+    def make_key(model, messages, **params):
+        """Build a stable cache key from the model, normalized messages and sampling params"""
+        payload = {
+            'model': model,
+            'messages': [
+                [msg['role'], AICache.normalize(msg['content'])]
+                for msg in messages
+            ],
+            'params': params
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        """Return a cached response or None"""
+        if not self.enabled:
+            return None
+        
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return response
+                del self._entries[key]
+        
+        row = self._db_get(key)
+        if row is not None:
+            response, expires_at = row
+            self._remember(key, response, expires_at.timestamp())
+            self._bump('db_hits')
+            return response
+        
+        self._bump('misses')
+        return None
+    
+    def set(self, key, model, response):
+        """Store a response in both tiers"""
+        if not self.enabled or not response:
+            return
+        
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+        self._remember(key, response, expires_at.timestamp())
+        self._db_set(key, model, response, expires_at)
+        self._bump('writes')
+    
+    def clear(self):
+        """Drop every cached entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+        
+        with self._context():
+            with db.engine.begin() as conn:
+                conn.execute(delete(AIResponseCache))
+    
+    def get_stats(self):
+        """Hit/miss counters for the cache"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._entries)
+        
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+    
+    # Internal helpers
+    
+    def _bump(self, counter, amount=1):
+        with self._lock:
+            self._stats[counter] += amount
+    
+    def _remember(self, key, response, expires_at):
+        """Insert into the in-process LRU, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (expires_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.memory_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+    
+    def _context(self):
+        """Database access needs an app context; push one when called off-request"""
+        if has_app_context() or self.app is None:
+            return nullcontext()
+        return self.app.app_context()
+    
+    def _db_get(self, key):
+        table = AIResponseCache.__table__
+        now = datetime.utcnow()
+        
+        try:
+            with self._context():
+                with db.engine.begin() as conn:
+                    row = conn.execute(
+                        select(table.c.response, table.c.expires_at).where(table.c.cache_key == key)
+                    ).first()
+                    
+                    if row is None:
+                        return None
+                    
+                    if row.expires_at <= now:
+                        conn.execute(delete(table).where(table.c.cache_key == key))
+                        return None
+                    
+                    conn.execute(
+                        update(table)
+                        .where(table.c.cache_key == key)
+                        .values(hit_count=table.c.hit_count + 1, last_accessed_at=now)
+                    )
+                    return row.response, row.expires_at
+        except Exception as e:
+            # A broken cache must never break generation
+            print(f"AI cache read failed: {str(e)}")
+            self._bump('errors')
+            return None
+    
+    def _db_set(self, key, model, response, expires_at):
+        table = AIResponseCache.__table__
+        now = datetime.utcnow()
+        
+        try:
+            with self._context():
+                with db.engine.begin() as conn:
+                    conn.execute(delete(table).where(table.c.cache_key == key))
+                    conn.execute(insert(table).values(
+                        cache_key=key,
+                        model=model,
+                        response=response,
+                        hit_count=0,
+                        created_at=now,
+                        expires_at=expires_at,
+                        last_accessed_at=now
+                    ))
+                    
+                    self._writes_since_prune += 1
+                    if self._writes_since_prune >= self.PRUNE_INTERVAL:
+                        self._writes_since_prune = 0
+                        self._db_prune(conn, now)
+        except Exception as e:
+            print(f"AI cache write failed: {str(e)}")
+            self._bump('errors')
+    
+    def _db_prune(self, conn, now):
+        """Delete expired rows, then the least recently used rows above max_entries"""
+        table = AIResponseCache.__table__
+        
+        conn.execute(delete(table).where(table.c.expires_at <= now))
+        
+        total = conn.execute(select(func.count()).select_from(table)).scalar()
+        excess = total - self.max_entries
+        if excess > 0:
+            oldest = select(table.c.id).order_by(table.c.last_accessed_at.asc()).limit(excess)
+            result = conn.execute(delete(table).where(table.c.id.in_(oldest.scalar_subquery())))
+            self._bump('evictions', result.rowcount or 0)
+
+
+# Shared cache instance
+ai_cache = AICache()
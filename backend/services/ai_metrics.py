@@ -0,0 +1,172 @@
+"""
+AI Metrics for SkillPilot AI
+Per-process counters for Groq calls: latency, tokens, outcomes and cache use,
+aggregated by call kind (roadmap, chat, lesson, ...) and model
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from services.circuit_breaker import CircuitOpenError
+
+
+# Latency histogram bucket upper bounds, in seconds (the last bucket is unbounded)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def classify_error(error):
+    """Outcome name for a failed AI call"""
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    if isinstance(error, TimeoutError) or 'Timeout' in type(error).__name__:
+        return 'timeout'
+    if getattr(error, 'status_code', None) == 429:
+        return 'rate_limited'
+    return 'error'
+
+
+class AICall:
+    """One tracked upstream call; the caller attaches token usage once the response arrives"""
+    
+    def __init__(self):
+        self.prompt_tokens = None
+        self.completion_tokens = None
+    
+    def set_usage(self, usage):
+        """Take token counts from a Groq/OpenAI usage object (ignored when missing)"""
+        if usage is None:
+            return
+        self.prompt_tokens = getattr(usage, 'prompt_tokens', None)
+        self.completion_tokens = getattr(usage, 'completion_tokens', None)
+
+
+class AIMetrics:
+    """
+    Aggregated AI call metrics
+    
+    Outcomes count upstream calls: ok, timeout, rate_limited, circuit_open (failed fast,
+    not sent) or error. parse_fallback counts ok calls whose response could not be used,
+    so a placeholder was served instead. Cache counts are hit / miss for cached request
+    kinds, topic_hit for answers to a rephrased topic, refresh for forced regenerations
+    and bypass for uncached kinds. Routes count why the model was called: primary,
+    cascade (an earlier model failed), or the reason the primary was passed over
+    (too_large, slow).
+    
+    State is per worker process, like the circuit breakers.
+    """
+    
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+    
+    def _get_series(self, kind, model):
+        key = (kind, model)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = {
+                'calls': 0,
+                'outcomes': {},
+                'cache': {},
+                'routes': {},
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'latency_sum': 0.0,
+                'latency_count': 0,
+                'latency_buckets': [0] * (len(LATENCY_BUCKETS) + 1)
+            }
+        return series
+    
+    def record_call(self, kind, model, outcome, latency=None, prompt_tokens=None, completion_tokens=None, route='primary'):
+        with self._lock:
+            series = self._get_series(kind, model)
+            series['calls'] += 1
+            series['outcomes'][outcome] = series['outcomes'].get(outcome, 0) + 1
+            series['routes'][route] = series['routes'].get(route, 0) + 1
+            series['prompt_tokens'] += prompt_tokens or 0
+            series['completion_tokens'] += completion_tokens or 0
+            
+            if latency is not None:
+                series['latency_sum'] += latency
+                series['latency_count'] += 1
+                bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+                series['latency_buckets'][bucket] += 1
+    
+    def record_cache(self, kind, model, status):
+        with self._lock:
+            cache = self._get_series(kind, model)['cache']
+            cache[status] = cache.get(status, 0) + 1
+    
+    def record_parse_fallback(self, kind, model):
+        with self._lock:
+            outcomes = self._get_series(kind, model)['outcomes']
+            outcomes['parse_fallback'] = outcomes.get('parse_fallback', 0) + 1
+    
+    @contextmanager
+    def track(self, kind, model, route='primary'):
+        """
+        Time one upstream call and record its outcome
+        
+        Yields an AICall for the token usage. Calls cancelled without an outcome
+        (client disconnect mid-stream) are not recorded.
+        """
+        call = AICall()
+        start = time.monotonic()
+        try:
+            yield call
+        except Exception as e:
+            outcome = classify_error(e)
+            # Calls refused by an open circuit never reached upstream; their latency is meaningless
+            latency = None if outcome == 'circuit_open' else time.monotonic() - start
+            self.record_call(kind, model, outcome, latency, route=route)
+            raise
+        self.record_call(kind, model, 'ok', time.monotonic() - start, call.prompt_tokens, call.completion_tokens, route)
+    
+    def snapshot(self):
+        """Counters per kind and model, with cumulative histogram buckets ("le" seconds)"""
+        with self._lock:
+            items = [(key, dict(series, outcomes=dict(series['outcomes']), cache=dict(series['cache']),
+                                routes=dict(series['routes']),
+                                latency_buckets=list(series['latency_buckets'])))
+                     for key, series in sorted(self._series.items())]
+        
+        kinds = {}
+        for (kind, model), series in items:
+            cumulative = 0
+            histogram = {}
+            for bound, count in zip(list(LATENCY_BUCKETS) + ['+Inf'], series['latency_buckets']):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            
+            count = series['latency_count']
+            kinds.setdefault(kind, {})[model] = {
+                'calls': series['calls'],
+                'outcomes': series['outcomes'],
+                'cache': series['cache'],
+                'routes': series['routes'],
+                'tokens': {
+                    'prompt': series['prompt_tokens'],
+                    'completion': series['completion_tokens'],
+                    'total': series['prompt_tokens'] + series['completion_tokens']
+                },
+                'latency': {
+                    'count': count,
+                    'avg_ms': round(series['latency_sum'] / count * 1000) if count else None,
+                    'buckets': histogram
+                }
+            }
+        
+        return {
+            'since': int(self.started_at),
+            'uptime_seconds': int(time.time() - self.started_at),
+            'kinds': kinds
+        }
+    
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.started_at = time.time()
+
+
+# Shared metrics instance
+ai_metrics = AIMetrics()
@@ -2,60 +2,457 @@
 AI Service for SkillPilot AI
 Handles Groq API integration for roadmap generation and chat
 """
+import asyncio
 import json
 import os
+import threading
+import time
+import weakref
 from decouple import config
+from flask import current_app, g, has_app_context, has_request_context
+
+from services.ai_cache import ai_cache, AICache
+from services.ai_metrics import ai_metrics
+from services.async_bridge import async_bridge
+from services.circuit_breaker import circuit_breakers, CircuitOpenError, is_upstream_failure
+from services.json_salvage import JSONArrayParser, repair_json, salvage_array
+from services.model_router import model_router
+from services.topic_cache import topic_cache
 
 # Try importing groq, handle if not installed
 try:
-    from groq import Groq
+    import httpx
+    from groq import Groq, AsyncGroq
     GROQ_AVAILABLE = True
 except ImportError:
     GROQ_AVAILABLE = False
 
 
+# Completion token limit per request kind (also the rate-limit weight of each call, see
+# AIService.max_tokens)
+MAX_TOKENS = {
+    'roadmap': 4000,
+    'chat': 500,
+    'summary': 300,
+    'simplify': 300,
+    'example': 500,
+    'lesson': 500,
+    'quiz': 500
+}
+
+# Questions per generated quiz
+QUIZ_QUESTIONS = 5
+
+CHAT_SYSTEM_PROMPT = "You are SkillPilot, a friendly AI learning assistant. Help users learn effectively, answer questions, and provide encouragement. Keep responses concise and helpful."
+
+
 class AIService:
     """Service for AI integration with Groq"""
     
-    # Groq client instance
+    # Groq client instance, owned by the process that created it (see _get_client)
     client = None
+    _client_pid = None
+    _client_lock = threading.Lock()
+    
+    # Flask app bound via init_app (settings and off-request app contexts)
+    app = None
+    
+    # Per event loop state: loop -> {'client': AsyncGroq, 'semaphore': asyncio.Semaphore}
+    # httpx async pools and semaphores are bound to the loop that first uses them
+    _async_state = weakref.WeakKeyDictionary()
+    
+    @staticmethod
+    def init_app(app):
+        """Bind the service (and its response cache) to the Flask app"""
+        AIService.app = app
+        ai_cache.init_app(app)
+        topic_cache.init_app(app)
+        model_router.init_app(app)
+    
+    @staticmethod
+    def _setting(name, default=None):
+        """Read a setting from the active (or bound) Flask app config"""
+        if has_app_context():
+            return current_app.config.get(name, default)
+        if AIService.app is not None:
+            return AIService.app.config.get(name, default)
+        return default
+    
+    @staticmethod
+    def _http_limits():
+        """Keep-alive connection pool size for a Groq client (per process, shared by its threads)"""
+        return httpx.Limits(
+            max_connections=AIService._setting('AI_HTTP_MAX_CONNECTIONS', 20),
+            max_keepalive_connections=AIService._setting('AI_HTTP_MAX_KEEPALIVE', 10),
+            keepalive_expiry=AIService._setting('AI_HTTP_KEEPALIVE_EXPIRY', 60.0)
+        )
     
     @staticmethod
     def initialize():
-        """Initialize Groq API key"""
-        if GROQ_AVAILABLE:
+        """Create the Groq client for this process, once, even with concurrent first requests"""
+        if not GROQ_AVAILABLE:
+            return
+        
+        with AIService._client_lock:
+            if AIService.client is not None and AIService._client_pid == os.getpid():
+                return
+            
             api_key = config('GROQ_API_KEY', default='')
             if api_key:
-                AIService.client = Groq(api_key=api_key)
+                # Retries compound the adaptive timeout; the circuit breaker handles outages
+                AIService.client = Groq(
+                    api_key=api_key,
+                    base_url=AIService._setting('GROQ_BASE_URL') or None,
+                    max_retries=AIService._setting('AI_MAX_RETRIES', 1),
+                    http_client=httpx.Client(limits=AIService._http_limits())
+                )
+                AIService._client_pid = os.getpid()
     
     @staticmethod
     def _get_client():
-        """Get or initialize Groq client"""
-        if AIService.client is None and GROQ_AVAILABLE:
+        """Get the Groq client, creating it on first use in this process (including after a fork)"""
+        if GROQ_AVAILABLE and (AIService.client is None or AIService._client_pid != os.getpid()):
             AIService.initialize()
         return AIService.client
     
     @staticmethod
-    def generate_roadmap(goal_title, goal_level, goal_duration_days=30):
+    def reset_client():
         """
-        Generate a structured 30-day roadmap using OpenAI
+        Forget clients inherited from a parent process (call right after fork)
         
-        Args:
-            goal_title: Title of the learning goal
-            goal_level: Level (beginner, intermediate, advanced)
-            goal_duration_days: Number of days for the roadmap
+        Their pooled sockets belong to the parent and must not be shared; they are
+        dropped, not closed, so the parent's connections stay intact. The lock is
+        replaced too, in case another parent thread held it during the fork.
+        """
+        AIService._client_lock = threading.Lock()
+        AIService.client = None
+        AIService._client_pid = None
+        AIService._async_state = weakref.WeakKeyDictionary()
+    
+    @staticmethod
+    def warm_up(timeout=5.0):
+        """
+        Open the pooled connections (DNS, TCP, TLS) before the first request needs them
+        
+        Makes one cheap models-list call per client (sync, and async on the shared
+        bridge loop). Failures only log; the clients still work lazily.
         
         Returns:
-            List of tasks with day, topic, estimated_time
-            Falls back to placeholder roadmap if AI fails
+            True if the sync client got an answer
         """
         client = AIService._get_client()
-        if not client:
-            return AIService._generate_placeholder_roadmap(goal_title, goal_level, goal_duration_days)
+        if client is None:
+            return False
         
+        started = time.monotonic()
         try:
-            prompt = f"""Generate a structured {goal_duration_days}-day learning roadmap for the following goal.
+            client.models.list(timeout=timeout)
+        except Exception as e:
+            print(f"[ERROR] Groq warm-up failed: {str(e)}")
+            return False
+        
+        try:
+            AIService.run_sync(AIService._awarm_up(timeout), timeout + 1)
+        except Exception as e:
+            print(f"[ERROR] Groq async warm-up failed: {str(e)}")
+        
+        print(f"[DEBUG] Groq clients warmed up in {int((time.monotonic() - started) * 1000)} ms (pid {os.getpid()})")
+        return True
+    
+    @staticmethod
+    async def _awarm_up(timeout):
+        state = AIService._get_async_state()
+        if state['client']:
+            await state['client'].models.list(timeout=timeout)
+    
+    @staticmethod
+    def _get_async_state():
+        """Get or create the async client and concurrency semaphore for the running loop"""
+        loop = asyncio.get_running_loop()
+        state = AIService._async_state.get(loop)
+        
+        if state is None:
+            client = None
+            api_key = config('GROQ_API_KEY', default='')
+            if GROQ_AVAILABLE and api_key:
+                client = AsyncGroq(
+                    api_key=api_key,
+                    base_url=AIService._setting('GROQ_BASE_URL') or None,
+                    max_retries=AIService._setting('AI_MAX_RETRIES', 1),
+                    http_client=httpx.AsyncClient(limits=AIService._http_limits())
+                )
             
+            state = {
+                'client': client,
+                'semaphore': asyncio.Semaphore(AIService._setting('AI_MAX_CONCURRENCY', 8))
+            }
+            AIService._async_state[loop] = state
+        
+        return state
+    
+    @staticmethod
+    def _breaker(model):
+        """Circuit breaker and latency tracker for a model"""
+        return circuit_breakers.get(
+            model,
+            failure_threshold=AIService._setting('AI_BREAKER_FAILURE_THRESHOLD', 5),
+            reset_timeout=AIService._setting('AI_BREAKER_RESET_TIMEOUT', 30),
+            timeout_multiplier=AIService._setting('AI_TIMEOUT_P95_MULTIPLIER', 2.0),
+            min_timeout=AIService._setting('AI_TIMEOUT_MIN', 5.0),
+            max_timeout=AIService._setting('AI_TIMEOUT_MAX', 60.0),
+            default_timeout=AIService._setting('AI_TIMEOUT_DEFAULT', 30.0)
+        )
+    
+    @staticmethod
+    def get_health():
+        """Circuit breaker state per model, for /health"""
+        return {
+            'available': AIService.is_available(),
+            'degraded': circuit_breakers.any_open(),
+            'models': circuit_breakers.get_stats()
+        }
+    
+    @staticmethod
+    def is_available():
+        """Whether AI calls can be made (sync or async)"""
+        return AIService._get_client() is not None
+    
+    @staticmethod
+    def _model(kind):
+        """Primary model for a request kind, from the AI_MODEL_ROUTES routing table"""
+        return model_router.primary(kind)
+    
+    @staticmethod
+    def _should_cascade(error):
+        """Whether a failed attempt should move on to the next model of the route"""
+        return is_upstream_failure(error) or getattr(error, 'status_code', None) == 413
+    
+    @staticmethod
+    def _attempts(kind, model, messages, max_tokens):
+        """(model, route reason, timeout) for each attempt of a call, see ModelRouter"""
+        plan = model_router.plan(kind, model, messages, max_tokens, AIService._breaker)
+        return model_router.attempts(kind, plan, AIService._breaker)
+    
+    @staticmethod
+    def max_tokens(kind, count=None):
+        """Completion token limit of a request kind; quiz requests get room for `count` questions"""
+        limit = MAX_TOKENS.get(kind, MAX_TOKENS['chat'])
+        if kind == 'quiz' and count:
+            limit = max(limit, limit * count // QUIZ_QUESTIONS)
+        return limit
+    
+    @staticmethod
+    def _note_upstream_call():
+        """Mark the running request as having called Groq; rate_limited refunds views that did not"""
+        if has_request_context():
+            g.ai_upstream_called = True
+    
+    @staticmethod
+    def _complete(model, messages, temperature=0.7, max_tokens=500, use_cache=False, validate=None, kind='chat', refresh=False):
+        """
+        Run a chat completion and return the response text
+        
+        Args:
+            model: Groq model the request was built for (the route's primary model)
+            messages: Chat messages
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            use_cache: Serve/store the response through the AI response cache
+            validate: Optional callable; responses are only cached when it returns True
+            kind: Request kind (MAX_TOKENS key) used for routing and ai_metrics
+            refresh: With use_cache, skip the cached answer but store the new one
+        
+        The call cascades through the kind's route (open circuit, upstream failure or
+        missed deadline moves on to the next model). Raises the last failure when no
+        model answered, so callers can pick their own deterministic fallback.
+        """
+        cache_key = None
+        if use_cache:
+            cache_key = AICache.make_key(model, messages, temperature=temperature, max_tokens=max_tokens)
+            cached = None if refresh else ai_cache.get(cache_key)
+            ai_metrics.record_cache(kind, model, 'refresh' if refresh else 'miss' if cached is None else 'hit')
+            if cached is not None:
+                return cached
+        else:
+            ai_metrics.record_cache(kind, model, 'bypass')
+        
+        client = AIService._get_client()
+        if not client:
+            raise RuntimeError("Groq client is not configured")
+        
+        AIService._note_upstream_call()
+        last_error = CircuitOpenError(f"No model available for {kind}")
+        for attempt_model, route, timeout in AIService._attempts(kind, model, messages, max_tokens):
+            breaker = AIService._breaker(attempt_model)
+            try:
+                with ai_metrics.track(kind, attempt_model, route) as call, breaker.guard():
+                    response = client.chat.completions.create(
+                        model=attempt_model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        timeout=timeout
+                    )
+                    call.set_usage(getattr(response, 'usage', None))
+            except Exception as e:
+                if not AIService._should_cascade(e):
+                    raise
+                last_error = e
+                continue
+            
+            text = response.choices[0].message.content.strip()
+            
+            # Answers from fallback models are served but not cached under the primary
+            if cache_key and attempt_model == model and (validate is None or validate(text)):
+                ai_cache.set(cache_key, model, text)
+            
+            return text
+        
+        raise last_error
+    
+    @staticmethod
+    async def _acomplete(model, messages, temperature=0.7, max_tokens=500, use_cache=False, validate=None, kind='chat'):
+        """Async counterpart of _complete, bounded by the AI_MAX_CONCURRENCY semaphore"""
+        cache_key = None
+        if use_cache:
+            cache_key = AICache.make_key(model, messages, temperature=temperature, max_tokens=max_tokens)
+            cached = await asyncio.to_thread(ai_cache.get, cache_key)
+            ai_metrics.record_cache(kind, model, 'miss' if cached is None else 'hit')
+            if cached is not None:
+                return cached
+        else:
+            ai_metrics.record_cache(kind, model, 'bypass')
+        
+        state = AIService._get_async_state()
+        if not state['client']:
+            raise RuntimeError("Groq client is not configured")
+        
+        last_error = CircuitOpenError(f"No model available for {kind}")
+        async with state['semaphore']:
+            for attempt_model, route, timeout in AIService._attempts(kind, model, messages, max_tokens):
+                breaker = AIService._breaker(attempt_model)
+                try:
+                    # Latency is measured inside the semaphore, queueing time is not upstream time
+                    with ai_metrics.track(kind, attempt_model, route) as call, breaker.guard():
+                        response = await state['client'].chat.completions.create(
+                            model=attempt_model,
+                            messages=messages,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            timeout=timeout
+                        )
+                        call.set_usage(getattr(response, 'usage', None))
+                except Exception as e:
+                    if not AIService._should_cascade(e):
+                        raise
+                    last_error = e
+                    continue
+                
+                text = response.choices[0].message.content.strip()
+                
+                if cache_key and attempt_model == model and (validate is None or validate(text)):
+                    await asyncio.to_thread(ai_cache.set, cache_key, model, text)
+                
+                return text
+        
+        raise last_error
+    
+    @staticmethod
+    def _stream(model, messages, temperature=0.7, max_tokens=500, use_cache=False, validate=None, kind='chat'):
+        """
+        Stream a chat completion, yielding text deltas as they arrive
+        
+        A cache hit is yielded as a single chunk. Closing the generator (e.g. on client
+        disconnect) closes the upstream HTTP stream so no further tokens are paid for.
+        The route cascades like _complete, but only until the first chunk was yielded.
+        """
+        cache_key = None
+        if use_cache:
+            cache_key = AICache.make_key(model, messages, temperature=temperature, max_tokens=max_tokens)
+            cached = ai_cache.get(cache_key)
+            ai_metrics.record_cache(kind, model, 'miss' if cached is None else 'hit')
+            if cached is not None:
+                yield cached
+                return
+        else:
+            ai_metrics.record_cache(kind, model, 'bypass')
+        
+        client = AIService._get_client()
+        if not client:
+            raise RuntimeError("Groq client is not configured")
+        
+        AIService._note_upstream_call()
+        last_error = CircuitOpenError(f"No model available for {kind}")
+        for attempt_model, route, timeout in AIService._attempts(kind, model, messages, max_tokens):
+            breaker = AIService._breaker(attempt_model)
+            chunks = []
+            try:
+                with ai_metrics.track(kind, attempt_model, route) as call, breaker.guard(record_latency=False):
+                    # The timeout bounds connecting and each wait between chunks
+                    stream = client.chat.completions.create(
+                        model=attempt_model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        stream=True,
+                        timeout=timeout
+                    )
+                    
+                    try:
+                        for chunk in stream:
+                            # Groq reports token usage on the final chunk
+                            call.set_usage(getattr(getattr(chunk, 'x_groq', None), 'usage', None))
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta.content
+                            if delta:
+                                chunks.append(delta)
+                                yield delta
+                    finally:
+                        if hasattr(stream, 'close'):
+                            stream.close()
+            except Exception as e:
+                if chunks or not AIService._should_cascade(e):
+                    raise
+                last_error = e
+                continue
+            
+            text = ''.join(chunks).strip()
+            if cache_key and attempt_model == model and (validate is None or validate(text)):
+                ai_cache.set(cache_key, model, text)
+            return
+        
+        raise last_error
+    
+    @staticmethod
+    def run_sync(coro, timeout=None):
+        """Run an AIService coroutine from synchronous code via the shared event loop bridge"""
+        return async_bridge.run(coro, timeout)
+    
+    @staticmethod
+    async def agather(*aws):
+        """
+        Fan out several AIService coroutines in parallel
+        
+        Concurrency is bounded by the AI_MAX_CONCURRENCY semaphore; a failure in one
+        call is returned in its slot instead of cancelling the others
+        """
+        return await asyncio.gather(*aws, return_exceptions=True)
+    
+    @staticmethod
+    def _parse_response(request, text, parse):
+        """Parse a response with `parse`, recording a parse fallback in ai_metrics when it returns None"""
+        result = parse(text)
+        if result is None:
+            ai_metrics.record_parse_fallback(request['kind'], request['model'])
+        return result
+    
+    # Roadmaps
+    
+    @staticmethod
+    def _roadmap_request(goal_title, goal_level, goal_duration_days):
+        prompt = f"""Generate a structured {goal_duration_days}-day learning roadmap for the following goal.
+
 Goal: {goal_title}
 Level: {goal_level}
 
@@ -71,30 +468,223 @@ Example format:
 ]
 
 IMPORTANT: Return ONLY the JSON array, no other text. Ensure all {goal_duration_days} days are included."""
+        
+        def is_valid(text):
+            return AIService._parse_roadmap(text, goal_duration_days) is not None
+        
+        return {
+            'model': AIService._model('roadmap'),
+            'messages': [
+                {"role": "system", "content": "You are an expert curriculum designer. Generate learning roadmaps as JSON arrays only."},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.7,
+            'max_tokens': MAX_TOKENS['roadmap'],
+            'use_cache': True,
+            'kind': 'roadmap',
+            'validate': is_valid
+        }
+    
+    @staticmethod
+    def _roadmap_followup_request(goal_title, goal_level, goal_duration_days, known):
+        """Request for only the days missing from `known` (day -> item), with the planned days as context"""
+        missing = [day for day in range(1, goal_duration_days + 1) if day not in known]
+        planned = "\n".join(f"Day {day}: {known[day]['topic']}" for day in sorted(known))
+        prompt = f"""Complete a {goal_duration_days}-day learning roadmap for the following goal. Some days are already planned.
+
+Goal: {goal_title}
+Level: {goal_level}
+
+Already planned:
+{planned}
+
+Return ONLY a valid JSON array with one object for each of these days: {', '.join(str(day) for day in missing)}. Each object must have:
+- "day": day number
+- "topic": specific topic to learn (string), continuing the plan above
+- "estimated_time": estimated time in minutes (integer, typically {30}-120)
 
-            response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "You are an expert curriculum designer. Generate learning roadmaps as JSON arrays only."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=4000
-            )
+IMPORTANT: Return ONLY the JSON array, no other text. Do not repeat the planned days."""
+        
+        return {
+            'model': AIService._model('roadmap'),
+            'messages': [
+                {"role": "system", "content": "You are an expert curriculum designer. Generate learning roadmaps as JSON arrays only."},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.7,
+            'max_tokens': MAX_TOKENS['roadmap'],
+            'kind': 'roadmap'
+        }
+    
+    @staticmethod
+    def _roadmap_item(raw, goal_duration_days):
+        """Normalized roadmap item from a parsed array element, None if unusable"""
+        if not isinstance(raw, dict):
+            return None
+        try:
+            day = int(raw.get('day'))
+        except (TypeError, ValueError):
+            return None
+        
+        topic = raw.get('topic')
+        if not 1 <= day <= goal_duration_days or not isinstance(topic, str) or not topic.strip():
+            return None
+        
+        try:
+            estimated_time = int(raw.get('estimated_time', 45))
+        except (TypeError, ValueError):
+            estimated_time = 45
+        
+        return {'day': day, 'topic': topic.strip(), 'estimated_time': estimated_time}
+    
+    @staticmethod
+    def _merge_roadmap_items(known, elements, goal_duration_days):
+        """Add valid elements for days not in `known` (day -> item); returns the added items"""
+        added = []
+        for raw in elements:
+            item = AIService._roadmap_item(raw, goal_duration_days)
+            if item and item['day'] not in known:
+                known[item['day']] = item
+                added.append(item)
+        return added
+    
+    @staticmethod
+    def _parse_roadmap(text, goal_duration_days):
+        """Complete roadmap salvaged from a response (fences, chatter and bad elements tolerated); None if days are missing"""
+        known = {}
+        AIService._merge_roadmap_items(known, salvage_array(text), goal_duration_days)
+        if len(known) < goal_duration_days:
+            return None
+        return [known[day] for day in range(1, goal_duration_days + 1)]
+    
+    @staticmethod
+    def _finish_roadmap(request, known, goal_duration_days, placeholder, followed_up):
+        """
+        Roadmap from the salvaged days
+        
+        Complete roadmaps assembled with a follow-up call are cached under the original
+        request. Incomplete ones fill the missing days from the placeholder, or return
+        None without one.
+        """
+        if len(known) >= goal_duration_days:
+            roadmap = [known[day] for day in range(1, goal_duration_days + 1)]
+            if followed_up:
+                ai_cache.set(
+                    AICache.make_key(request['model'], request['messages'],
+                                     temperature=request['temperature'], max_tokens=request['max_tokens']),
+                    request['model'],
+                    json.dumps(roadmap)
+                )
+            return roadmap
+        
+        ai_metrics.record_parse_fallback(request['kind'], request['model'])
+        if placeholder is None:
+            return None
+        return [known.get(item['day'], item) for item in placeholder]
+    
+    @staticmethod
+    def generate_roadmap(goal_title, goal_level, goal_duration_days=30, fallback=True):
+        """
+        Generate a structured 30-day roadmap using OpenAI
+        
+        Valid days are salvaged from a malformed or truncated response; only the
+        missing days are then requested, in one follow-up call.
+        
+        Args:
+            goal_title: Title of the learning goal
+            goal_level: Level (beginner, intermediate, advanced)
+            goal_duration_days: Number of days for the roadmap
+            fallback: Fill days the AI did not provide from a placeholder roadmap (otherwise return None)
+        
+        Returns:
+            List of tasks with day, topic, estimated_time
+            Falls back to placeholder roadmap if AI fails
+        """
+        placeholder = AIService._generate_placeholder_roadmap(goal_title, goal_level, goal_duration_days) if fallback else None
+        
+        if not AIService._get_client():
+            return placeholder
+        
+        request = AIService._roadmap_request(goal_title, goal_level, goal_duration_days)
+        known = {}
+        followed_up = False
+        try:
+            AIService._merge_roadmap_items(known, salvage_array(AIService._complete(**request)), goal_duration_days)
             
-            # Parse response
-            roadmap_text = response.choices[0].message.content.strip()
-            roadmap = json.loads(roadmap_text)
+            if 0 < len(known) < goal_duration_days:
+                print(f"[DEBUG] Roadmap response has {len(known)}/{goal_duration_days} days, requesting the rest")
+                followed_up = True
+                followup = AIService._roadmap_followup_request(goal_title, goal_level, goal_duration_days, known)
+                AIService._merge_roadmap_items(known, salvage_array(AIService._complete(**followup)), goal_duration_days)
+        
+        except Exception as e:
+            print(f"AI roadmap generation failed: {str(e)}")
+            if not known:
+                return placeholder
+        
+        return AIService._finish_roadmap(request, known, goal_duration_days, placeholder, followed_up)
+    
+    @staticmethod
+    async def agenerate_roadmap(goal_title, goal_level, goal_duration_days=30, fallback=True):
+        """Async variant of generate_roadmap"""
+        placeholder = AIService._generate_placeholder_roadmap(goal_title, goal_level, goal_duration_days) if fallback else None
+        
+        if not AIService.is_available():
+            return placeholder
+        
+        request = AIService._roadmap_request(goal_title, goal_level, goal_duration_days)
+        known = {}
+        followed_up = False
+        try:
+            AIService._merge_roadmap_items(known, salvage_array(await AIService._acomplete(**request)), goal_duration_days)
             
-            # Validate roadmap
-            if isinstance(roadmap, list) and len(roadmap) == goal_duration_days:
-                return roadmap
-            else:
-                return AIService._generate_placeholder_roadmap(goal_title, goal_level, goal_duration_days)
+            if 0 < len(known) < goal_duration_days:
+                followed_up = True
+                followup = AIService._roadmap_followup_request(goal_title, goal_level, goal_duration_days, known)
+                AIService._merge_roadmap_items(known, salvage_array(await AIService._acomplete(**followup)), goal_duration_days)
         
         except Exception as e:
             print(f"AI roadmap generation failed: {str(e)}")
-            return AIService._generate_placeholder_roadmap(goal_title, goal_level, goal_duration_days)
+            if not known:
+                return placeholder
+        
+        # May write the response cache (database), so keep it off the event loop
+        return await asyncio.to_thread(AIService._finish_roadmap, request, known, goal_duration_days, placeholder, followed_up)
+    
+    @staticmethod
+    def stream_roadmap(goal_title, goal_level, goal_duration_days=30, known=None):
+        """
+        Streaming roadmap generation; yields each valid day item as soon as it arrives
+        
+        Days in `known` (day -> item, e.g. tasks saved by an interrupted attempt) are
+        not requested again. Days the response misses or garbles are requested in one
+        follow-up call; if that also comes back incomplete the generator just ends, so
+        the caller can check what is still missing.
+        
+        Raises on upstream failure (items already yielded stay valid)
+        """
+        known = dict(known or {})
+        resumed = bool(known)
+        if resumed:
+            request = AIService._roadmap_followup_request(goal_title, goal_level, goal_duration_days, known)
+        else:
+            request = AIService._roadmap_request(goal_title, goal_level, goal_duration_days)
+        first_request = request
+        
+        for attempt in range(2):
+            parser = JSONArrayParser()
+            for delta in AIService._stream(**request):
+                yield from AIService._merge_roadmap_items(known, parser.feed(delta), goal_duration_days)
+            yield from AIService._merge_roadmap_items(known, parser.close(), goal_duration_days)
+            
+            if len(known) >= goal_duration_days or attempt == 1 or not known:
+                break
+            print(f"[DEBUG] Roadmap stream has {len(known)}/{goal_duration_days} days, requesting the rest")
+            request = AIService._roadmap_followup_request(goal_title, goal_level, goal_duration_days, known)
+        
+        # Records an incomplete result, caches a complete one assembled with a follow-up
+        followed_up = request is not first_request and not resumed
+        AIService._finish_roadmap(first_request, known, goal_duration_days, None, followed_up)
     
     @staticmethod
     def _generate_placeholder_roadmap(goal_title, goal_level, days=30):
@@ -115,49 +705,63 @@ IMPORTANT: Return ONLY the JSON array, no other text. Ensure all {goal_duration_
         
         return roadmap
     
+    # Chat
+    
+    @staticmethod
+    def _chat_request(message, conversation_history, summary=None):
+        messages = [
+            {"role": "system", "content": CHAT_SYSTEM_PROMPT}
+        ]
+        
+        # Older context, condensed by ConversationMemory
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation with this learner:\n{summary}"})
+        
+        # Add conversation history (already trimmed to the prompt token budget by the caller)
+        for msg in conversation_history or []:
+            if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
+                messages.append({"role": msg['role'], "content": msg['content']})
+        
+        # Add current message
+        messages.append({"role": "user", "content": message})
+        
+        return {
+            'model': AIService._model('chat'),
+            'messages': messages,
+            'temperature': 0.7,
+            'max_tokens': MAX_TOKENS['chat'],
+            'kind': 'chat'
+        }
+    
     @staticmethod
-    def chat_with_ai(message, conversation_history=None):
+    def chat_with_ai(message, conversation_history=None, summary=None):
         """
         Send a message to Groq and get a response
         
         Args:
             message: User message
-            conversation_history: List of previous messages for context
+            conversation_history: Previous messages for context, oldest first, without the current message
+            summary: Rolling summary of the conversation before conversation_history
         
         Returns:
             AI response text
         """
-        client = AIService._get_client()
-        if not client:
+        if not AIService._get_client():
             return "AI service is not available. Please check your Groq API configuration."
         
         try:
-            messages = [
-                {"role": "system", "content": "You are SkillPilot, a friendly AI learning assistant. Help users learn effectively, answer questions, and provide encouragement. Keep responses concise and helpful."}
-            ]
-            
-            # Add conversation history (only last 8 messages, excluding current user message)
-            if conversation_history:
-                # Filter out the last message (current user message already added)
-                history = conversation_history[-9:-1] if len(conversation_history) > 1 else []
-                for msg in history:
-                    if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
-                        messages.append({"role": msg['role'], "content": msg['content']})
-            
-            # Add current message
-            messages.append({"role": "user", "content": message})
+            request = AIService._chat_request(message, conversation_history, summary)
             
-            print(f"[DEBUG] Sending {len(messages)} messages to Groq")
+            print(f"[DEBUG] Sending {len(request['messages'])} messages to Groq")
             
-            response = client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=500
-            )
+            response_text = AIService._complete(**request)
             
             print(f"[DEBUG] Got response from Groq successfully")
-            return response.choices[0].message.content.strip()
+            return response_text
+        
+        except CircuitOpenError as e:
+            print(f"[ERROR] AI chat skipped: {str(e)}")
+            return "Sorry, I'm having trouble processing your request. Please try again later."
         
         except Exception as e:
             import traceback
@@ -166,16 +770,94 @@ IMPORTANT: Return ONLY the JSON array, no other text. Ensure all {goal_duration_
             return "Sorry, I'm having trouble processing your request. Please try again later."
     
     @staticmethod
-    def simplify_concept(concept, explanation_level='beginner'):
+    async def achat_with_ai(message, conversation_history=None, summary=None):
+        """Async variant of chat_with_ai"""
+        if not AIService.is_available():
+            return "AI service is not available. Please check your Groq API configuration."
+        
+        try:
+            return await AIService._acomplete(**AIService._chat_request(message, conversation_history, summary))
+        
+        except Exception as e:
+            print(f"[ERROR] AI chat failed: {str(e)}")
+            return "Sorry, I'm having trouble processing your request. Please try again later."
+    
+    @staticmethod
+    def stream_chat(message, conversation_history=None, summary=None):
         """
-        Break down a complex concept into easy-to-understand explanation
+        Streaming variant of chat_with_ai; yields response text chunks
+        
+        A failure before the first chunk yields the apology instead; once text was sent
+        the error is raised, so the caller can tell a truncated reply from a complete one
         """
-        client = AIService._get_client()
-        if not client:
-            return f"Unable to simplify '{concept}' at this time."
+        if not AIService._get_client():
+            yield "AI service is not available. Please check your Groq API configuration."
+            return
+        
+        sent_any = False
+        try:
+            for delta in AIService._stream(**AIService._chat_request(message, conversation_history, summary)):
+                sent_any = True
+                yield delta
+        
+        except Exception as e:
+            print(f"[ERROR] AI chat stream failed: {str(e)}")
+            if sent_any:
+                raise
+            yield "Sorry, I'm having trouble processing your request. Please try again later."
+    
+    @staticmethod
+    def _summary_request(previous_summary, messages):
+        transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in messages)
+        prompt = f"""Update the running summary of a conversation between a learner and their AI learning assistant.
+
+Current summary:
+{previous_summary or '(none yet)'}
+
+New messages:
+{transcript}
+
+Write the updated summary in at most 150 words. Keep what the learner is studying, their level,
+questions they asked, what was explained, and anything they struggled with. Return only the summary."""
+        
+        return {
+            'model': AIService._model('summary'),
+            'messages': [
+                {"role": "system", "content": "You maintain concise conversation summaries."},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.3,
+            'max_tokens': MAX_TOKENS['summary'],
+            'kind': 'summary'
+        }
+    
+    @staticmethod
+    def summarize_conversation(previous_summary, messages):
+        """
+        Fold messages into a conversation's rolling summary
+        
+        Args:
+            previous_summary: Current summary text (may be empty)
+            messages: List of {"role", "content"} dicts, oldest first
+        
+        Returns:
+            Updated summary text, None if AI is unavailable or failed
+        """
+        if not AIService._get_client():
+            return None
         
         try:
-            prompt = f"""Explain the following concept in a simple way suitable for a {explanation_level}:
+            return AIService._complete(**AIService._summary_request(previous_summary, messages)) or None
+        
+        except Exception as e:
+            print(f"Conversation summary failed: {str(e)}")
+            return None
+    
+    # Concept simplification
+    
+    @staticmethod
+    def _simplify_request(concept, explanation_level):
+        prompt = f"""Explain the following concept in a simple way suitable for a {explanation_level}:
 
 Concept: {concept}
 
@@ -185,19 +867,393 @@ Provide:
 3. A memory tip or analogy
 
 Keep it beginner-friendly and encouraging."""
-
-            response = client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[
-                    {"role": "system", "content": "You are an expert educator who explains complex concepts simply."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=300
-            )
-            
-            return response.choices[0].message.content.strip()
+        
+        return {
+            'model': AIService._model('simplify'),
+            'messages': [
+                {"role": "system", "content": "You are an expert educator who explains complex concepts simply."},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.7,
+            'max_tokens': MAX_TOKENS['simplify'],
+            'use_cache': True,
+            'kind': 'simplify'
+        }
+    
+    @staticmethod
+    def simplify_concept(concept, explanation_level='beginner'):
+        """
+        Break down a complex concept into easy-to-understand explanation
+        
+        Rephrasings of an already simplified concept ("What are closures?",
+        "closures") are answered from the topic cache
+        """
+        request = AIService._simplify_request(concept, explanation_level)
+        namespace = f"simplify:{explanation_level}"
+        cached = topic_cache.lookup(namespace, concept)
+        if cached is not None:
+            ai_metrics.record_cache('simplify', request['model'], 'topic_hit')
+            return cached
+        
+        if not AIService._get_client():
+            return f"Unable to simplify '{concept}' at this time."
+        
+        try:
+            explanation = AIService._complete(**request)
+            topic_cache.add(namespace, concept, explanation, request['model'])
+            return explanation
         
         except Exception as e:
             print(f"Concept simplification failed: {str(e)}")
             return f"Unable to simplify '{concept}' at this time."
+    
+    @staticmethod
+    async def asimplify_concept(concept, explanation_level='beginner'):
+        """Async variant of simplify_concept"""
+        request = AIService._simplify_request(concept, explanation_level)
+        namespace = f"simplify:{explanation_level}"
+        # The topic cache reads and writes the database, like _acomplete's cache calls
+        cached = await asyncio.to_thread(topic_cache.lookup, namespace, concept)
+        if cached is not None:
+            ai_metrics.record_cache('simplify', request['model'], 'topic_hit')
+            return cached
+        
+        if not AIService.is_available():
+            return f"Unable to simplify '{concept}' at this time."
+        
+        try:
+            explanation = await AIService._acomplete(**request)
+            await asyncio.to_thread(topic_cache.add, namespace, concept, explanation, request['model'])
+            return explanation
+        
+        except Exception as e:
+            print(f"Concept simplification failed: {str(e)}")
+            return f"Unable to simplify '{concept}' at this time."
+    
+    # Code examples
+    
+    @staticmethod
+    def _example_request(topic, language):
+        prompt = f"""Generate a practical, beginner-friendly code example for: {topic}
+
+Programming Language: {language}
+
+Requirements:
+1. Keep it simple and under 20 lines
+2. Include comments explaining each step
+3. Show a real-world use case
+4. Make it runnable/executable
+
+Format as a code block with clear explanation before and after."""
+        
+        return {
+            'model': AIService._model('example'),
+            'messages': [
+                {"role": "system", "content": "You are an expert programmer who creates clear code examples."},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.7,
+            'max_tokens': MAX_TOKENS['example'],
+            'use_cache': True,
+            'kind': 'example'
+        }
+    
+    @staticmethod
+    def generate_example(topic, language='javascript'):
+        """
+        Generate a practical code example for a topic in a programming language
+        
+        Repeats of a (topic, language) pair are served from the response cache, and
+        rephrased topics from the topic cache
+        """
+        request = AIService._example_request(topic, language)
+        namespace = f"example:{language}"
+        cached = topic_cache.lookup(namespace, topic)
+        if cached is not None:
+            ai_metrics.record_cache('example', request['model'], 'topic_hit')
+            return cached
+        
+        if not AIService._get_client():
+            return f"Unable to generate an example for '{topic}' at this time."
+        
+        try:
+            example = AIService._complete(**request)
+            topic_cache.add(namespace, topic, example, request['model'])
+            return example
+        
+        except Exception as e:
+            print(f"Example generation failed: {str(e)}")
+            return f"Unable to generate an example for '{topic}' at this time."
+    
+    @staticmethod
+    async def agenerate_example(topic, language='javascript'):
+        """Async variant of generate_example"""
+        request = AIService._example_request(topic, language)
+        namespace = f"example:{language}"
+        cached = await asyncio.to_thread(topic_cache.lookup, namespace, topic)
+        if cached is not None:
+            ai_metrics.record_cache('example', request['model'], 'topic_hit')
+            return cached
+        
+        if not AIService.is_available():
+            return f"Unable to generate an example for '{topic}' at this time."
+        
+        try:
+            example = await AIService._acomplete(**request)
+            await asyncio.to_thread(topic_cache.add, namespace, topic, example, request['model'])
+            return example
+        
+        except Exception as e:
+            print(f"Example generation failed: {str(e)}")
+            return f"Unable to generate an example for '{topic}' at this time."
+    
+    # Lessons
+    
+    @staticmethod
+    def _lesson_request(topic, level, goal_title):
+        prompt = f"""Generate a detailed lesson for:
+Topic: {topic}
+Level: {level}
+Goal: {goal_title}
+
+Provide:
+1. Comprehensive explanation (2-3 paragraphs)
+2. 3-5 key concepts (as array)
+3. Example code snippet (if applicable)
+4. Programming language used
+
+Return as JSON:
+{{
+  "explanation": "...",
+  "key_concepts": ["concept1", "concept2"],
+  "example_code": "...",
+  "programming_language": "python"
+}}
+"""
+        
+        return {
+            'model': AIService._model('lesson'),
+            'messages': [
+                {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.7,
+            'max_tokens': MAX_TOKENS['lesson'],
+            'use_cache': True,
+            'kind': 'lesson',
+            'validate': lambda text: AIService.parse_lesson(text) is not None
+        }
+    
+    @staticmethod
+    def parse_lesson(text):
+        """Parse a lesson JSON response, repairing fences and truncation; None if there is no explanation"""
+        lesson = repair_json(text)
+        if not isinstance(lesson, dict) or not isinstance(lesson.get('explanation'), str):
+            return None
+        return lesson
+    
+    @staticmethod
+    def generate_lesson(topic, level, goal_title, refresh=False):
+        """
+        Generate lesson content for a daily task
+        
+        refresh=True asks the AI again instead of serving the cached lesson (regenerate)
+        
+        Returns:
+            Dict with explanation, key_concepts, example_code, programming_language
+            None if AI is unavailable or the response is not valid JSON
+        """
+        if not AIService._get_client():
+            return None
+        
+        try:
+            request = AIService._lesson_request(topic, level, goal_title)
+            return AIService._parse_response(request, AIService._complete(**request, refresh=refresh), AIService.parse_lesson)
+        
+        except Exception as e:
+            print(f"Lesson generation failed: {str(e)}")
+            return None
+    
+    @staticmethod
+    async def agenerate_lesson(topic, level, goal_title):
+        """Async variant of generate_lesson"""
+        if not AIService.is_available():
+            return None
+        
+        try:
+            request = AIService._lesson_request(topic, level, goal_title)
+            return AIService._parse_response(request, await AIService._acomplete(**request), AIService.parse_lesson)
+        
+        except Exception as e:
+            print(f"Lesson generation failed: {str(e)}")
+            return None
+    
+    @staticmethod
+    def stream_lesson(topic, level, goal_title):
+        """
+        Streaming variant of generate_lesson; yields raw JSON text chunks
+        
+        Callers collect the chunks and parse them with parse_lesson() once the stream ends.
+        A failure before the first chunk ends the stream empty (callers store a placeholder);
+        once text was sent the error is raised, so a truncated lesson is never parsed
+        """
+        if not AIService._get_client():
+            return
+        
+        request = AIService._lesson_request(topic, level, goal_title)
+        chunks = []
+        try:
+            for delta in AIService._stream(**request):
+                chunks.append(delta)
+                yield delta
+            if chunks:
+                AIService._parse_response(request, ''.join(chunks), AIService.parse_lesson)
+        
+        except Exception as e:
+            print(f"Lesson stream failed: {str(e)}")
+            if chunks:
+                raise
+    
+    # Quizzes
+    
+    @staticmethod
+    def _quiz_request(topic, level, count=QUIZ_QUESTIONS, existing=None):
+        """Request for `count` questions; follow-ups list the `existing` questions so they are not repeated"""
+        avoid = ''
+        if existing:
+            avoid = "\nDo not repeat these questions:\n" + "\n".join(f"- {q['question']}" for q in existing) + "\n"
+        prompt = f"""Generate {count} multiple-choice quiz questions for:
+Topic: {topic}
+Level: {level}
+{avoid}
+Return as JSON array:
+[
+  {{
+    "question": "What is...?",
+    "options": ["option_a", "option_b", "option_c", "option_d"],
+    "correct_answer": "option_a",
+    "explanation": "Explanation of answer",
+    "difficulty": "easy"
+  }}
+]
+"""
+        
+        request = {
+            'model': AIService._model('quiz'),
+            'messages': [
+                {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.7,
+            'max_tokens': AIService.max_tokens('quiz', count),
+            'kind': 'quiz'
+        }
+        if not existing:
+            request['use_cache'] = True
+            request['validate'] = lambda text: len(AIService._parse_quiz(text) or []) >= count
+        return request
+    
+    @staticmethod
+    def _quiz_item(raw):
+        """A parsed question if it is usable (question, 2+ options, an answer), else None"""
+        if not isinstance(raw, dict):
+            return None
+        question = raw.get('question')
+        options = raw.get('options')
+        answer = raw.get('correct_answer')
+        if not isinstance(question, str) or not question.strip():
+            return None
+        if not isinstance(options, list) or len(options) < 2 or not isinstance(answer, str) or not answer:
+            return None
+        return raw
+    
+    @staticmethod
+    def _parse_quiz(text):
+        """Usable questions salvaged from a response (fences, truncation and bad elements tolerated); None if there are none"""
+        questions = [q for q in map(AIService._quiz_item, salvage_array(text)) if q]
+        return questions or None
+    
+    @staticmethod
+    def _merge_questions(questions, more):
+        """Append questions from a follow-up that are not repeats"""
+        seen = {q['question'].strip().lower() for q in questions}
+        for q in more or []:
+            if q['question'].strip().lower() not in seen:
+                seen.add(q['question'].strip().lower())
+                questions.append(q)
+        return questions
+    
+    @staticmethod
+    def generate_quiz_questions(topic, level, count=QUIZ_QUESTIONS):
+        """
+        Generate multiple-choice quiz questions for a daily task
+        
+        Usable questions are salvaged from a malformed or truncated response; only the
+        missing ones are then requested, in one follow-up call.
+        
+        Returns:
+            List of up to `count` question dicts, None if AI is unavailable or no question could be parsed
+        """
+        if not AIService._get_client():
+            return None
+        
+        request = AIService._quiz_request(topic, level, count)
+        questions = None
+        try:
+            questions = AIService._parse_response(request, AIService._complete(**request), AIService._parse_quiz)
+            
+            if questions and len(questions) < count:
+                followup = AIService._quiz_request(topic, level, count - len(questions), questions)
+                AIService._merge_questions(questions, AIService._parse_quiz(AIService._complete(**followup)))
+        
+        except Exception as e:
+            print(f"Quiz generation failed: {str(e)}")
+        
+        return questions[:count] if questions else None
+    
+    @staticmethod
+    async def agenerate_quiz_questions(topic, level, count=QUIZ_QUESTIONS):
+        """Async variant of generate_quiz_questions"""
+        if not AIService.is_available():
+            return None
+        
+        request = AIService._quiz_request(topic, level, count)
+        questions = None
+        try:
+            questions = AIService._parse_response(request, await AIService._acomplete(**request), AIService._parse_quiz)
+            
+            if questions and len(questions) < count:
+                followup = AIService._quiz_request(topic, level, count - len(questions), questions)
+                AIService._merge_questions(questions, AIService._parse_quiz(await AIService._acomplete(**followup)))
+        
+        except Exception as e:
+            print(f"Quiz generation failed: {str(e)}")
+        
+        return questions[:count] if questions else None
+    
+    # Fan-out helpers for sync callers
+    
+    @staticmethod
+    def generate_lessons_parallel(items, timeout=None, quiz_count=QUIZ_QUESTIONS):
+        """
+        Generate lessons and quizzes for many tasks at once
+        
+        Args:
+            items: List of (topic, level, goal_title) tuples
+            timeout: Overall timeout in seconds
+            quiz_count: Questions per quiz
+        
+        Returns:
+            List of (lesson_data, questions) tuples in input order; entries are None on failure
+        """
+        async def fan_out():
+            lessons = AIService.agather(*[AIService.agenerate_lesson(*item) for item in items])
+            quizzes = AIService.agather(*[AIService.agenerate_quiz_questions(topic, level, quiz_count) for topic, level, _ in items])
+            lesson_results, quiz_results = await asyncio.gather(lessons, quizzes)
+            return [
+                (None if isinstance(lesson, Exception) else lesson,
+                 None if isinstance(quiz, Exception) else quiz)
+                for lesson, quiz in zip(lesson_results, quiz_results)
+            ]
+        
+        return AIService.run_sync(fan_out(), timeout)
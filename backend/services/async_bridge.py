@@ -0,0 +1,76 @@
+"""
+Async Bridge for SkillPilot AI
+Runs coroutines from synchronous Flask views on a shared background event loop
+"""
+import asyncio
+import os
+import threading
+
+
+class AsyncBridge:
+    """Owns one event loop in a daemon thread per process"""
+    
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def _ensure_loop(self):
+        """Start the loop thread lazily; restart it in a forked child, where the thread does not survive"""
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return self._loop
+            
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+            
+            thread = threading.Thread(target=run, name='ai-async-bridge', daemon=True)
+            thread.start()
+            ready.wait()
+            
+            self._loop = loop
+            self._thread = thread
+            self._pid = os.getpid()
+            return loop
+    
+    def in_bridge_thread(self):
+        """True when called from the bridge loop itself (where blocking on it would deadlock)"""
+        return self._thread is not None and threading.current_thread() is self._thread
+    
+    def submit(self, coro):
+        """Schedule a coroutine and return a concurrent.futures.Future"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+    
+    def run(self, coro, timeout=None):
+        """Run a coroutine to completion and return its result"""
+        if self.in_bridge_thread():
+            coro.close()
+            raise RuntimeError("AsyncBridge.run() cannot be called from the bridge loop")
+        
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+    
+    def shutdown(self):
+        """Stop the loop thread (used on worker exit)"""
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+            self._pid = None
+
+
+# Shared bridge instance
+async_bridge = AsyncBridge()
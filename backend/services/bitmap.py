@@ -0,0 +1,54 @@
+"""
+Day Bitmaps for SkillPilot AI
+Compact per-goal day sets (bit i = day i) stored as little-endian bytes, with the
+run and gap queries that streaks, missed days and reminders need
+"""
+
+
+def to_int(data):
+    """Bitmap bytes -> int (bit i is day i)"""
+    return int.from_bytes(data or b'', 'little')
+
+
+def to_bytes(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def set_bit(data, index, value=True):
+    """Bitmap bytes with bit `index` set (or cleared)"""
+    bits = to_int(data)
+    bits = bits | (1 << index) if value else bits & ~(1 << index)
+    return to_bytes(bits)
+
+
+def has_bit(bits, index):
+    return index >= 0 and bool(bits >> index & 1)
+
+
+def run_ending_at(bits, index):
+    """Length of the run of set bits ending at `index` (0 if that bit is clear)"""
+    if not has_bit(bits, index):
+        return 0
+    window = bits & ((1 << (index + 1)) - 1)
+    gaps = ~window & ((1 << (index + 1)) - 1)  # clear bits at or below index
+    return index + 1 - gaps.bit_length()
+
+
+def longest_run(bits):
+    """Length of the longest run of set bits (each step shortens every run by one)"""
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def clear_positions(bits, count):
+    """Indexes of the clear bits among the first `count`, ascending"""
+    gaps = ~bits & ((1 << max(count, 0)) - 1)
+    positions = []
+    while gaps:
+        low = gaps & -gaps
+        positions.append(low.bit_length() - 1)
+        gaps ^= low
+    return positions
@@ -0,0 +1,185 @@
+"""
+Circuit Breaker for SkillPilot AI
+Fails AI calls fast while Groq is degraded and derives request timeouts from observed latency
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while a model's circuit is open"""
+
+
+def is_upstream_failure(error):
+    """
+    Whether an exception means the upstream is unhealthy
+    
+    Timeouts, connection errors, 5xx and 429 count; other HTTP errors (bad request,
+    auth) mean Groq answered, so they do not trip the breaker
+    """
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        return True
+    return status >= 500 or status == 429
+
+
+class CircuitBreaker:
+    """
+    Per-model breaker: closed -> open after consecutive failures -> half-open probe -> closed
+    
+    Also keeps a window of successful call latencies; timeout() returns their p95
+    times a multiplier, clamped, so a slow upstream is abandoned well before the
+    HTTP client's default timeout
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, latency_window=100,
+                 min_samples=20, timeout_multiplier=2.0, min_timeout=5.0, max_timeout=60.0,
+                 default_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.min_samples = min_samples
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.default_timeout = default_timeout
+        
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._probe_in_flight = False
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+    
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"Circuit for {self.name} is open")
+                self.state = self.HALF_OPEN
+            
+            if self.state == self.HALF_OPEN:
+                # Only one probe at a time; everyone else keeps failing fast
+                if self._probe_in_flight:
+                    raise CircuitOpenError(f"Circuit for {self.name} is half-open, probe in flight")
+                self._probe_in_flight = True
+    
+    def record_success(self, latency=None):
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+    
+    def record_failure(self, error):
+        if not is_upstream_failure(error):
+            self.record_success()
+            return
+        
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)[:200]
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"[ERROR] Circuit for {self.name} opened after {self.failures} failures: {self.last_error}")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+    
+    def release(self):
+        """Free the half-open probe slot of a call that was cancelled without an outcome"""
+        with self._lock:
+            self._probe_in_flight = False
+    
+    @contextmanager
+    def guard(self, record_latency=True):
+        """
+        Wrap one upstream call: fail fast while open, then record its outcome
+        
+        Streams pass record_latency=False, their duration is not comparable to a completion's
+        """
+        self.before_call()
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            # Cancelled or closed early (client disconnect): no verdict on upstream health
+            self.release()
+            raise
+        self.record_success(time.monotonic() - start if record_latency else None)
+    
+    def p95(self):
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    
+    def timeout(self):
+        """Request timeout in seconds: p95 latency x multiplier, or the default until enough samples exist"""
+        p95 = self.p95()
+        if p95 is None:
+            return self.default_timeout
+        return min(max(p95 * self.timeout_multiplier, self.min_timeout), self.max_timeout)
+    
+    def get_stats(self):
+        p95 = self.p95()
+        with self._lock:
+            stats = {
+                'state': self.state,
+                'failures': self.failures,
+                'samples': len(self._latencies),
+                'last_error': self.last_error
+            }
+            if self.state == self.OPEN:
+                stats['retry_in'] = round(max(0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+        
+        stats['p95_ms'] = round(p95 * 1000) if p95 is not None else None
+        stats['timeout'] = round(self.timeout(), 2)
+        return stats
+
+
+class CircuitBreakerRegistry:
+    """One breaker per model, created on first use (state is per worker process)"""
+    
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+    
+    def get(self, name, **settings):
+        """Get the breaker for a model; settings only apply when it is created"""
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, **settings)
+            return breaker
+    
+    def any_open(self):
+        with self._lock:
+            return any(breaker.state == CircuitBreaker.OPEN for breaker in self._breakers.values())
+    
+    def get_stats(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.get_stats() for breaker in breakers}
+    
+    def reset(self):
+        with self._lock:
+            self._breakers.clear()
+
+
+# Shared breaker registry
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,187 @@
+"""
+Conversation Memory for SkillPilot AI
+Builds chat prompt context from a rolling summary plus the most recent messages,
+within a token budget; the summary is updated in the background every few turns
+"""
+import re
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ConversationMessage, ConversationSummary, Job
+from services.ai_service import AIService
+from services.job_queue import JobQueue
+
+
+# Word pieces and punctuation; long words count as several tokens, roughly like BPE
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Role and formatting tokens the API adds per chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class ConversationMemory:
+    """Service for bounded chat context"""
+    
+    @staticmethod
+    def _unsummarized(user_id, summary):
+        """
+        Messages newer than the summary
+        
+        Bounded below by the last summarized message's timestamp as well as its id, so
+        the (user_id, created_at, id) index range scan stops at the summary cursor
+        """
+        query = ConversationMessage.query.filter(ConversationMessage.user_id == user_id)
+        if summary and summary.last_message_id:
+            cursor_at = db.session.query(ConversationMessage.created_at).filter_by(
+                id=summary.last_message_id
+            ).scalar()
+            if cursor_at is not None:
+                query = query.filter(ConversationMessage.created_at >= cursor_at)
+            query = query.filter(ConversationMessage.id > summary.last_message_id)
+        return query
+    
+    @staticmethod
+    def estimate_tokens(text):
+        """Fast local token count estimate (no tokenizer download, within ~15% for English)"""
+        if not text:
+            return 0
+        return sum((len(piece) + 3) // 4 for piece in _TOKEN_PATTERN.findall(text))
+    
+    @staticmethod
+    def build_context(user_id, exclude_id=None, budget=None):
+        """
+        Context for the next chat reply
+        
+        The summary is always included; recent messages not yet summarized are added
+        newest first until the token budget is used up
+        
+        Args:
+            user_id: Conversation owner
+            exclude_id: Message to leave out (the message being answered)
+            budget: Token budget for summary + history (default CHAT_CONTEXT_TOKEN_BUDGET)
+        
+        Returns:
+            (summary text or None, list of {"role", "content"} dicts oldest first)
+        """
+        budget = budget or current_app.config.get('CHAT_CONTEXT_TOKEN_BUDGET', 1500)
+        max_messages = current_app.config.get('CHAT_CONTEXT_MAX_MESSAGES', 20)
+        
+        summary = ConversationSummary.query.filter_by(user_id=user_id).first()
+        summary_text = summary.summary if summary and summary.summary else None
+        remaining = budget - ConversationMemory.estimate_tokens(summary_text)
+        
+        query = ConversationMemory._unsummarized(user_id, summary)
+        if exclude_id is not None:
+            query = query.filter(ConversationMessage.id != exclude_id)
+        recent = query.order_by(
+            ConversationMessage.created_at.desc(),
+            ConversationMessage.id.desc()
+        ).limit(max_messages).all()
+        
+        history = []
+        for msg in recent:
+            cost = ConversationMemory.estimate_tokens(msg.content) + MESSAGE_OVERHEAD_TOKENS
+            if cost > remaining:
+                break
+            remaining -= cost
+            history.append({"role": msg.role, "content": msg.content})
+        
+        history.reverse()
+        return summary_text, history
+    
+    @staticmethod
+    def schedule_summary(user_id):
+        """
+        Queue a summary update once enough turns are unsummarized (caller commits)
+        
+        Returns:
+            The queued Job, or None if summaries are disabled, no update is due
+            or one is already pending
+        """
+        if not current_app.config.get('CHAT_SUMMARY_ENABLED', False):
+            return None
+        
+        every = current_app.config.get('CHAT_SUMMARY_EVERY_TURNS', 4) * 2  # a turn = user + assistant message
+        keep = current_app.config.get('CHAT_SUMMARY_KEEP_RECENT', 4)
+        
+        summary = ConversationSummary.query.filter_by(user_id=user_id).first()
+        # Only whether the threshold is reached matters, so never count past it
+        unsummarized = ConversationMemory._unsummarized(user_id, summary).limit(every + keep).count()
+        if unsummarized < every + keep:
+            return None
+        
+        pending = Job.query.filter(
+            Job.kind == 'summarize_conversation',
+            Job.user_id == user_id,
+            Job.status.in_(['queued', 'running'])
+        ).first()
+        if pending:
+            return None
+        
+        return JobQueue.enqueue('summarize_conversation', {'user_id': user_id}, user_id=user_id)
+    
+    @staticmethod
+    def update_summary(user_id):
+        """
+        Fold unsummarized messages, except the most recent ones, into the summary
+        
+        Returns:
+            Number of messages folded in; raises if the AI call failed (so the job retries)
+        """
+        keep = current_app.config.get('CHAT_SUMMARY_KEEP_RECENT', 4)
+        batch = current_app.config.get('CHAT_SUMMARY_MAX_BATCH', 40)
+        
+        summary = ConversationSummary.query.filter_by(user_id=user_id).first()
+        unsummarized = ConversationMemory._unsummarized(user_id, summary)
+        
+        # Oldest first, so nothing is skipped when more than one batch is pending
+        take = min(batch, unsummarized.limit(batch + keep).count() - keep)
+        if take <= 0:
+            return 0
+        messages = unsummarized.order_by(
+            ConversationMessage.created_at,
+            ConversationMessage.id
+        ).limit(take).all()
+        
+        previous = summary.summary if summary else ''
+        transcript = [{"role": msg.role, "content": msg.content} for msg in messages]
+        last_message_id = messages[-1].id
+        
+        # Do not hold the read transaction open during the AI call
+        db.session.rollback()
+        
+        text = AIService.summarize_conversation(previous, transcript)
+        if not text:
+            raise RuntimeError('AI conversation summary failed, will retry')
+        
+        # The history may have been cleared while the AI was summarizing it
+        if not db.session.query(ConversationMessage.id).filter_by(id=last_message_id).first():
+            return 0
+        
+        summary = ConversationSummary.query.filter_by(user_id=user_id).first()
+        if summary is None:
+            summary = ConversationSummary(user_id=user_id)
+            db.session.add(summary)
+        summary.summary = text
+        summary.last_message_id = last_message_id
+        
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker created the summary first; this batch is retried against it
+            db.session.rollback()
+            raise
+        
+        return len(messages)
+    
+    @staticmethod
+    def clear(user_id):
+        """Forget the summary along with the history (caller commits)"""
+        ConversationSummary.query.filter_by(user_id=user_id).delete()
+
+
+@JobQueue.handler('summarize_conversation')
+def summarize_conversation_job(payload, job):
+    """Job handler: update a user's rolling conversation summary"""
+    return {'summarized': ConversationMemory.update_summary(payload['user_id'])}
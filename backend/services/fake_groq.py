@@ -0,0 +1,293 @@
+"""
+Fake Groq Server for SkillPilot AI
+Local OpenAI/Groq-compatible chat completions endpoint for load and latency testing,
+with synthetic responses or a cassette of recorded real ones
+
+Start it with `flask --app app fake-groq`, then point the backend at it:
+GROQ_BASE_URL=http://127.0.0.1:8090 (GROQ_API_KEY must be set, any value works
+unless recording)
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+import requests
+from flask import Flask, Response, jsonify, request
+
+
+class LatencyModel:
+    """Log-normal response latency (median and spread), the usual shape of LLM API latency"""
+    
+    def __init__(self, median_ms=400, sigma=0.5, seed=None):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def sample(self):
+        """One latency in seconds"""
+        if self.sigma <= 0:
+            return self.median_ms / 1000.0
+        with self._lock:
+            return self._random.lognormvariate(0, self.sigma) * self.median_ms / 1000.0
+
+
+class Cassette:
+    """Recorded completions in a JSON-lines file, keyed by the exact request"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load()
+    
+    @staticmethod
+    def make_key(body):
+        """Identity of a request: model, messages and sampling params (streaming is replayed either way)"""
+        identity = {k: body.get(k) for k in ('model', 'messages', 'temperature', 'max_tokens')}
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry['key']] = entry
+        except FileNotFoundError:
+            pass
+    
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+    
+    def add(self, key, body, content, latency_ms):
+        entry = {
+            'key': key,
+            'model': body.get('model'),
+            'content': content,
+            'latency_ms': latency_ms
+        }
+        with self._lock:
+            self._entries[key] = entry
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+def synthetic_content(body):
+    """
+    Deterministic response shaped like what AIService expects for the prompt
+    (roadmap/lesson/quiz JSON, plain text otherwise)
+    """
+    messages = body.get('messages') or [{}]
+    prompt = str(messages[-1].get('content', ''))
+    rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+    topic = re.search(r'(?:Topic|Goal|Concept): (.+)', prompt)
+    topic = topic.group(1).strip() if topic else 'this topic'
+    
+    if 'day learning roadmap' in prompt:
+        days = int(re.search(r'(\d+)-day', prompt).group(1))
+        return json.dumps([
+            {'day': day, 'topic': f"{topic} - part {day}", 'estimated_time': rng.choice([30, 45, 60, 90])}
+            for day in range(1, days + 1)
+        ])
+    
+    if 'quiz questions' in prompt:
+        return json.dumps([
+            {
+                'question': f"Question {i} about {topic}?",
+                'options': ['option_a', 'option_b', 'option_c', 'option_d'],
+                'correct_answer': rng.choice(['option_a', 'option_b', 'option_c', 'option_d']),
+                'explanation': f"Explanation {i}",
+                'difficulty': rng.choice(['easy', 'medium', 'hard'])
+            }
+            for i in range(1, 6)
+        ])
+    
+    if 'detailed lesson' in prompt:
+        return json.dumps({
+            'explanation': f"{topic} explained. " * 20,
+            'key_concepts': [f"{topic} concept {i}" for i in range(1, 4)],
+            'example_code': f"# {topic}\nprint('hello')",
+            'programming_language': 'python'
+        })
+    
+    words = ['learning', 'practice', 'example', 'concept', 'step', 'code', 'idea', 'skill']
+    length = min(int(body.get('max_tokens') or 200), 200) // 2
+    return f"About {topic}: " + ' '.join(rng.choice(words) for _ in range(length)) + '.'
+
+
+def create_fake_groq_app(mode='synthetic', cassette_path=None, upstream='https://api.groq.com',
+                         latency=None, error_rate=0.0, rate_limit_rate=0.0, hang_rate=0.0,
+                         hang_seconds=60.0, seed=None):
+    """
+    Build the fake server
+    
+    Args:
+        mode: 'synthetic' (generated responses), 'record' (forward to upstream and
+              store) or 'replay' (serve the cassette; unknown requests get a 404)
+        cassette_path: JSON-lines cassette file for record/replay
+        upstream: Real API base URL used when recording
+        latency: LatencyModel; in replay mode, None replays the recorded latency
+        error_rate / rate_limit_rate / hang_rate: Fractions of requests answered with
+              a 500, a 429, or held for hang_seconds (to exercise client timeouts)
+    """
+    app = Flask(__name__)
+    cassette = Cassette(cassette_path) if cassette_path else None
+    chaos = random.Random(seed)
+    chaos_lock = threading.Lock()
+    stats = {'requests': 0, 'errors': 0, 'rate_limited': 0, 'hung': 0, 'recorded': 0, 'replayed': 0, 'misses': 0}
+    
+    if mode in ('record', 'replay') and cassette is None:
+        raise ValueError(f"Mode '{mode}' needs a cassette path")
+    
+    def error(status, message, **headers):
+        response = jsonify({'error': {'message': message, 'type': 'fake_groq_error'}})
+        response.status_code = status
+        response.headers.update(headers)
+        return response
+    
+    def completion(body, content):
+        prompt_tokens = sum(len(str(m.get('content', ''))) for m in body.get('messages', [])) // 4
+        completion_tokens = len(content) // 4
+        return {
+            'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model'),
+            'system_fingerprint': 'fake-groq',
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+                'logprobs': None
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        }
+    
+    def stream(body, content, delay):
+        """SSE chunks; a quarter of the latency is time-to-first-token, the rest spread over chunks"""
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        pieces = re.findall(r'\S+\s*|\s+', content) or ['']
+        
+        def chunk(text, finish_reason=None):
+            return 'data: ' + json.dumps({
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': body.get('model'),
+                'choices': [{
+                    'index': 0,
+                    'delta': {'role': 'assistant', 'content': text},
+                    'finish_reason': finish_reason,
+                    'logprobs': None
+                }]
+            }) + '\n\n'
+        
+        def generate():
+            time.sleep(delay * 0.25)
+            gap = delay * 0.75 / len(pieces)
+            for piece in pieces:
+                yield chunk(piece)
+                time.sleep(gap)
+            yield chunk('', 'stop')
+            yield 'data: [DONE]\n\n'
+        
+        return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    
+    def record(body):
+        """Forward a (non-streaming) copy of the request upstream and store the answer"""
+        upstream_body = dict(body, stream=False)
+        started = time.monotonic()
+        upstream_response = requests.post(
+            upstream.rstrip('/') + '/openai/v1/chat/completions',
+            json=upstream_body,
+            headers={'Authorization': request.headers.get('Authorization', '')},
+            timeout=120
+        )
+        latency_ms = int((time.monotonic() - started) * 1000)
+        if upstream_response.status_code != 200:
+            return None, upstream_response
+        
+        content = upstream_response.json()['choices'][0]['message']['content']
+        cassette.add(Cassette.make_key(body), body, content, latency_ms)
+        stats['recorded'] += 1
+        return content, None
+    
+    @app.route('/openai/v1/chat/completions', methods=['POST'])
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        body = request.get_json(force=True)
+        stats['requests'] += 1
+        
+        with chaos_lock:
+            roll = chaos.random()
+        if roll < error_rate:
+            stats['errors'] += 1
+            return error(500, 'Injected server error')
+        if roll < error_rate + rate_limit_rate:
+            stats['rate_limited'] += 1
+            return error(429, 'Injected rate limit', **{'Retry-After': '1'})
+        if roll < error_rate + rate_limit_rate + hang_rate:
+            stats['hung'] += 1
+            time.sleep(hang_seconds)
+            return error(504, 'Injected hang')
+        
+        delay = latency.sample() if latency else 0.4
+        content = None
+        
+        if mode == 'replay':
+            entry = cassette.get(Cassette.make_key(body))
+            if entry is None:
+                stats['misses'] += 1
+                return error(404, 'Request not found in cassette (record it first)')
+            content = entry['content']
+            if latency is None:
+                delay = entry['latency_ms'] / 1000.0
+            stats['replayed'] += 1
+        
+        elif mode == 'record':
+            entry = cassette.get(Cassette.make_key(body))
+            if entry:
+                content = entry['content']
+            else:
+                content, upstream_error = record(body)
+                if upstream_error is not None:
+                    return Response(upstream_error.content, status=upstream_error.status_code,
+                                    mimetype='application/json')
+                delay = 0  # the upstream call already took real time
+        
+        else:
+            content = synthetic_content(body)
+        
+        if body.get('stream'):
+            return stream(body, content, delay)
+        
+        time.sleep(delay)
+        return jsonify(completion(body, content))
+    
+    @app.route('/openai/v1/models')
+    @app.route('/v1/models')
+    def list_models():
+        # Used by client warm-up
+        return jsonify({'object': 'list', 'data': [
+            {'id': model, 'object': 'model', 'created': 0, 'owned_by': 'fake-groq'}
+            for model in ('llama-3.3-70b-versatile', 'llama-3.1-8b-instant')
+        ]})
+    
+    @app.route('/stats')
+    def get_stats():
+        return jsonify(dict(stats, mode=mode, cassette_entries=len(cassette) if cassette else 0))
+    
+    return app
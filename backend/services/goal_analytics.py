@@ -0,0 +1,173 @@
+"""
+Goal Analytics for SkillPilot AI
+Vectorized weekly histograms, velocity, pace and projected finish dates for one
+goal or many at once (admin reports, batch jobs)
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from models import db, Goal, Task
+
+# Try importing numpy, handle if not installed (callers fall back to ProgressService)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Weeks in the histogram (the current one last) and the rolling velocity window in days
+HISTOGRAM_WEEKS = 9
+VELOCITY_WINDOW = 7
+VELOCITY_HISTORY = 28
+
+
+class GoalAnalytics:
+    """
+    Analytics computed on arrays instead of Task objects
+    
+    One Core query loads (goal, created_at, deadline, day_number, status, completed_at)
+    for every requested goal; everything else is NumPy over those columns, so the
+    cost per goal is a few array slots rather than ORM objects and Python loops.
+    Dates are UTC calendar days, like the rest of the progress code.
+    """
+    
+    @staticmethod
+    def load(goal_ids):
+        """
+        Columns of the goals' tasks as arrays
+        
+        Returns:
+            Dict with `goal_ids`, per-goal `start`/`deadline` (datetime64[D], NaT when
+            unset) and per-task `goal` (row index), `day_number`, `completed`,
+            `completed_on` (datetime64[D])
+        """
+        goals, tasks = Goal.__table__, Task.__table__
+        rows = db.session.execute(
+            select(goals.c.id, goals.c.created_at, goals.c.deadline,
+                   tasks.c.day_number, tasks.c.status, tasks.c.completed_at)
+            .select_from(goals.outerjoin(tasks, tasks.c.goal_id == goals.c.id))
+            .where(goals.c.id.in_(list(goal_ids)))
+        ).all()
+        
+        ids = sorted({row[0] for row in rows})
+        position = {goal_id: index for index, goal_id in enumerate(ids)}
+        starts, deadlines = {}, {}
+        for goal_id, created_at, deadline, *_ in rows:
+            starts[goal_id] = created_at
+            deadlines[goal_id] = deadline
+        
+        task_rows = [row for row in rows if row[3] is not None]
+        return {
+            'goal_ids': ids,
+            'start': np.array([starts[goal_id] for goal_id in ids], dtype='datetime64[D]'),
+            'deadline': np.array([deadlines[goal_id] for goal_id in ids], dtype='datetime64[D]'),
+            'goal': np.array([position[row[0]] for row in task_rows], dtype=np.int64),
+            'day_number': np.array([row[3] for row in task_rows], dtype=np.int64),
+            'completed': np.array([row[4] == 'completed' for row in task_rows], dtype=bool),
+            'completed_on': np.array([row[5] for row in task_rows], dtype='datetime64[D]')
+        }
+    
+    @staticmethod
+    def compute(goal_ids, today=None):
+        """
+        Analytics for many goals at once
+        
+        Returns:
+            Dict of goal_id -> {tasks, weekly, velocity, pace, projected_completion_date}
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError('Goal analytics need numpy')
+        
+        data = GoalAnalytics.load(goal_ids)
+        count = len(data['goal_ids'])
+        if not count:
+            return {}
+        
+        today = np.datetime64(today or datetime.utcnow().date(), 'D')
+        goal = data['goal']
+        done = data['completed'] & ~np.isnat(data['completed_on'])
+        
+        total = np.bincount(goal, minlength=count)
+        completed = np.bincount(goal, weights=data['completed'], minlength=count).astype(np.int64)
+        
+        # Weekly histogram: Monday-based weeks, the current week last
+        week_start = today - (today.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+        first_week = week_start - 7 * (HISTOGRAM_WEEKS - 1)
+        week = (data['completed_on'] - first_week).astype('timedelta64[D]').astype(np.int64) // 7
+        in_range = done & (week >= 0) & (week < HISTOGRAM_WEEKS)
+        weekly = np.bincount(
+            goal[in_range] * HISTOGRAM_WEEKS + week[in_range],
+            minlength=count * HISTOGRAM_WEEKS
+        ).reshape(count, HISTOGRAM_WEEKS)
+        
+        # Daily completions over the last VELOCITY_HISTORY days, then a rolling mean
+        first_day = today - (VELOCITY_HISTORY - 1)
+        day = (data['completed_on'] - first_day).astype('timedelta64[D]').astype(np.int64)
+        in_history = done & (day >= 0) & (day < VELOCITY_HISTORY)
+        daily = np.bincount(
+            goal[in_history] * VELOCITY_HISTORY + day[in_history],
+            minlength=count * VELOCITY_HISTORY
+        ).reshape(count, VELOCITY_HISTORY)
+        cumulative = np.concatenate([np.zeros((count, 1), dtype=np.int64), np.cumsum(daily, axis=1)], axis=1)
+        rolling = (cumulative[:, VELOCITY_WINDOW:] - cumulative[:, :-VELOCITY_WINDOW]) / VELOCITY_WINDOW
+        
+        elapsed = np.maximum((today - data['start']).astype(np.int64), 1)
+        overall_velocity = completed / elapsed
+        current_velocity = rolling[:, -1]
+        projection_velocity = np.where(current_velocity > 0, current_velocity, overall_velocity)
+        
+        # Projected finish: remaining tasks at the recent pace (overall pace if idle lately)
+        remaining = total - completed
+        with np.errstate(divide='ignore', invalid='ignore'):
+            days_to_finish = np.ceil(np.where(projection_velocity > 0, remaining / projection_velocity, np.nan))
+        
+        # Pace vs deadline: share of tasks done against share of the period elapsed
+        has_deadline = ~np.isnat(data['deadline'])
+        period = (data['deadline'] - data['start']).astype(np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            actual = np.where(total > 0, completed / np.maximum(total, 1) * 100, 0.0)
+            expected = np.where(has_deadline & (period > 0), (today - data['start']).astype(np.int64) / period * 100, np.nan)
+        status = np.where(
+            np.isnan(expected) | (total == 0), 'on-track',
+            np.where(actual >= expected, 'ahead', np.where(actual >= expected * 0.8, 'on-track', 'behind'))
+        )
+        
+        week_starts = [str(first_week + 7 * index) for index in range(HISTOGRAM_WEEKS)]
+        results = {}
+        for index, goal_id in enumerate(data['goal_ids']):
+            finish = None
+            if remaining[index] == 0 and total[index] > 0:
+                finished_on = data['completed_on'][(goal == index) & done]
+                finish = str(finished_on.max()) if finished_on.size else None
+            elif not np.isnan(days_to_finish[index]):
+                finish = str(today + int(days_to_finish[index]))
+            
+            results[goal_id] = {
+                'tasks': {'total': int(total[index]), 'completed': int(completed[index]), 'remaining': int(remaining[index])},
+                'weekly': [
+                    {'week_start': start, 'completed': int(value)}
+                    for start, value in zip(week_starts, weekly[index])
+                ],
+                'velocity': {
+                    'overall': round(float(overall_velocity[index]), 3),
+                    'last_7_days': round(float(current_velocity[index]), 3),
+                    'rolling_7_days': [round(float(value), 3) for value in rolling[index]],
+                    'days_elapsed': int(elapsed[index])
+                },
+                'pace': {
+                    'status': str(status[index]),
+                    'actual_percentage': round(float(actual[index]), 2),
+                    'expected_percentage': None if np.isnan(expected[index]) else round(float(expected[index]), 2),
+                    'days_remaining': int(max((data['deadline'][index] - today).astype(np.int64), 0)) if has_deadline[index] else None
+                },
+                'projected_completion_date': finish
+            }
+        
+        return results
+    
+    @staticmethod
+    def for_goal(goal_id, today=None):
+        """Analytics of one goal (None if it does not exist)"""
+        return GoalAnalytics.compute([goal_id], today).get(goal_id)
@@ -0,0 +1,128 @@
+"""
+Goal Generation Service for SkillPilot AI
+Turns AI roadmaps into tasks, inline or as background jobs
+"""
+from models import db, Goal, Task, Progress
+from services.ai_service import AIService
+from services.job_queue import JobQueue
+from services.pregeneration import PregenerationService
+
+
+ROADMAP_DAYS = 30
+
+# Tasks inserted per commit while a roadmap streams in (pollers see them as they land)
+ROADMAP_COMMIT_EVERY = 5
+
+
+class GoalGenerationService:
+    """Service for building a goal's tasks from its roadmap"""
+    
+    @staticmethod
+    def add_roadmap_tasks(goal, roadmap):
+        """Add one pending task per roadmap item (caller commits)"""
+        for item in roadmap:
+            task = Task(
+                goal_id=goal.id,
+                day_number=item['day'],
+                topic=item['topic'],
+                description=f"Estimated time: {item.get('estimated_time', 45)} minutes",
+                status='pending'
+            )
+            db.session.add(task)
+    
+    @staticmethod
+    def add_missing_placeholder_tasks(goal):
+        """Fill days without a task from the placeholder roadmap (caller commits)"""
+        existing = {day for (day,) in db.session.query(Task.day_number).filter_by(goal_id=goal.id)}
+        placeholder = AIService._generate_placeholder_roadmap(goal.title, goal.level, ROADMAP_DAYS)
+        GoalGenerationService.add_roadmap_tasks(goal, [item for item in placeholder if item['day'] not in existing])
+    
+    @staticmethod
+    def enqueue_roadmap(goal):
+        """Queue background roadmap generation for a goal (caller commits)"""
+        goal.generation_status = 'generating'
+        return JobQueue.enqueue(
+            'generate_roadmap',
+            {'goal_id': goal.id},
+            user_id=goal.user_id
+        )
+
+
+def _mark_roadmap_failed(payload, job):
+    """Give up on AI generation: fall back to default tasks so the goal stays usable"""
+    goal = Goal.query.get(payload.get('goal_id'))
+    if not goal or goal.generation_status != 'generating':
+        return
+    
+    if goal.tasks:
+        # Keep the days that did stream in, fill in the rest
+        GoalGenerationService.add_missing_placeholder_tasks(goal)
+        goal.generation_status = 'ready'
+    else:
+        goal.create_default_tasks()
+        goal.roadmap_generated = False
+        goal.generation_status = 'failed'
+    
+    # Count the fallback tasks in the same transaction that adds them
+    progress = goal.progress
+    if not progress:
+        progress = Progress(goal_id=goal.id)
+        db.session.add(progress)
+    progress.recount()
+    db.session.commit()
+
+
+@JobQueue.handler('generate_roadmap', on_failure=_mark_roadmap_failed)
+def generate_roadmap_job(payload, job):
+    """
+    Generate a goal's roadmap and insert its tasks
+    
+    Tasks are inserted as the roadmap streams in, a few per commit. A retry keeps the
+    days an earlier attempt already inserted and only asks the AI for the others.
+    """
+    goal = Goal.query.get(payload.get('goal_id'))
+    if not goal:
+        return {'skipped': 'goal deleted'}
+    
+    goal_id, title, level = goal.id, goal.title, goal.level
+    known = {
+        task.day_number: {'day': task.day_number, 'topic': task.topic}
+        for task in Task.query.filter_by(goal_id=goal_id)
+    }
+    resumed = len(known)
+    ai_available = AIService.is_available()
+    
+    if len(known) < ROADMAP_DAYS and ai_available:
+        try:
+            pending = 0
+            for item in AIService.stream_roadmap(title, level, ROADMAP_DAYS, known=known):
+                GoalGenerationService.add_roadmap_tasks(goal, [item])
+                known[item['day']] = item
+                pending += 1
+                if pending >= ROADMAP_COMMIT_EVERY:
+                    db.session.commit()
+                    pending = 0
+        except Exception as e:
+            print(f"AI roadmap generation failed: {str(e)}")
+        db.session.commit()
+    
+    # Only AI days are inserted before the final attempt's placeholders
+    roadmap_generated = bool(known)
+    if len(known) < ROADMAP_DAYS:
+        # Retrying cannot help without an AI client; write the placeholders right away
+        if ai_available and not JobQueue.is_final_attempt(job):
+            raise RuntimeError(f"AI roadmap has {len(known)}/{ROADMAP_DAYS} days, will retry for the rest")
+        GoalGenerationService.add_missing_placeholder_tasks(goal)
+    
+    goal.roadmap_generated = roadmap_generated
+    goal.generation_status = 'ready'
+    
+    if not goal.progress:
+        db.session.add(Progress(goal_id=goal.id))
+    PregenerationService.enqueue_after_roadmap(goal)
+    db.session.commit()
+    
+    goal.progress.recount()
+    db.session.commit()
+    
+    return {'tasks': ROADMAP_DAYS, 'resumed': resumed, 'roadmap_generated': roadmap_generated}
@@ -0,0 +1,261 @@
+"""
+Job Queue for SkillPilot AI
+Database-backed background jobs with retries, visibility timeouts and concurrency limits
+"""
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, select, update
+
+from models import db, Job
+
+
+class JobQueue:
+    """Service for enqueueing, claiming and running background jobs"""
+    
+    # kind -> handler(payload, job); registered with @JobQueue.handler(kind)
+    handlers = {}
+    
+    # kind -> on_failure(payload, job), called once a job has failed for good
+    failure_handlers = {}
+    
+    @staticmethod
+    def handler(kind, on_failure=None):
+        """Register a function as the handler for a job kind"""
+        def decorator(fn):
+            JobQueue.handlers[kind] = fn
+            if on_failure:
+                JobQueue.failure_handlers[kind] = on_failure
+            return fn
+        return decorator
+    
+    @staticmethod
+    def enqueue(kind, payload=None, user_id=None, max_attempts=None, delay=0):
+        """Add a job to the queue (caller commits)"""
+        job = Job(
+            kind=kind,
+            payload=payload or {},
+            user_id=user_id,
+            status='queued',
+            attempts=0,
+            max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 3),
+            run_after=datetime.utcnow() + timedelta(seconds=delay)
+        )
+        db.session.add(job)
+        return job
+    
+    @staticmethod
+    def claim(worker_id, kinds=None, limit=1):
+        """
+        Atomically claim up to `limit` runnable jobs for this worker
+        
+        A job is runnable when it is queued and due, or when a previous worker's
+        visibility timeout ran out (crashed or stuck worker). Each claim is a
+        conditional UPDATE, so two workers can never claim the same job.
+        """
+        table = Job.__table__
+        now = datetime.utcnow()
+        visibility_timeout = current_app.config.get('JOB_VISIBILITY_TIMEOUT', 300)
+        limits = current_app.config.get('JOB_CONCURRENCY_LIMITS', {})
+        
+        # Jobs whose lock expired on their final attempt will not be retried: fail them
+        # (once, even with several workers claiming) and run their failure handler
+        expired = db.session.execute(
+            select(table.c.id)
+            .where(table.c.status == 'running', table.c.locked_until < now, table.c.attempts >= table.c.max_attempts)
+        ).scalars().all()
+        for job_id in expired:
+            result = db.session.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.status == 'running', table.c.locked_until < now)
+                .values(status='failed', last_error='Visibility timeout exceeded on final attempt', finished_at=now, updated_at=now)
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                JobQueue._run_failure_handler(Job.query.get(job_id))
+        
+        runnable = or_(
+            and_(table.c.status == 'queued', table.c.run_after <= now),
+            and_(table.c.status == 'running', table.c.locked_until < now)
+        )
+        
+        query = select(table.c.id, table.c.kind).where(runnable).order_by(table.c.run_after, table.c.id).limit(limit * 4)
+        if kinds:
+            query = query.where(table.c.kind.in_(kinds))
+        candidates = db.session.execute(query).all()
+        
+        # Running jobs per kind, for the cross-worker concurrency limits (best effort)
+        running = dict(db.session.execute(
+            select(table.c.kind, func.count())
+            .where(table.c.status == 'running', table.c.locked_until >= now)
+            .group_by(table.c.kind)
+        ).all())
+        
+        claimed = []
+        for job_id, kind in candidates:
+            if len(claimed) >= limit:
+                break
+            if kind in limits and running.get(kind, 0) >= limits[kind]:
+                continue
+            
+            result = db.session.execute(
+                update(table)
+                .where(table.c.id == job_id, runnable)
+                .values(
+                    status='running',
+                    locked_by=worker_id,
+                    locked_until=now + timedelta(seconds=visibility_timeout),
+                    attempts=table.c.attempts + 1,
+                    updated_at=now
+                )
+            )
+            db.session.commit()
+            
+            if result.rowcount == 1:
+                claimed.append(job_id)
+                running[kind] = running.get(kind, 0) + 1
+        
+        return claimed
+    
+    @staticmethod
+    def heartbeat(job):
+        """Extend the visibility timeout of a long-running job"""
+        job.locked_until = datetime.utcnow() + timedelta(seconds=current_app.config.get('JOB_VISIBILITY_TIMEOUT', 300))
+        db.session.commit()
+    
+    @staticmethod
+    def complete(job, result=None):
+        """Mark a job as succeeded"""
+        job.status = 'succeeded'
+        job.result = result
+        job.locked_by = None
+        job.locked_until = None
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    
+    @staticmethod
+    def fail(job, error):
+        """Record a failure; requeue with exponential backoff until max_attempts is reached"""
+        job.last_error = error
+        job.locked_by = None
+        job.locked_until = None
+        
+        if job.attempts < job.max_attempts:
+            backoff = current_app.config.get('JOB_RETRY_BACKOFF', 15) * (2 ** (job.attempts - 1))
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + timedelta(seconds=backoff)
+        else:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+        
+        db.session.commit()
+        
+        if job.status == 'failed':
+            JobQueue._run_failure_handler(job)
+    
+    @staticmethod
+    def _run_failure_handler(job):
+        """Call the on_failure handler of a job that failed for good"""
+        on_failure = JobQueue.failure_handlers.get(job.kind)
+        if not on_failure:
+            return
+        
+        try:
+            on_failure(job.payload or {}, job)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[ERROR] Failure handler for job {job.id} ({job.kind}) raised: {str(e)}")
+    
+    @staticmethod
+    def is_final_attempt(job):
+        """True when a failure of this attempt will not be retried"""
+        return job.attempts >= job.max_attempts
+    
+    @staticmethod
+    def execute(job_id, worker_id):
+        """Run one claimed job (inside an app context)"""
+        job = Job.query.get(job_id)
+        if not job or job.status != 'running' or job.locked_by != worker_id:
+            return
+        
+        handler = JobQueue.handlers.get(job.kind)
+        if handler is None:
+            job.attempts = job.max_attempts  # unknown kind: retrying will not help
+            JobQueue.fail(job, f"No handler registered for job kind '{job.kind}'")
+            return
+        
+        try:
+            result = handler(job.payload or {}, job)
+            JobQueue.complete(job, result)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[ERROR] Job {job_id} ({job.kind}) failed: {str(e)}")
+            print(traceback.format_exc())
+            JobQueue.fail(job, str(e))
+    
+    @staticmethod
+    def run_worker(app, concurrency=2, kinds=None, once=False):
+        """
+        Poll the queue and run jobs on a bounded thread pool until stopped
+        
+        Args:
+            app: Flask application (each job runs in its own app context)
+            concurrency: Max jobs this worker runs at once
+            kinds: Only claim these job kinds (default: all registered kinds)
+            once: Drain currently runnable jobs, then exit
+        """
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        kinds = kinds or list(JobQueue.handlers)
+        stop = threading.Event()
+        inflight = set()
+        inflight_lock = threading.Lock()
+        
+        def request_stop(signum, frame):
+            print(f"[jobs] {worker_id} stopping after in-flight jobs finish")
+            stop.set()
+        
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, request_stop)
+            signal.signal(signal.SIGINT, request_stop)
+        
+        def run(job_id):
+            try:
+                with app.app_context():
+                    JobQueue.execute(job_id, worker_id)
+            finally:
+                with inflight_lock:
+                    inflight.discard(job_id)
+        
+        print(f"[jobs] {worker_id} started (concurrency={concurrency}, kinds={', '.join(kinds)})")
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job') as pool:
+            while not stop.is_set():
+                with inflight_lock:
+                    free = concurrency - len(inflight)
+                
+                claimed = []
+                if free > 0:
+                    with app.app_context():
+                        claimed = JobQueue.claim(worker_id, kinds, limit=free)
+                    with inflight_lock:
+                        inflight.update(claimed)
+                    for job_id in claimed:
+                        pool.submit(run, job_id)
+                
+                if once and not claimed:
+                    with inflight_lock:
+                        idle = not inflight
+                    if idle:
+                        break
+                
+                if not claimed:
+                    stop.wait(app.config.get('JOB_POLL_INTERVAL', 1.0))
+        
+        print(f"[jobs] {worker_id} stopped")
@@ -0,0 +1,171 @@
+"""
+JSON Salvage for SkillPilot AI
+Tolerant parsing of model JSON output: markdown fences, chatter around the JSON,
+truncated responses, and arrays read element by element as a stream arrives
+"""
+import json
+import re
+
+
+_FENCE_PATTERN = re.compile(r"```[a-zA-Z]*\s*\n?")
+
+# Where the next object element may start after a malformed one
+_NEXT_OBJECT_PATTERN = re.compile(r"[,\n]\s*\{")
+
+_decoder = json.JSONDecoder()
+
+
+def strip_code_fences(text):
+    """Remove markdown code fences (```json ... ```) around or inside a response"""
+    return _FENCE_PATTERN.sub('', text or '')
+
+
+def repair_json(text, partial_strings=True):
+    """
+    Parse a JSON object or array, repairing truncation
+    
+    Text before the first bracket is skipped. If the value was cut off, an open string
+    is closed (or, with partial_strings=False, the member holding it dropped) and any
+    dangling key or separator removed before the open brackets are closed.
+    
+    Returns:
+        The parsed value, or None if nothing could be recovered
+    """
+    text = strip_code_fences(text)
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if not starts:
+        return None
+    text = text[min(starts):]
+    
+    try:
+        return _decoder.raw_decode(text)[0]
+    except ValueError:
+        pass
+    
+    stack = []
+    in_string = False
+    escaped = False
+    cuts = []  # (position of a separating comma, brackets open there)
+    
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]':
+            if not stack:
+                break
+            stack.pop()
+        elif ch == ',':
+            cuts.append((i, list(stack)))
+    
+    # Close everything as is, then retry from the last few member boundaries
+    candidates = []
+    if partial_strings or not in_string:
+        candidates.append(text.rstrip(', \n\t') + ('"' if in_string else '') + ''.join(reversed(stack)))
+    candidates += [text[:i] + ''.join(reversed(brackets)) for i, brackets in reversed(cuts[-5:])]
+    
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+class JSONArrayParser:
+    """
+    Incremental parser for a top-level JSON array
+    
+    feed() text chunks as they arrive and get back each element as soon as it is
+    complete; close() returns what can be salvaged from the rest (a truncated last
+    element). A malformed element is skipped, up to the next object, instead of
+    failing the array; this suits arrays of flat objects like roadmap days and quiz
+    questions.
+    """
+    
+    def __init__(self):
+        self._buffer = ''
+        self._pos = None  # index of the next element, once the opening bracket was seen
+        self.done = False
+    
+    def feed(self, chunk):
+        """Add text; returns the list of elements completed by it"""
+        if self.done or not chunk:
+            return []
+        self._buffer += chunk
+        
+        if self._pos is None:
+            start = strip_code_fences(self._buffer).find('[')
+            if start < 0:
+                return []
+            self._buffer = strip_code_fences(self._buffer)[start + 1:]
+            self._pos = 0
+        
+        return self._drain()
+    
+    def close(self):
+        """Finish the stream; returns the elements salvaged from the remaining text"""
+        if self.done or self._pos is None:
+            self.done = True
+            return []
+        
+        items = self._drain()
+        rest = self._buffer[self._pos:].strip()
+        if rest and not self.done:
+            # A cut-off string would be a wrong value (half a topic), so drop it instead
+            value = repair_json(rest, partial_strings=False)
+            if value is not None:
+                items.append(value)
+        self.done = True
+        return items
+    
+    def _drain(self):
+        items = []
+        buffer = self._buffer
+        
+        while True:
+            pos = self._pos
+            while pos < len(buffer) and buffer[pos] in ', \n\r\t':
+                pos += 1
+            self._pos = pos
+            
+            if pos >= len(buffer):
+                return items
+            if buffer[pos] == ']':
+                self.done = True
+                return items
+            if buffer[pos] == '`':
+                # A closing fence without the closing bracket
+                self._pos = len(buffer)
+                return items
+            
+            # Only try to decode once the element could be complete
+            if buffer[pos] in '{[' and '}' not in buffer[pos:] and ']' not in buffer[pos:]:
+                return items
+            
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+            except ValueError:
+                match = _NEXT_OBJECT_PATTERN.search(buffer, pos + 1)
+                if match is None:
+                    return items  # probably still arriving, or the truncated tail
+                self._pos = match.end() - 1
+                continue
+            
+            items.append(value)
+            self._pos = end
+
+
+def salvage_array(text):
+    """All complete (or repairable) elements of the first JSON array in text"""
+    parser = JSONArrayParser()
+    items = parser.feed(text)
+    return items + parser.close()
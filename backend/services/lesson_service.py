@@ -0,0 +1,318 @@
+"""
+Lesson Service for SkillPilot AI
+Builds lesson, resource and quiz rows from AI output (or placeholders) and keeps
+the shared lesson library that tasks with the same topic reuse
+"""
+import hashlib
+import random
+import re
+
+from flask import current_app
+from sqlalchemy import or_
+
+from models import db, Task, LessonContent, LearningResource, Quiz
+
+
+QUESTIONS_PER_QUIZ = 5
+
+# Words of a goal title that do not change what the lessons are about
+DOMAIN_STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'with', 'from', 'my', 'i',
+    'want', 'how', 'learn', 'learning', 'master', 'mastering', 'become', 'get', 'started',
+    'basics', 'fundamentals', 'intro', 'introduction', 'complete', 'guide', 'course',
+    'day', 'days', 'week', 'weeks', 'month', 'months'
+}
+
+_NON_WORD_PATTERN = re.compile(r'[^a-z0-9+#]+')
+
+
+def normalize_text(text):
+    """Lowercase words only: case, punctuation and spacing differences collapse to one form"""
+    return _NON_WORD_PATTERN.sub(' ', (text or '').lower()).strip()
+
+
+def lesson_domain(goal_title):
+    """Subject of a goal ("Learn React in 30 days" -> "react"), falling back to the whole title"""
+    words = normalize_text(goal_title).split()
+    domain = [word for word in words if word not in DOMAIN_STOPWORDS and not word.isdigit()]
+    return ' '.join(domain or words)
+
+
+def lesson_key(topic, level, goal_title):
+    """Library key of a lesson: sha256 of the normalized (topic, level, goal domain)"""
+    parts = [normalize_text(topic), normalize_text(level), lesson_domain(goal_title)]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def quiz_bank_key(topic, level):
+    """Quiz bank key: sha256 of the normalized (topic, level), the inputs of the quiz prompt"""
+    return hashlib.sha256(f'{normalize_text(topic)}|{normalize_text(level)}'.encode('utf-8')).hexdigest()
+
+
+class LessonService:
+    """Service for persisting generated lessons and quizzes"""
+    
+    @staticmethod
+    def placeholder_lesson(topic):
+        """Fallback lesson when AI generation fails"""
+        return {
+            "explanation": f"This lesson covers {topic}. You'll learn the fundamentals and practical applications.",
+            "key_concepts": ["Understanding basics", "Practical implementation", "Best practices"],
+            "example_code": "# Example code for " + topic,
+            "programming_language": "python"
+        }
+    
+    @staticmethod
+    def placeholder_questions(topic):
+        """Fallback quiz questions when AI generation fails"""
+        return [
+            {
+                "question": f"What is the main concept of {topic}?",
+                "options": ["Option A", "Option B", "Option C", "Option D"],
+                "correct_answer": "Option A",
+                "explanation": "This covers the fundamental concept",
+                "difficulty": "easy"
+            }
+        ] * QUESTIONS_PER_QUIZ
+    
+    @staticmethod
+    def learning_resources(topic):
+        """Generate YouTube video recommendations and resources"""
+        # For now, create placeholder resources
+        # In production, you'd use YouTube API or scraping
+        query = topic.replace(" ", "+")
+        
+        return [
+            {
+                'type': 'video',
+                'title': f'{topic} - Complete Tutorial',
+                'url': f'https://www.youtube.com/results?search_query={query}+tutorial',
+                'description': 'Comprehensive video tutorial',
+                'provider': 'youtube',
+                'order': 1
+            },
+            {
+                'type': 'video',
+                'title': f'{topic} - Beginner Guide',
+                'url': f'https://www.youtube.com/results?search_query={query}+beginner',
+                'description': 'Beginner-friendly explanation',
+                'provider': 'youtube',
+                'order': 2
+            },
+            {
+                'type': 'article',
+                'title': f'{topic} - Documentation',
+                'url': f'https://www.google.com/search?q={query}+documentation',
+                'description': 'Official documentation and guides',
+                'provider': 'google',
+                'order': 3
+            }
+        ]
+    
+    @staticmethod
+    def task_lesson_key(task):
+        return lesson_key(task.topic, task.goal.level, task.goal.title)
+    
+    @staticmethod
+    def find_lesson(task):
+        """
+        Lesson shown for a task: its own override, else its library lesson
+        
+        A task not linked yet is linked (and committed) to a library lesson with the
+        same key if one exists. Returns None when the lesson still has to be generated.
+        """
+        if task.lesson_content:
+            return task.lesson_content
+        if task.library_lesson:
+            return task.library_lesson
+        
+        lesson = LessonContent.query.filter_by(lesson_key=LessonService.task_lesson_key(task)).first()
+        if lesson:
+            task.library_lesson = lesson
+            db.session.commit()
+        return lesson
+    
+    @staticmethod
+    def link_library_lessons(tasks):
+        """
+        Point tasks without a lesson at existing library lessons (the caller commits)
+        
+        Returns:
+            Set of ids of the tasks that have a lesson afterwards
+        """
+        task_ids = [task.id for task in tasks]
+        if not task_ids:
+            return set()
+        
+        with_lesson = {
+            task_id for (task_id,) in
+            db.session.query(Task.id).filter(Task.id.in_(task_ids), Task.lesson_id.isnot(None))
+        }
+        with_lesson |= {
+            task_id for (task_id,) in
+            db.session.query(LessonContent.task_id).filter(LessonContent.task_id.in_(task_ids))
+        }
+        
+        keys = {task.id: LessonService.task_lesson_key(task) for task in tasks if task.id not in with_lesson}
+        if keys:
+            library = dict(
+                db.session.query(LessonContent.lesson_key, LessonContent.id)
+                .filter(LessonContent.lesson_key.in_(set(keys.values())))
+            )
+            for task in tasks:
+                if task.id in keys and keys[task.id] in library:
+                    task.lesson_id = library[keys[task.id]]
+                    with_lesson.add(task.id)
+        
+        return with_lesson
+    
+    @staticmethod
+    def add_lesson(task, lesson_data, override=False):
+        """
+        Add a lesson (placeholder if lesson_data is empty) and its resources to the session
+        
+        Generated lessons go to the shared library and the task is linked to them; with
+        override=True (a regenerated lesson) the lesson belongs to the task alone.
+        Placeholders are never shared either, so the next task with the same key still
+        gets a real lesson. The caller commits, so many lessons can be written in one
+        transaction; a concurrent library lesson with the same key fails the commit
+        with an IntegrityError.
+        """
+        shared = bool(lesson_data) and not override
+        if not lesson_data:
+            lesson_data = LessonService.placeholder_lesson(task.topic)
+        
+        lesson = LessonContent(
+            task_id=None if shared else task.id,
+            lesson_key=LessonService.task_lesson_key(task) if shared else None,
+            explanation=lesson_data.get('explanation', ''),
+            key_concepts=lesson_data.get('key_concepts', []),
+            example_code=lesson_data.get('example_code'),
+            programming_language=lesson_data.get('programming_language', 'python')
+        )
+        
+        for res_data in LessonService.learning_resources(task.topic):
+            lesson.resources.append(LearningResource(
+                resource_type=res_data['type'],
+                title=res_data['title'],
+                url=res_data['url'],
+                description=res_data['description'],
+                provider=res_data['provider'],
+                recommended_order=res_data['order']
+            ))
+        
+        db.session.add(lesson)
+        if shared:
+            task.library_lesson = lesson
+        return lesson
+    
+    @staticmethod
+    def quiz_bank_size():
+        return max(current_app.config.get('QUIZ_BANK_SIZE', 10), QUESTIONS_PER_QUIZ)
+    
+    @staticmethod
+    def task_bank_key(task):
+        return quiz_bank_key(task.topic, task.goal.level)
+    
+    @staticmethod
+    def sample_quiz(task, bank):
+        """The task's questions from its bank: a random sample, stable per task so reads need no writes"""
+        bank = sorted(bank, key=lambda quiz: quiz.id or 0)
+        if len(bank) <= QUESTIONS_PER_QUIZ:
+            return bank
+        return random.Random(task.id).sample(bank, QUESTIONS_PER_QUIZ)
+    
+    @staticmethod
+    def find_quiz(task):
+        """Quiz questions of a task (its own, else a sample of its bank); empty if none exist yet"""
+        quizzes = Quiz.query.filter_by(task_id=task.id).order_by(Quiz.id).all()
+        if quizzes:
+            return quizzes
+        return LessonService.sample_quiz(task, Quiz.query.filter_by(bank_key=LessonService.task_bank_key(task)).all())
+    
+    @staticmethod
+    def quiz_questions_for(task, quiz_ids):
+        """The given questions, limited to those that belong to the task's quiz (one query)"""
+        if not quiz_ids:
+            return {}
+        quizzes = Quiz.query.filter(
+            Quiz.id.in_(quiz_ids),
+            or_(Quiz.task_id == task.id, Quiz.bank_key == LessonService.task_bank_key(task))
+        )
+        return {quiz.id: quiz for quiz in quizzes}
+    
+    @staticmethod
+    def tasks_with_quiz(tasks):
+        """Ids of the tasks that already have quiz questions, their own or a bank"""
+        task_ids = [task.id for task in tasks]
+        if not task_ids:
+            return set()
+        
+        with_quiz = {
+            task_id for (task_id,) in
+            db.session.query(Quiz.task_id).filter(Quiz.task_id.in_(task_ids)).distinct()
+        }
+        keys = {task.id: LessonService.task_bank_key(task) for task in tasks if task.id not in with_quiz}
+        if keys:
+            banks = {
+                key for (key,) in
+                db.session.query(Quiz.bank_key).filter(Quiz.bank_key.in_(set(keys.values()))).distinct()
+            }
+            with_quiz |= {task_id for task_id, key in keys.items() if key in banks}
+        
+        return with_quiz
+    
+    @staticmethod
+    def record_quiz_results(correct_ids, incorrect_ids):
+        """
+        Count graded answers on the questions (the caller commits)
+        
+        SQL-side increments, so concurrent submissions do not lose counts
+        """
+        if correct_ids:
+            Quiz.query.filter(Quiz.id.in_(correct_ids)).update({
+                Quiz.attempt_count: Quiz.attempt_count + 1,
+                Quiz.correct_count: Quiz.correct_count + 1
+            }, synchronize_session=False)
+        if incorrect_ids:
+            Quiz.query.filter(Quiz.id.in_(incorrect_ids)).update({
+                Quiz.attempt_count: Quiz.attempt_count + 1
+            }, synchronize_session=False)
+    
+    @staticmethod
+    def add_quiz(task, questions):
+        """
+        Add quiz questions (placeholders if questions is empty) to the session; the caller commits
+        
+        Generated questions fill the task's quiz bank. Placeholders belong to the task
+        alone, so the bank is still generated for the next task with the same topic.
+        
+        Returns:
+            The task's questions (a sample of the bank)
+        """
+        shared = bool(questions)
+        if not questions:
+            questions = LessonService.placeholder_questions(task.topic)
+        
+        bank_key = LessonService.task_bank_key(task) if shared else None
+        limit = LessonService.quiz_bank_size() if shared else QUESTIONS_PER_QUIZ
+        
+        quizzes = []
+        for q_data in questions[:limit]:
+            quiz = Quiz(
+                task_id=None if shared else task.id,
+                bank_key=bank_key,
+                question=q_data.get('question', ''),
+                question_type='multiple_choice',
+                options=q_data.get('options', []),
+                correct_answer=q_data.get('correct_answer', ''),
+                explanation=q_data.get('explanation', ''),
+                difficulty=q_data.get('difficulty', 'medium')
+            )
+            db.session.add(quiz)
+            quizzes.append(quiz)
+        
+        if shared:
+            db.session.flush()
+            return LessonService.sample_quiz(task, quizzes)
+        return quizzes
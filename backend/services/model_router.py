@@ -0,0 +1,127 @@
+"""
+Model Router for SkillPilot AI
+Picks the Groq model for each AI call from the request kind's route (AI_MODEL_ROUTES),
+the prompt size and live per-model latency, and plans the fallback cascade
+"""
+import threading
+import time
+
+
+# Model used for kinds without a route
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+
+def estimate_prompt_tokens(messages):
+    """Rough prompt size (about 4 characters per token plus per-message overhead)"""
+    return sum(len(str(msg.get('content', ''))) // 4 + 4 for msg in messages)
+
+
+class ModelRouter:
+    """
+    Routing table: per request kind, models in preference order and a latency SLO
+    
+    A call tries its planned models in order until one answers. A model is left
+    out of the plan when the request (prompt + max_tokens) exceeds its per-request
+    token limit, or - unless it is the last resort - when its observed p95 latency
+    is already above the SLO. Slow models still get every PROBE_EVERY-th call so
+    their latency estimate can recover.
+    
+    Attempt timeouts split the SLO: an attempt with fallbacks behind it gets at most
+    its breaker's adaptive timeout and leaves CASCADE_RESERVE of the remaining time
+    for them; the last attempt gets whatever is left.
+    """
+    
+    PROBE_EVERY = 20
+    CASCADE_RESERVE = 0.35
+    MIN_ATTEMPT_TIMEOUT = 1.0
+    
+    def __init__(self):
+        self.routes = {}
+        self.max_request_tokens = {}
+        self._skips = {}
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        """Read AI_MODEL_ROUTES and AI_MODEL_MAX_REQUEST_TOKENS from the Flask config"""
+        self.routes = app.config.get('AI_MODEL_ROUTES', {})
+        self.max_request_tokens = app.config.get('AI_MODEL_MAX_REQUEST_TOKENS', {})
+    
+    def primary(self, kind):
+        """Preferred model for a kind (responses are cached under it)"""
+        models = (self.routes.get(kind) or {}).get('models')
+        return models[0] if models else DEFAULT_MODEL
+    
+    def slo(self, kind):
+        return (self.routes.get(kind) or {}).get('slo')
+    
+    def _probe(self, model):
+        """Whether a model skipped as slow should get this call anyway"""
+        with self._lock:
+            self._skips[model] = self._skips.get(model, 0) + 1
+            return self._skips[model] % self.PROBE_EVERY == 0
+    
+    def plan(self, kind, model, messages, max_tokens, breaker_for):
+        """
+        Models to try for one call, in order
+        
+        Args:
+            kind: Request kind (key of AI_MODEL_ROUTES)
+            model: Model the request was built for; kinds routed elsewhere just use it
+            messages: Chat messages (for the prompt size)
+            max_tokens: Completion token limit
+            breaker_for: Callable returning a model's CircuitBreaker (live latency)
+        
+        Returns:
+            List of (model, reason); reason is 'primary', 'too_large' or 'slow' for the
+            first entry (why the primary was passed over) and 'cascade' after it
+        """
+        models = list((self.routes.get(kind) or {}).get('models') or [])
+        if not models or models[0] != model:
+            return [(model, 'primary')]
+        
+        slo = self.slo(kind)
+        request_tokens = estimate_prompt_tokens(messages) + max_tokens
+        planned = []
+        skipped = None  # why the models before the first planned one were passed over
+        
+        for index, name in enumerate(models):
+            is_last = index == len(models) - 1
+            limit = self.max_request_tokens.get(name)
+            if limit and request_tokens > limit and not (is_last and not planned):
+                skipped = skipped or 'too_large'
+                continue
+            
+            p95 = breaker_for(name).p95()
+            if slo and p95 is not None and p95 > slo and not is_last and not self._probe(name):
+                skipped = skipped or 'slow'
+                continue
+            
+            planned.append((name, (skipped or 'primary') if not planned else 'cascade'))
+        
+        return planned
+    
+    def attempts(self, kind, plan, breaker_for):
+        """
+        Yield (model, reason, timeout) for each attempt of a planned call
+        
+        Stops early once the SLO leaves no time for another attempt
+        """
+        slo = self.slo(kind)
+        deadline = time.monotonic() + slo if slo else None
+        
+        for index, (name, reason) in enumerate(plan):
+            timeout = breaker_for(name).timeout()
+            
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if index > 0 and remaining < self.MIN_ATTEMPT_TIMEOUT:
+                    return
+                if index < len(plan) - 1:
+                    remaining *= 1 - self.CASCADE_RESERVE
+                timeout = min(timeout, max(remaining, self.MIN_ATTEMPT_TIMEOUT))
+            
+            yield name, reason, timeout
+
+
+# Shared model router
+model_router = ModelRouter()
@@ -0,0 +1,164 @@
+"""
+Prefetch Service for SkillPilot AI
+Speculatively generates the lessons and quizzes of the next days in the background,
+so opening tomorrow's task is a read instead of a wait on the AI
+"""
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Job, Task
+from services.ai_service import AIService
+from services.job_queue import JobQueue
+from services.lesson_service import LessonService
+from services.rate_limiter import rate_limiter, RateLimitExceeded
+from services.single_flight import single_flight, SingleFlightTimeout
+
+
+class PrefetchService:
+    """Service for prefetching upcoming tasks' content"""
+    
+    @staticmethod
+    def upcoming_tasks(task, count):
+        """The next `count` pending tasks of the task's goal, in day order"""
+        return (
+            Task.query
+            .filter(Task.goal_id == task.goal_id, Task.day_number > task.day_number, Task.status == 'pending')
+            .order_by(Task.day_number)
+            .limit(count)
+            .all()
+        )
+    
+    @staticmethod
+    def missing_content(tasks):
+        """
+        (task, needs_lesson, needs_quiz) for tasks lacking content
+        
+        Lessons already in the shared library are linked on the way (the caller commits),
+        so those tasks need no generation at all
+        """
+        with_lesson = LessonService.link_library_lessons(tasks)
+        with_quiz = LessonService.tasks_with_quiz(tasks)
+        return [
+            (task, task.id not in with_lesson, task.id not in with_quiz)
+            for task in tasks
+            if task.id not in with_lesson or task.id not in with_quiz
+        ]
+    
+    @staticmethod
+    def has_budget():
+        """Whether speculative calls fit: the global AI bucket keeps PREFETCH_GLOBAL_RESERVE for users"""
+        reserve = current_app.config.get('PREFETCH_GLOBAL_RESERVE', 0.5)
+        return rate_limiter.headroom('global') > reserve
+    
+    @staticmethod
+    def schedule(task):
+        """
+        Queue background generation for the tasks after `task` (commits)
+        
+        Called when a task is completed or its lesson viewed. Nothing is queued when
+        prefetching is disabled, the next tasks already have their content, the AI
+        budget is short, or a prefetch for the same tasks is still queued or running.
+        
+        Returns:
+            The queued Job, or None
+        """
+        config = current_app.config
+        if not config.get('PREFETCH_ENABLED', False) or not AIService.is_available():
+            return None
+        
+        try:
+            upcoming = PrefetchService.upcoming_tasks(task, config.get('PREFETCH_AHEAD', 2))
+            pending = PrefetchService.missing_content(upcoming)
+            db.session.commit()
+            
+            if not pending or not PrefetchService.has_budget():
+                return None
+            
+            task_ids = [pending_task.id for pending_task, _, _ in pending]
+            active = Job.query.filter(
+                Job.kind == 'prefetch_tasks',
+                Job.user_id == task.goal.user_id,
+                Job.status.in_(['queued', 'running'])
+            ).all()
+            if any(set(task_ids) <= set((job.payload or {}).get('task_ids', [])) for job in active):
+                return None
+            
+            job = JobQueue.enqueue('prefetch_tasks', {'task_ids': task_ids}, user_id=task.goal.user_id, max_attempts=1)
+            db.session.commit()
+            return job
+        except Exception as e:
+            # Prefetching is an optimization; it must never fail the user's request
+            db.session.rollback()
+            print(f"[ERROR] Prefetch scheduling failed for task {task.id}: {str(e)}")
+            return None
+    
+    @staticmethod
+    def prefetch(task_ids):
+        """
+        Generate the missing lessons and quizzes of the given tasks
+        
+        Each generation runs under the same single-flight key as a user request, so a
+        user opening the task meanwhile waits for this result instead of generating it
+        again. Calls are charged to the global AI bucket only, and the run stops once
+        the budget reserve is reached. Failures are not replaced by placeholders; the
+        content is generated lazily when the user opens the task.
+        
+        Returns:
+            Dict with counts of prefetched lessons/quizzes
+        """
+        tasks = Task.query.filter(Task.id.in_(task_ids)).order_by(Task.day_number).all()
+        pending = PrefetchService.missing_content(tasks)
+        db.session.commit()
+        stats = {'lessons': 0, 'quizzes': 0, 'skipped': 0}
+        
+        for task, needs_lesson, needs_quiz in pending:
+            for kind, needed in (('lesson', needs_lesson), ('quiz', needs_quiz)):
+                if not needed:
+                    continue
+                if not PrefetchService.has_budget():
+                    stats['skipped'] += 1
+                    continue
+                
+                try:
+                    if PrefetchService._generate(task, kind):
+                        stats['lessons' if kind == 'lesson' else 'quizzes'] += 1
+                except (RateLimitExceeded, SingleFlightTimeout):
+                    stats['skipped'] += 1
+        
+        return stats
+    
+    @staticmethod
+    def _generate(task, kind):
+        """Generate one lesson or quiz bank under its single-flight key; True if this call stored it"""
+        goal = task.goal
+        stored = []
+        
+        def generate():
+            rate_limiter.consume(goal.user_id, kind, scopes=('global',), count=LessonService.quiz_bank_size())
+            if kind == 'lesson':
+                data = AIService.generate_lesson(task.topic, goal.level, goal.title)
+                result = LessonService.add_lesson(task, data) if data else None
+            else:
+                data = AIService.generate_quiz_questions(task.topic, goal.level, count=LessonService.quiz_bank_size())
+                result = LessonService.add_quiz(task, data) if data else None
+            
+            if result:
+                try:
+                    db.session.commit()
+                    stored.append(result)
+                except IntegrityError:
+                    # Stored concurrently by a user request
+                    db.session.rollback()
+            return result
+        
+        if kind == 'lesson':
+            single_flight.do(f'lesson:{LessonService.task_lesson_key(task)}', generate, lambda: LessonService.find_lesson(task))
+        else:
+            single_flight.do(f'quiz:{LessonService.task_bank_key(task)}', generate, lambda: LessonService.find_quiz(task))
+        return bool(stored)
+
+
+@JobQueue.handler('prefetch_tasks')
+def prefetch_tasks_job(payload, job):
+    """Job handler: generate the content of upcoming tasks"""
+    return PrefetchService.prefetch(payload.get('task_ids', []))
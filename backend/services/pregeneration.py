@@ -0,0 +1,150 @@
+"""
+Pre-generation Service for SkillPilot AI
+Generates every lesson and quiz of a goal ahead of time, in resumable batches
+"""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Goal, Task
+from services.ai_service import AIService
+from services.job_queue import JobQueue
+from services.lesson_service import LessonService
+
+
+class PregenerationService:
+    """Service for bulk lesson/quiz generation"""
+    
+    @staticmethod
+    def missing_content(goal_id):
+        """
+        Tasks of a goal still lacking a lesson or a quiz, in day order
+        
+        Existing rows are the checkpoint: a re-run skips everything already stored.
+        Tasks whose lesson is already in the shared library are linked to it here.
+        
+        Returns:
+            List of (task, needs_lesson, needs_quiz) tuples
+        """
+        tasks = Task.query.filter_by(goal_id=goal_id).order_by(Task.day_number).all()
+        if not tasks:
+            return []
+        
+        with_lesson = LessonService.link_library_lessons(tasks)
+        db.session.commit()
+        with_quiz = LessonService.tasks_with_quiz(tasks)
+        
+        return [
+            (task, task.id not in with_lesson, task.id not in with_quiz)
+            for task in tasks
+            if task.id not in with_lesson or task.id not in with_quiz
+        ]
+    
+    @staticmethod
+    def pregenerate_goal(goal_id, job=None, batch_size=None):
+        """
+        Generate all missing lessons and quizzes for a goal
+        
+        Each batch is generated in parallel (bounded by AI_MAX_CONCURRENCY) and written in
+        one transaction. When run as a job, progress is checkpointed on the job row and the
+        visibility timeout is extended after every batch.
+        
+        Returns:
+            Dict with counts of generated lessons/quizzes
+        """
+        goal = Goal.query.get(goal_id)
+        if not goal:
+            return {'skipped': 'goal deleted'}
+        
+        if not AIService.is_available():
+            # Placeholders are cheaper to create lazily than to store up front
+            return {'skipped': 'AI service is not available'}
+        
+        batch_size = batch_size or current_app.config.get('PREGENERATION_BATCH_SIZE', 5)
+        pending = PregenerationService.missing_content(goal_id)
+        stats = {'goal_id': goal_id, 'lessons': 0, 'quizzes': 0, 'failed': 0, 'remaining': len(pending)}
+        
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            items = [(task.topic, goal.level, goal.title) for task, _, _ in batch]
+            
+            results = AIService.generate_lessons_parallel(items, quiz_count=LessonService.quiz_bank_size())
+            lessons, quizzes, failed = PregenerationService._write_batch(batch, results)
+            
+            stats['lessons'] += lessons
+            stats['quizzes'] += quizzes
+            stats['failed'] += failed
+            stats['remaining'] = len(pending) - start - len(batch)
+            stats['last_day'] = batch[-1][0].day_number
+            
+            if job is not None:
+                job.result = dict(stats, checkpoint_at=datetime.utcnow().isoformat())
+                JobQueue.heartbeat(job)
+        
+        return stats
+    
+    @staticmethod
+    def _write_batch(batch, results):
+        """
+        Store one batch in a single transaction, skipping rows created meanwhile (e.g. by a user visit)
+        
+        Lessons stored in the library meanwhile are linked instead of added again. Failed
+        generations are not replaced by placeholders; they are retried by the next run or
+        generated lazily when the user opens the task
+        """
+        with_lesson = LessonService.link_library_lessons([task for task, _, _ in batch])
+        with_quiz = LessonService.tasks_with_quiz([task for task, _, _ in batch])
+        
+        lessons = quizzes = failed = 0
+        added = {}
+        banks = set()
+        for (task, needs_lesson, needs_quiz), (lesson_data, questions) in zip(batch, results):
+            if needs_lesson and task.id not in with_lesson:
+                if lesson_data:
+                    # Tasks of one batch can share a key; the first lesson serves them all
+                    key = LessonService.task_lesson_key(task)
+                    if key in added:
+                        task.library_lesson = added[key]
+                    else:
+                        added[key] = LessonService.add_lesson(task, lesson_data)
+                        lessons += 1
+                else:
+                    failed += 1
+            if needs_quiz and task.id not in with_quiz:
+                if questions:
+                    # Like lessons, the first quiz bank of a batch serves its other tasks
+                    key = LessonService.task_bank_key(task)
+                    if key not in banks:
+                        banks.add(key)
+                        LessonService.add_quiz(task, questions)
+                        quizzes += 1
+                else:
+                    failed += 1
+        
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A lesson was generated concurrently; the next run picks up the rest
+            db.session.rollback()
+            return 0, 0, failed
+        
+        return lessons, quizzes, failed
+    
+    @staticmethod
+    def enqueue(goal_id, user_id=None):
+        """Queue pre-generation for a goal (caller commits)"""
+        return JobQueue.enqueue('pregenerate_goal', {'goal_id': goal_id}, user_id=user_id)
+    
+    @staticmethod
+    def enqueue_after_roadmap(goal):
+        """Queue pre-generation for a goal with a fresh AI roadmap, if enabled (caller commits)"""
+        if not goal.roadmap_generated or not current_app.config.get('PREGENERATE_AFTER_ROADMAP', False):
+            return None
+        return PregenerationService.enqueue(goal.id, user_id=goal.user_id)
+
+
+@JobQueue.handler('pregenerate_goal')
+def pregenerate_goal_job(payload, job):
+    """Job handler: generate all lessons and quizzes for a goal"""
+    return PregenerationService.pregenerate_goal(payload['goal_id'], job=job)
@@ -3,12 +3,24 @@ Progress Service for SkillPilot AI
 Handles all progress calculations, streak logic, and insights
 """
 from datetime import datetime, timedelta
-from models import Progress, Task, Goal
+from models import db, Progress, Task, Goal, DailyCompletionStat
+from services.goal_analytics import GoalAnalytics, NUMPY_AVAILABLE
 
 
 class ProgressService:
     """Service for progress and streak calculations"""
     
+    @staticmethod
+    def get_progress(goal):
+        """The goal's progress row, rebuilt from its tasks if it is missing"""
+        if goal.progress:
+            return goal.progress
+        progress = Progress(goal_id=goal.id)
+        db.session.add(progress)
+        progress.recompute()
+        db.session.commit()
+        return progress
+    
     @staticmethod
     def calculate_completion_percentage(goal_id):
         """
@@ -29,8 +41,8 @@ class ProgressService:
     @staticmethod
     def calculate_streak(goal_id):
         """
-        Calculate streak:
-        - If task completed today and yesterday also completed → increment
+        Calculate streak from the goal's activity bitmap:
+        - Consecutive calendar days with a completed task, up to today (or yesterday)
         - If missed day → reset
         - Return: (current_streak, longest_streak)
         """
@@ -38,42 +50,35 @@ class ProgressService:
         if not goal:
             return 0, 0
         
-        sorted_tasks = sorted(goal.tasks, key=lambda t: t.day_number)
-        current_streak = 0
-        max_streak = 0
-        
-        for task in sorted_tasks:
-            if task.status == 'completed':
-                current_streak += 1
-                max_streak = max(max_streak, current_streak)
-            else:
-                current_streak = 0
-        
-        return current_streak, max_streak
+        progress = ProgressService.get_progress(goal)
+        return progress.streak, progress.longest_streak or 0
     
     @staticmethod
     def detect_missed_days(goal_id):
-        """Detect if user has missed completing daily tasks"""
+        """Detect if user has missed completing daily tasks (due days are read from the task bitmap)"""
         goal = Goal.query.get(goal_id)
         if not goal:
             return []
         
-        today = datetime.utcnow().date()
-        missed_days = []
+        day_numbers = ProgressService.get_progress(goal).missed_day_numbers()
+        if not day_numbers:
+            return []
         
-        sorted_tasks = sorted(goal.tasks, key=lambda t: t.day_number)
+        start = goal.created_at.date()
+        tasks = (
+            db.session.query(Task.day_number, Task.topic)
+            .filter(Task.goal_id == goal_id, Task.day_number.in_(day_numbers), Task.status == 'pending')
+            .order_by(Task.day_number)
+        )
         
-        for i, task in enumerate(sorted_tasks):
-            expected_date = goal.created_at.date() + timedelta(days=task.day_number - 1)
-            
-            if expected_date <= today and task.status == 'pending':
-                missed_days.append({
-                    'day_number': task.day_number,
-                    'topic': task.topic,
-                    'expected_date': expected_date.isoformat()
-                })
-        
-        return missed_days
+        return [
+            {
+                'day_number': day_number,
+                'topic': topic,
+                'expected_date': (start + timedelta(days=day_number - 1)).isoformat()
+            }
+            for day_number, topic in tasks
+        ]
     
     @staticmethod
     def suggest_catch_up_plan(goal_id):
@@ -121,40 +126,36 @@ class ProgressService:
         if not goal:
             return None
         
-        progress = goal.progress
-        if not progress:
-            # Create if doesn't exist
-            from models import db
-            progress = Progress(goal_id=goal_id)
-            db.session.add(progress)
-            db.session.commit()
+        progress = ProgressService.get_progress(goal)
         
-        tasks = goal.tasks
-        completed_tasks = sum(1 for t in tasks if t.status == 'completed')
-        pending_tasks = len(tasks) - completed_tasks
+        completed_tasks = progress.completed_count
+        pending_tasks = progress.total_count - completed_tasks
         
         # Calculate weekly progress (progress over last 7 days)
         today = datetime.utcnow().date()
         week_ago = today - timedelta(days=7)
         
-        weekly_completed = sum(1 for t in tasks if t.completed_at and 
-                             week_ago <= t.completed_at.date() <= today and 
-                             t.status == 'completed')
+        weekly_completed = sum(DailyCompletionStat.completions_between(goal_id, week_ago, today).values())
         
         current_streak, longest_streak = ProgressService.calculate_streak(goal_id)
         
+        # Velocity, pace and projection come from the vectorized analytics when numpy is installed
+        analytics = GoalAnalytics.for_goal(goal_id) if NUMPY_AVAILABLE else None
+        
         return {
             'completion_percentage': round(progress.completion_percentage, 2),
             'current_streak': current_streak,
             'longest_streak': longest_streak,
             'completed_tasks': completed_tasks,
             'pending_tasks': pending_tasks,
-            'total_tasks': len(tasks),
+            'total_tasks': progress.total_count,
             'weekly_completed': weekly_completed,
             'goal_title': goal.title,
             'goal_level': goal.level,
             'days_remaining': ProgressService._calculate_days_remaining(goal),
-            'current_pace': ProgressService._calculate_pace(goal)
+            'current_pace': analytics['pace']['status'] if analytics else ProgressService._calculate_pace(goal),
+            'velocity': analytics['velocity']['last_7_days'] if analytics else None,
+            'projected_completion_date': analytics['projected_completion_date'] if analytics else None
         }
     
     @staticmethod
@@ -170,7 +171,7 @@ class ProgressService:
     @staticmethod
     def _calculate_pace(goal):
         """Calculate if user is on pace to complete goal"""
-        if not goal.deadline or not goal.tasks:
+        if not goal.deadline or not (goal.progress and goal.progress.total_count):
             return 'on-track'
         
         today = datetime.utcnow().date()
@@ -207,7 +208,11 @@ class ProgressService:
         if day_number > 30:
             return None  # Goal period is over
         
-        task = next((t for t in goal.tasks if t.day_number == day_number), None)
+        # Today's task is done: answered from the task bitmap without loading it
+        if ProgressService.get_progress(goal).is_day_completed(day_number):
+            return {'should_remind': False}
+        
+        task = Task.query.filter_by(goal_id=goal_id, day_number=day_number).first()
         
         if task and task.status == 'pending':
             return {
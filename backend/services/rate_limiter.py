@@ -0,0 +1,271 @@
+"""
+Rate Limiter for SkillPilot AI
+Token-bucket quotas on AI usage, per user and global, shared across workers
+"""
+import threading
+import time
+from functools import wraps
+
+from flask import g
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, RateLimitBucket
+from services.ai_service import AIService
+
+
+class RateLimitExceeded(Exception):
+    """Raised when an AI call does not fit in a bucket; carries the Retry-After delay"""
+    
+    def __init__(self, scope, retry_after):
+        super().__init__(f"AI rate limit exceeded ({scope})")
+        self.scope = scope
+        self.retry_after = retry_after
+    
+    def to_dict(self):
+        return {
+            'error': 'Rate limit exceeded',
+            'message': 'You are sending AI requests too quickly. Please wait and try again.' if self.scope == 'user'
+            else 'The AI service is busy. Please try again shortly.',
+            'scope': self.scope,
+            'retry_after': self.retry_after
+        }
+
+
+def _refill(tokens, refilled_at, now, capacity, rate):
+    return min(capacity, tokens + max(0.0, now - refilled_at) * rate)
+
+
+class MemoryBucketStore:
+    """Buckets in process memory (single worker, development and tests)"""
+    
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+    
+    def take(self, key, cost, capacity, rate):
+        """
+        Take `cost` tokens if available (a negative cost refunds)
+        
+        Returns:
+            (allowed, tokens_left)
+        """
+        now = time.time()
+        with self._lock:
+            tokens, refilled_at = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, refilled_at, now, capacity, rate)
+            if tokens < cost:
+                return False, tokens
+            self._buckets[key] = (min(capacity, tokens - cost), now)
+            return True, min(capacity, tokens - cost)
+    
+    def peek(self, key, capacity, rate):
+        now = time.time()
+        with self._lock:
+            tokens, refilled_at = self._buckets.get(key, (capacity, now))
+        return _refill(tokens, refilled_at, now, capacity, rate)
+
+
+class DatabaseBucketStore:
+    """Buckets in the rate_limit_buckets table, shared by all gunicorn workers"""
+    
+    MAX_RETRIES = 5
+    
+    def take(self, key, cost, capacity, rate):
+        """
+        Take `cost` tokens if available (a negative cost refunds)
+        
+        Each attempt reads the bucket and writes it back with a version check, so
+        concurrent workers never both spend the same tokens; losers retry.
+        
+        Returns:
+            (allowed, tokens_left)
+        """
+        table = RateLimitBucket.__table__
+        
+        for _ in range(self.MAX_RETRIES):
+            now = time.time()
+            try:
+                with db.engine.begin() as conn:
+                    row = conn.execute(
+                        select(table.c.tokens, table.c.refilled_at, table.c.version)
+                        .where(table.c.bucket_key == key)
+                    ).first()
+                    
+                    if row is None:
+                        tokens = capacity
+                        if tokens < cost:
+                            return False, tokens
+                        conn.execute(insert(table).values(
+                            bucket_key=key,
+                            tokens=min(capacity, tokens - cost),
+                            refilled_at=now,
+                            version=0
+                        ))
+                        return True, min(capacity, tokens - cost)
+                    
+                    tokens = _refill(row.tokens, row.refilled_at, now, capacity, rate)
+                    if tokens < cost:
+                        return False, tokens
+                    
+                    result = conn.execute(
+                        update(table)
+                        .where(table.c.bucket_key == key, table.c.version == row.version)
+                        .values(tokens=min(capacity, tokens - cost), refilled_at=now, version=row.version + 1)
+                    )
+                    if result.rowcount == 1:
+                        return True, min(capacity, tokens - cost)
+            except IntegrityError:
+                pass  # another worker created the bucket first
+            except Exception as e:
+                # Never take the AI features down because the limiter store failed
+                print(f"[ERROR] Rate limit store failed, allowing request: {str(e)}")
+                return True, 0.0
+        
+        # Heavy contention: let the call through rather than fail a user request
+        print(f"[ERROR] Rate limit bucket {key} contended, allowing request")
+        return True, 0.0
+    
+    def peek(self, key, capacity, rate):
+        table = RateLimitBucket.__table__
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(table.c.tokens, table.c.refilled_at).where(table.c.bucket_key == key)
+            ).first()
+        if row is None:
+            return capacity
+        return _refill(row.tokens, row.refilled_at, time.time(), capacity, rate)
+
+
+class RateLimiter:
+    """
+    Two token buckets per AI call: the user's and a global one protecting the Groq budget
+    
+    Buckets hold LLM tokens: a call costs its request's max_tokens (AIService.max_tokens),
+    so a roadmap weighs eight chat replies. Buckets refill continuously up to their capacity.
+    """
+    
+    def __init__(self):
+        self.enabled = True
+        self.store = MemoryBucketStore()
+        self.limits = {
+            'user': (5000, 2000 / 60.0),
+            'global': (100000, 50000 / 60.0)
+        }
+    
+    def init_app(self, app):
+        """Configure buckets and storage ('database' or 'memory') from app config"""
+        self.enabled = app.config.get('AI_RATE_LIMIT_ENABLED', True)
+        storage = app.config.get('AI_RATE_LIMIT_STORAGE', 'database')
+        self.store = DatabaseBucketStore() if storage == 'database' else MemoryBucketStore()
+        self.limits = {
+            'user': (
+                app.config.get('AI_RATE_LIMIT_USER_CAPACITY', 5000),
+                app.config.get('AI_RATE_LIMIT_USER_PER_MINUTE', 2000) / 60.0
+            ),
+            'global': (
+                app.config.get('AI_RATE_LIMIT_GLOBAL_CAPACITY', 100000),
+                app.config.get('AI_RATE_LIMIT_GLOBAL_PER_MINUTE', 50000) / 60.0
+            )
+        }
+    
+    @staticmethod
+    def _keys(user_id):
+        return {'user': f"ai:user:{user_id}", 'global': 'ai:global'}
+    
+    @staticmethod
+    def cost(kind, count=None):
+        """Weight of one AI call of this kind (quiz banks: of `count` questions), in tokens"""
+        return AIService.max_tokens(kind, count)
+    
+    def consume(self, user_id, kind, scopes=('user', 'global'), count=None):
+        """
+        Charge one AI call of `kind` to the user and global buckets
+        
+        Background work no user is waiting for passes scopes=('global',) so it does
+        not eat into the user's quota.
+        
+        Returns:
+            The charges taken, [(scope, tokens)], for refund()
+        
+        Raises RateLimitExceeded (nothing is charged) if either bucket is short
+        """
+        if not self.enabled:
+            return []
+        
+        keys = self._keys(user_id)
+        taken = []
+        
+        for scope in scopes:
+            capacity, rate = self.limits[scope]
+            cost = min(self.cost(kind, count), capacity)  # a call bigger than the bucket could never run
+            allowed, tokens = self.store.take(keys[scope], cost, capacity, rate)
+            
+            if not allowed:
+                self.refund(user_id, taken)
+                raise RateLimitExceeded(scope, max(1, int((cost - tokens) / rate + 0.999)))
+            
+            taken.append((scope, cost))
+        
+        return taken
+    
+    def refund(self, user_id, taken):
+        """Give back charges returned by consume() for a call that never reached Groq"""
+        keys = self._keys(user_id)
+        for scope, cost in taken:
+            self.store.take(keys[scope], -cost, *self.limits[scope])
+    
+    def headroom(self, scope='global', user_id=None):
+        """Fraction of a bucket currently available (1.0 when rate limiting is off)"""
+        if not self.enabled:
+            return 1.0
+        capacity, rate = self.limits[scope]
+        return self.store.peek(self._keys(user_id)[scope], capacity, rate) / capacity
+    
+    def get_usage(self, user_id):
+        """Remaining quota per bucket, for the quota endpoint"""
+        keys = self._keys(user_id)
+        usage = {}
+        
+        for scope, (capacity, rate) in self.limits.items():
+            remaining = self.store.peek(keys[scope], capacity, rate) if self.enabled else capacity
+            usage[scope] = {
+                'capacity': capacity,
+                'remaining': int(remaining),
+                'refill_per_minute': int(rate * 60),
+                'full_in': int((capacity - remaining) / rate) if rate else None
+            }
+        
+        return usage
+
+
+# Shared rate limiter instance
+rate_limiter = RateLimiter()
+
+
+def rate_limited(kind):
+    """
+    Route decorator (below @jwt_required): charge one AI call of `kind` to the current user
+    
+    The charge is taken before the view so an exhausted quota is rejected up front, and
+    refunded when the view made no Groq call (answered from the response or topic cache,
+    invalid input, AI unavailable). Streamed responses call Groq after the view returns
+    and keep the charge.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            user_id = get_jwt_identity()
+            taken = rate_limiter.consume(user_id, kind)
+            g.ai_upstream_called = False
+            response = None
+            
+            try:
+                response = fn(*args, **kwargs)
+                return response
+            finally:
+                if not g.ai_upstream_called and not getattr(response, 'is_streamed', False):
+                    rate_limiter.refund(user_id, taken)
+        return wrapper
+    return decorator
@@ -0,0 +1,162 @@
+"""
+Single-Flight Generation for SkillPilot AI
+Collapses concurrent identical AI generations into one upstream call,
+within a process (shared in-memory call slots) and across workers (database lease row)
+"""
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
+
+from models import db, GenerationLease
+
+
+class SingleFlightTimeout(Exception):
+    """Raised when a follower gives up waiting for the leader's result"""
+
+
+class _Call:
+    """In-process slot for one key: the leading thread owns it, followers wait on it"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.owner = f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+
+
+class SingleFlight:
+    """Run a generation once per key; everyone else waits and reads the stored result"""
+    
+    POLL_INTERVAL = 0.25  # seconds between database checks while another worker leads
+    
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key, fn, lookup):
+        """
+        Return the stored result for key, generating it at most once
+        
+        Args:
+            key: Identity of the generation, e.g. "lesson:42"
+            fn: Generates and stores the result (called by the leader only)
+            lookup: Reads the stored result; falsy when it does not exist yet
+        
+        Raises SingleFlightTimeout if another leader does not finish in time
+        """
+        with self.lead(key, lookup) as existing:
+            if existing:
+                return existing
+            return fn()
+    
+    @contextmanager
+    def lead(self, key, lookup):
+        """
+        Context manager form of do() for callers that generate incrementally (e.g. streams)
+        
+        Yields the existing result if another caller produced it, or None when the
+        caller is the leader and must generate; the lease is released on exit.
+        """
+        existing, call = self._wait_turn(key, lookup)
+        if existing:
+            yield existing
+            return
+        
+        try:
+            yield None
+        finally:
+            self._release_lease(key, call.owner)
+            self._leave(key, call)
+    
+    # Internal helpers
+    
+    def _wait_turn(self, key, lookup):
+        """Block until a result exists or this caller holds both the local slot and the lease"""
+        deadline = time.monotonic() + current_app.config.get('GENERATION_WAIT_TIMEOUT', 90)
+        
+        while True:
+            existing = lookup()
+            if existing:
+                return existing, None
+            
+            with self._lock:
+                call = self._calls.get(key)
+                is_local_leader = call is None
+                if is_local_leader:
+                    call = self._calls[key] = _Call()
+            
+            if not is_local_leader:
+                # Another thread in this process is generating; wait for it, then re-read
+                if not call.done.wait(max(0, deadline - time.monotonic())):
+                    raise SingleFlightTimeout(key)
+                continue
+            
+            # Local leader: hold the slot while competing for the cross-worker lease,
+            # so local followers keep waiting on the event instead of polling the database
+            try:
+                while not self._acquire_lease(key, call.owner):
+                    if time.monotonic() >= deadline:
+                        raise SingleFlightTimeout(key)
+                    time.sleep(self.POLL_INTERVAL)
+                    
+                    existing = lookup()
+                    if existing:
+                        self._leave(key, call)
+                        return existing, None
+            except BaseException:
+                self._leave(key, call)
+                raise
+            
+            # The previous leader may have finished between our lookup and the lease
+            existing = lookup()
+            if existing:
+                self._release_lease(key, call.owner)
+                self._leave(key, call)
+                return existing, None
+            
+            return None, call
+    
+    def _leave(self, key, call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+    
+    def _acquire_lease(self, key, owner):
+        table = GenerationLease.__table__
+        now = datetime.utcnow()
+        ttl = current_app.config.get('GENERATION_LEASE_TTL', 120)
+        
+        # Take over leases abandoned by crashed workers
+        with db.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.lease_key == key, table.c.expires_at < now))
+        
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(table).values(
+                    lease_key=key,
+                    owner=owner,
+                    expires_at=now + timedelta(seconds=ttl),
+                    created_at=now
+                ))
+            return True
+        except IntegrityError:
+            return False
+    
+    def _release_lease(self, key, owner):
+        table = GenerationLease.__table__
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(delete(table).where(table.c.lease_key == key, table.c.owner == owner))
+        except Exception as e:
+            # The lease expires on its own; never fail the request over it
+            print(f"Failed to release generation lease {key}: {str(e)}")
+
+
+# Shared single-flight instance
+single_flight = SingleFlight()
@@ -0,0 +1,30 @@
+"""
+Streaming helpers for SkillPilot AI
+Server-Sent Events formatting for token-by-token AI responses
+"""
+import json
+from flask import Response, request, stream_with_context
+
+
+def wants_event_stream():
+    """True when the client asked for SSE via ?stream=1 or Accept: text/event-stream"""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(generator):
+    """Wrap a generator of SSE strings in a streaming response that keeps the request context"""
+    return Response(
+        stream_with_context(generator),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+        }
+    )
@@ -0,0 +1,137 @@
+"""
+Topic Cache for SkillPilot AI
+Serves rephrasings of an answered concept or topic ("What are closures?", "closure",
+"JavaScript closures", "flex box") from the earlier answer, matched on normalized keys
+"""
+import hashlib
+import re
+import threading
+
+from services.ai_cache import ai_cache
+
+
+# Question filler that does not change what is being asked
+STOP_WORDS = frozenset([
+    'a', 'an', 'the', 'in', 'of', 'to', 'and', 'for', 'with', 'on', 'about', 'me',
+    'what', 'is', 'are', 'how', 'does', 'do', 'explain', 'using', 'use',
+    'basics', 'intro', 'introduction', 'understanding'
+])
+
+# Generic words that qualify a topic without changing it ("flexbox layout", "closures concept");
+# compared after plural folding
+QUALIFIERS = frozenset([
+    'basic', 'concept', 'tutorial', 'guide', 'overview', 'layout', 'work', 'programming', 'language'
+])
+
+# Language names are kept apart from the topic words, aliases map to one name
+LANGUAGES = {
+    'c': 'c', 'c++': 'c++', 'cpp': 'c++', 'c#': 'c#', 'csharp': 'c#', 'java': 'java',
+    'javascript': 'javascript', 'js': 'javascript', 'typescript': 'typescript', 'ts': 'typescript',
+    'python': 'python', 'py': 'python', 'css': 'css', 'html': 'html', 'sql': 'sql',
+    'golang': 'go', 'rust': 'rust', 'ruby': 'ruby', 'php': 'php', 'kotlin': 'kotlin', 'swift': 'swift'
+}
+
+
+class TopicCache:
+    """
+    Matching on normalized topics, stored in the AI response cache
+    
+    Case, punctuation, filler and qualifier words and plural endings are ignored, and
+    language names are split off the topic words. An answer is stored under two keys:
+    the topic words as a sorted bag ("javascript closures" = "closures in javascript")
+    and glued together in order ("flex box" = "flexbox"). An answer for a topic in one
+    language also fills the language-free slot if it is empty ("css flex box" answers
+    "flexbox"), but never another language's. Every remaining word still counts, so
+    "binary search" and "binary search tree", or "arrays in c" and "arrays in c#", stay
+    different topics. Entries live in the shared response cache (in-process LRU in
+    front of the size-bounded database table), so all workers see them.
+    """
+    
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'adds': 0}
+    
+    def init_app(self, app):
+        """Read settings from the Flask config"""
+        self.enabled = app.config.get('TOPIC_CACHE_ENABLED', True)
+    
+    @staticmethod
+    def terms(text):
+        """
+        Languages and topic words of a text: "What are JavaScript closures?" -> (['javascript'], ['closure'])
+        
+        Returns:
+            (sorted language names, topic words in their original order)
+        """
+        words = re.findall(r'[a-z0-9+#]+', str(text).lower())
+        words = [word for word in words if word not in STOP_WORDS] or words
+        words = [word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word for word in words]
+        languages = sorted({LANGUAGES[word] for word in words if word in LANGUAGES})
+        topic = [word for word in words if word not in LANGUAGES]
+        topic = [word for word in topic if word not in QUALIFIERS] or topic
+        return languages, topic
+    
+    @staticmethod
+    def normalize(text):
+        """Order-free form of a topic: "closures in JavaScript" -> "javascript: closure" """
+        languages, topic = TopicCache.terms(text)
+        return f"{' '.join(languages)}: {' '.join(sorted(topic))}"
+    
+    @staticmethod
+    def _keys(namespace, languages, topic):
+        """Bag-of-words and glued response cache keys, one key for single-word topics"""
+        if not languages and not topic:
+            return []
+        forms = dict.fromkeys([' '.join(sorted(topic)), ''.join(topic)])
+        prefix = f"topic|{namespace}|{' '.join(languages)}|"
+        return [hashlib.sha256(f'{prefix}{form}'.encode('utf-8')).hexdigest() for form in forms]
+    
+    @staticmethod
+    def make_keys(namespace, text):
+        """Response cache keys of a topic in a namespace (e.g. "simplify:beginner"), empty if nothing is left to match"""
+        return TopicCache._keys(namespace, *TopicCache.terms(text))
+    
+    def lookup(self, namespace, text):
+        """Earlier answer for the same normalized topic in the namespace, or None"""
+        keys = self.make_keys(namespace, text) if self.enabled else []
+        if not keys:
+            return None
+        
+        answer = None
+        for key in keys:
+            answer = ai_cache.get(key)
+            if answer is not None:
+                break
+        self._bump('misses' if answer is None else 'hits')
+        return answer
+    
+    def add(self, namespace, text, answer, model):
+        """Store an answer under its normalized topic, and the topic without language if that is free"""
+        if not self.enabled or not answer:
+            return
+        
+        languages, topic = self.terms(text)
+        keys = self._keys(namespace, languages, topic)
+        if not keys:
+            return
+        
+        for key in keys:
+            ai_cache.set(key, model, answer)
+        if languages and topic:
+            for key in self._keys(namespace, [], topic):
+                if ai_cache.get(key) is None:
+                    ai_cache.set(key, model, answer)
+        self._bump('adds')
+    
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, enabled=self.enabled)
+    
+    def _bump(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+
+# Shared topic cache instance
+topic_cache = TopicCache()
@@ -0,0 +1,142 @@
+"""
+Shared pytest fixtures for the SkillPilot AI backend
+
+The app is created once with the testing config on a scratch SQLite database;
+every test starts from empty tables. Groq is replaced by FakeGroq, which answers
+from a responder function and records the requests it received.
+"""
+import json
+import os
+import sys
+import tempfile
+import types
+
+# Must be set before the app module is imported: it creates the app at import time
+os.environ['FLASK_ENV'] = 'testing'
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='skillpilot-tests-'), 'test.db')
+os.environ['GROQ_API_KEY'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from models import db, User, Goal, Task, Progress
+from services.ai_cache import ai_cache
+from services.ai_service import AIService
+from services.rate_limiter import rate_limiter, MemoryBucketStore
+
+
+def default_responder(messages, max_tokens):
+    """Canned answers by prompt: roadmap, quiz and lesson JSON, plain text otherwise"""
+    prompt = messages[-1]['content']
+    if 'roadmap' in prompt:
+        return json.dumps([{'day': day, 'topic': f'Topic {day}', 'estimated_time': 30} for day in range(1, 31)])
+    if 'quiz' in prompt:
+        return json.dumps([
+            {'question': f'Question {i}?', 'options': ['a', 'b', 'c', 'd'], 'correct_answer': 'a',
+             'explanation': 'Because', 'difficulty': 'easy'}
+            for i in range(10)
+        ])
+    if 'lesson' in prompt:
+        return json.dumps({'explanation': 'Lesson', 'key_concepts': ['one'], 'example_code': 'x = 1',
+                           'programming_language': 'python'})
+    return 'Plain answer'
+
+
+class FakeGroq:
+    """Stand-in for the Groq client: chat.completions.create answers from a responder"""
+    
+    def __init__(self, responder=default_responder):
+        self.responder = responder
+        self.requests = []
+        self.chat = types.SimpleNamespace(completions=self)
+    
+    def create(self, model, messages, max_tokens=None, stream=False, **kwargs):
+        self.requests.append({'model': model, 'messages': messages, 'max_tokens': max_tokens, 'stream': stream})
+        text = self.responder(messages, max_tokens)
+        usage = types.SimpleNamespace(prompt_tokens=10, completion_tokens=20, total_tokens=30)
+        
+        if stream:
+            return iter([
+                types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=text[i:i + 8]))])
+                for i in range(0, len(text), 8)
+            ])
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=text), finish_reason='stop')],
+            usage=usage
+        )
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    return flask_app
+
+
+@pytest.fixture(autouse=True)
+def app_context(app):
+    """Empty tables, caches and buckets for every test, inside an app context"""
+    with app.app_context():
+        # The app created the schema; SQLite does not enforce foreign keys, so any order works
+        for table in db.metadata.tables.values():
+            db.session.execute(table.delete())
+        db.session.commit()
+        ai_cache.clear()
+        rate_limiter.store = MemoryBucketStore()
+        rate_limiter.enabled = True
+        AIService.reset_client()
+        yield
+        db.session.remove()
+        AIService.reset_client()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def fake_groq(monkeypatch):
+    """Route AI calls to a FakeGroq; its `requests` list shows what reached the upstream"""
+    fake = FakeGroq()
+    monkeypatch.setattr(AIService, 'client', fake)
+    monkeypatch.setattr(AIService, '_client_pid', os.getpid())
+    return fake
+
+
+@pytest.fixture
+def user():
+    user = User(username='learner', email='learner@example.com')
+    user.set_password('password123')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+
+@pytest.fixture
+def make_goal(user):
+    """Factory for the user's goals: `days` pending tasks and a counted progress row"""
+    def make(days=30, **fields):
+        goal = Goal(user_id=user.id, title='Learn Python', level='beginner', time_per_day=30, **fields)
+        db.session.add(goal)
+        db.session.commit()
+        
+        for day in range(1, days + 1):
+            db.session.add(Task(goal_id=goal.id, day_number=day, topic=f'Day {day}: Topic {day}', status='pending'))
+        progress = Progress(goal_id=goal.id)
+        db.session.add(progress)
+        progress.recount()
+        db.session.commit()
+        return goal
+    return make
+
+
+@pytest.fixture
+def goal(make_goal):
+    return make_goal()
@@ -0,0 +1,58 @@
+"""Tests for the day bitmap helpers (services/bitmap.py)"""
+import pytest
+
+from services import bitmap
+
+
+def bits_of(days):
+    return sum(1 << day for day in days)
+
+
+def test_set_bit_round_trips_through_bytes():
+    data = bitmap.set_bit(b'', 9)
+    data = bitmap.set_bit(data, 1)
+    
+    assert data == bytes([0b10, 0b10])
+    assert bitmap.to_int(data) == bits_of([1, 9])
+    assert bitmap.to_int(bitmap.set_bit(data, 9, False)) == bits_of([1])
+    assert bitmap.to_int(None) == 0
+
+
+def test_has_bit():
+    bits = bits_of([0, 3])
+    
+    assert bitmap.has_bit(bits, 3)
+    assert not bitmap.has_bit(bits, 2)
+    assert not bitmap.has_bit(bits, -1)
+    assert not bitmap.has_bit(bits, 200)
+
+
+@pytest.mark.parametrize('days, index, expected', [
+    ([1, 2, 3, 5, 6], 6, 2),
+    ([1, 2, 3, 5, 6], 3, 3),
+    ([1, 2, 3, 5, 6], 4, 0),
+    ([0, 1, 2], 2, 3),
+    ([], 0, 0),
+])
+def test_run_ending_at(days, index, expected):
+    assert bitmap.run_ending_at(bits_of(days), index) == expected
+
+
+@pytest.mark.parametrize('days, expected', [
+    ([], 0),
+    ([4], 1),
+    ([1, 2, 3, 5, 6], 3),
+    ([0, 2, 4, 6], 1),
+    (range(100, 170), 70),
+])
+def test_longest_run(days, expected):
+    assert bitmap.longest_run(bits_of(days)) == expected
+
+
+def test_clear_positions_lists_gaps_in_range():
+    bits = bits_of([0, 1, 4, 7, 12])
+    
+    assert bitmap.clear_positions(bits, 8) == [2, 3, 5, 6]
+    assert bitmap.clear_positions(bits, 0) == []
+    assert bitmap.clear_positions(0, 3) == [0, 1, 2]
+    assert bitmap.clear_positions(bits, -1) == []
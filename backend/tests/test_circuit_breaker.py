@@ -0,0 +1,118 @@
+"""Tests for the per-model circuit breaker (services/circuit_breaker.py)"""
+import types
+
+import pytest
+
+from services import circuit_breaker
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code=None):
+        super().__init__(f'status {status_code}')
+        self.status_code = status_code
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual monotonic clock for the breaker module"""
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(circuit_breaker, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker('test-model', failure_threshold=3, reset_timeout=30)
+
+
+def fail(breaker, error=None):
+    with pytest.raises(UpstreamError):
+        with breaker.guard():
+            raise error or UpstreamError(503)
+
+
+def test_opens_after_consecutive_failures(breaker):
+    fail(breaker)
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+    
+    fail(breaker)
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_success_resets_the_failure_count(breaker):
+    fail(breaker)
+    fail(breaker)
+    with breaker.guard():
+        pass
+    fail(breaker)
+    
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 1
+
+
+def test_client_errors_do_not_trip_the_breaker(breaker):
+    for _ in range(5):
+        fail(breaker, UpstreamError(400))
+    
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_probe_closes_the_circuit(breaker, clock):
+    for _ in range(3):
+        fail(breaker)
+    clock.now += 30
+    
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # one probe at a time
+    
+    breaker.record_success(0.5)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_the_circuit(breaker, clock):
+    for _ in range(3):
+        fail(breaker)
+    clock.now += 30
+    
+    fail(breaker)
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.get_stats()['retry_in'] == 30
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_cancelled_probe_frees_the_slot(breaker, clock):
+    for _ in range(3):
+        fail(breaker)
+    clock.now += 30
+    
+    with pytest.raises(GeneratorExit):
+        with breaker.guard():
+            raise GeneratorExit
+    
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+
+
+def test_timeout_follows_p95_latency(clock):
+    breaker = CircuitBreaker('test-model', latency_window=20, min_samples=20, timeout_multiplier=2.0, min_timeout=5.0, max_timeout=60.0)
+    assert breaker.timeout() == breaker.default_timeout
+    
+    for latency in [4.0] * 19 + [10.0]:
+        breaker.record_success(latency)
+    assert breaker.timeout() == 20.0
+    
+    # The window rolls over to faster calls; the timeout never drops below min_timeout
+    for latency in [1.0] * 20:
+        breaker.record_success(latency)
+    assert breaker.timeout() == 5.0
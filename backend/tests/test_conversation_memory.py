@@ -0,0 +1,30 @@
+"""Tests for the chat summary scheduling (services/conversation_memory.py)"""
+import pytest
+
+from models import db, ConversationMessage, Job
+from services.conversation_memory import ConversationMemory
+
+
+@pytest.fixture
+def chat_history(user):
+    """Enough turns for a summary update with the default cadence"""
+    for turn in range(12):
+        db.session.add(ConversationMessage(user_id=user.id, role='user', content=f'Question {turn}'))
+        db.session.add(ConversationMessage(user_id=user.id, role='assistant', content=f'Answer {turn}'))
+    db.session.commit()
+    return user
+
+
+def test_summaries_are_not_queued_by_default(chat_history):
+    assert ConversationMemory.schedule_summary(chat_history.id) is None
+    assert Job.query.count() == 0
+
+
+def test_enabled_summaries_are_queued_once(app, chat_history, monkeypatch):
+    monkeypatch.setitem(app.config, 'CHAT_SUMMARY_ENABLED', True)
+    
+    job = ConversationMemory.schedule_summary(chat_history.id)
+    db.session.commit()
+    
+    assert job.kind == 'summarize_conversation'
+    assert ConversationMemory.schedule_summary(chat_history.id) is None
@@ -0,0 +1,86 @@
+"""Tests for the vectorized goal analytics (services/goal_analytics.py)"""
+from datetime import date, datetime
+
+import pytest
+
+from models import db, Task
+from services.goal_analytics import GoalAnalytics, HISTOGRAM_WEEKS
+
+pytest.importorskip('numpy')
+
+
+TODAY = date(2026, 10, 14)  # a Wednesday
+
+
+def complete(goal, days):
+    """Complete the first tasks of a goal, one per date"""
+    tasks = Task.query.filter_by(goal_id=goal.id).order_by(Task.day_number).all()
+    for task, day in zip(tasks, days):
+        task.status = 'completed'
+        task.completed_at = datetime.combine(day, datetime.min.time().replace(hour=18))
+    db.session.commit()
+
+
+@pytest.fixture
+def tracked_goal(make_goal):
+    goal = make_goal(created_at=datetime(2026, 9, 30, 9), deadline=date(2026, 10, 30))
+    complete(goal, [
+        date(2026, 9, 30), date(2026, 10, 1), date(2026, 10, 2),  # week of Mon 09-28
+        date(2026, 10, 6), date(2026, 10, 8),                      # week of Mon 10-05
+        date(2026, 10, 12), date(2026, 10, 13), date(2026, 10, 14)  # current week
+    ])
+    return goal
+
+
+def test_weekly_buckets_end_with_the_current_monday_week(tracked_goal):
+    weekly = GoalAnalytics.for_goal(tracked_goal.id, TODAY)['weekly']
+    
+    assert len(weekly) == HISTOGRAM_WEEKS
+    assert [week['week_start'] for week in weekly[-3:]] == ['2026-09-28', '2026-10-05', '2026-10-12']
+    assert [week['completed'] for week in weekly] == [0] * (HISTOGRAM_WEEKS - 3) + [3, 2, 3]
+
+
+def test_velocity_and_projection_use_the_last_seven_days(tracked_goal):
+    analytics = GoalAnalytics.for_goal(tracked_goal.id, TODAY)
+    
+    assert analytics['tasks'] == {'total': 30, 'completed': 8, 'remaining': 22}
+    assert analytics['velocity']['days_elapsed'] == 14
+    assert analytics['velocity']['overall'] == pytest.approx(8 / 14, abs=1e-3)
+    assert analytics['velocity']['last_7_days'] == pytest.approx(4 / 7, abs=1e-3)
+    # 22 tasks left at 4 per 7 days: 38.5, rounded up to 39 days
+    assert analytics['projected_completion_date'] == '2026-11-22'
+
+
+def test_pace_against_the_deadline(tracked_goal):
+    pace = GoalAnalytics.for_goal(tracked_goal.id, TODAY)['pace']
+    
+    assert pace['actual_percentage'] == pytest.approx(26.67)
+    assert pace['expected_percentage'] == pytest.approx(46.67)
+    assert pace['status'] == 'behind'
+    assert pace['days_remaining'] == 16
+
+
+def test_idle_goal_projects_with_its_overall_pace(make_goal):
+    goal = make_goal(days=10, created_at=datetime(2026, 9, 14, 9))
+    complete(goal, [date(2026, 9, 15), date(2026, 9, 16)])
+    
+    analytics = GoalAnalytics.for_goal(goal.id, TODAY)
+    
+    assert analytics['velocity']['last_7_days'] == 0
+    # 8 tasks left at 2 per 30 days: 120 days
+    assert analytics['projected_completion_date'] == '2027-02-11'
+    assert analytics['pace']['status'] == 'on-track'
+
+
+def test_finished_and_untouched_goals(make_goal):
+    finished = make_goal(days=2, created_at=datetime(2026, 10, 1, 9))
+    complete(finished, [date(2026, 10, 2), date(2026, 10, 5)])
+    untouched = make_goal(days=0, created_at=datetime(2026, 10, 1, 9))
+    
+    results = GoalAnalytics.compute([finished.id, untouched.id, 999], TODAY)
+    
+    assert set(results) == {finished.id, untouched.id}
+    assert results[finished.id]['projected_completion_date'] == '2026-10-05'
+    assert results[untouched.id]['tasks']['total'] == 0
+    assert results[untouched.id]['projected_completion_date'] is None
+    assert GoalAnalytics.for_goal(999, TODAY) is None
@@ -0,0 +1,120 @@
+"""Tests for background roadmap generation and its fallback (services/goal_generation.py)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Goal, Task, Progress
+from services.goal_generation import GoalGenerationService, _mark_roadmap_failed, ROADMAP_DAYS
+from services.job_queue import JobQueue
+
+
+def stored_goal(goal_id):
+    db.session.expire_all()
+    return db.session.get(Goal, goal_id)
+
+
+def run_job(job):
+    """Claim and run one generate_roadmap job like a worker would"""
+    db.session.commit()
+    assert JobQueue.claim('worker-test', ['generate_roadmap']) == [job.id]
+    JobQueue.execute(job.id, 'worker-test')
+    db.session.refresh(job)
+    return job
+
+
+@pytest.fixture
+def generating_goal(make_goal):
+    return make_goal(days=0, generation_status='generating')
+
+
+def test_mark_roadmap_failed_writes_counted_default_tasks(generating_goal):
+    _mark_roadmap_failed({'goal_id': generating_goal.id}, None)
+    
+    goal = stored_goal(generating_goal.id)
+    assert goal.generation_status == 'failed'
+    assert goal.roadmap_generated is False
+    assert Task.query.filter_by(goal_id=goal.id).count() == ROADMAP_DAYS
+    assert goal.progress.total_count == ROADMAP_DAYS
+    assert goal.progress.completed_count == 0
+
+
+def test_mark_roadmap_failed_creates_missing_progress(user):
+    goal = Goal(user_id=user.id, title='Learn Go', level='beginner', time_per_day=30, generation_status='generating')
+    db.session.add(goal)
+    db.session.commit()
+    
+    _mark_roadmap_failed({'goal_id': goal.id}, None)
+    
+    assert Progress.query.filter_by(goal_id=goal.id).one().total_count == ROADMAP_DAYS
+
+
+def test_mark_roadmap_failed_keeps_streamed_days(generating_goal):
+    GoalGenerationService.add_roadmap_tasks(generating_goal, [{'day': day, 'topic': f'AI day {day}'} for day in range(1, 6)])
+    db.session.commit()
+    
+    _mark_roadmap_failed({'goal_id': generating_goal.id}, None)
+    
+    goal = stored_goal(generating_goal.id)
+    topics = {task.day_number: task.topic for task in Task.query.filter_by(goal_id=goal.id)}
+    assert goal.generation_status == 'ready'
+    assert len(topics) == ROADMAP_DAYS
+    assert topics[3] == 'AI day 3'
+    assert goal.progress.total_count == ROADMAP_DAYS
+
+
+def test_mark_roadmap_failed_ignores_finished_goals(goal):
+    _mark_roadmap_failed({'goal_id': goal.id}, None)
+    
+    assert stored_goal(goal.id).generation_status == 'ready'
+    assert Task.query.filter_by(goal_id=goal.id).count() == ROADMAP_DAYS
+
+
+def test_final_job_failure_falls_back_to_default_tasks(generating_goal):
+    job = GoalGenerationService.enqueue_roadmap(generating_goal)
+    job.max_attempts = 1
+    db.session.commit()
+    JobQueue.claim('worker-test', ['generate_roadmap'])
+    db.session.refresh(job)
+    
+    JobQueue.fail(job, 'worker crashed')
+    
+    goal = stored_goal(generating_goal.id)
+    assert job.status == 'failed'
+    assert goal.generation_status == 'failed'
+    assert goal.progress.total_count == ROADMAP_DAYS
+
+
+def test_job_without_ai_writes_placeholders_on_first_attempt(generating_goal):
+    job = run_job(GoalGenerationService.enqueue_roadmap(generating_goal))
+    
+    goal = stored_goal(generating_goal.id)
+    assert job.status == 'succeeded'
+    assert job.attempts == 1
+    assert goal.generation_status == 'ready'
+    assert goal.roadmap_generated is False
+    assert goal.progress.total_count == ROADMAP_DAYS
+
+
+def test_job_with_ai_inserts_roadmap_tasks(fake_groq, generating_goal):
+    job = run_job(GoalGenerationService.enqueue_roadmap(generating_goal))
+    
+    goal = stored_goal(generating_goal.id)
+    assert job.status == 'succeeded'
+    assert goal.roadmap_generated is True
+    assert Task.query.filter_by(goal_id=goal.id, day_number=7).one().topic == 'Topic 7'
+    assert goal.progress.total_count == ROADMAP_DAYS
+
+
+def test_stalled_final_attempt_falls_back_to_default_tasks(generating_goal):
+    job = GoalGenerationService.enqueue_roadmap(generating_goal)
+    job.max_attempts = 1
+    db.session.commit()
+    JobQueue.claim('worker-test', ['generate_roadmap'])
+    
+    job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    JobQueue.claim('worker-other', ['generate_roadmap'])
+    
+    goal = stored_goal(generating_goal.id)
+    assert goal.generation_status == 'failed'
+    assert goal.progress.total_count == ROADMAP_DAYS
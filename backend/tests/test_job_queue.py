@@ -0,0 +1,160 @@
+"""Tests for the database-backed job queue (services/job_queue.py)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Job
+from services.job_queue import JobQueue
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Register throwaway job kinds without touching the app's handlers"""
+    monkeypatch.setattr(JobQueue, 'handlers', dict(JobQueue.handlers))
+    monkeypatch.setattr(JobQueue, 'failure_handlers', dict(JobQueue.failure_handlers))
+    return JobQueue
+
+
+def test_claim_marks_job_running_once(handlers):
+    job = JobQueue.enqueue('test_kind', {'n': 1})
+    db.session.commit()
+    
+    assert JobQueue.claim('worker-a', ['test_kind']) == [job.id]
+    assert JobQueue.claim('worker-b', ['test_kind']) == []
+    
+    db.session.refresh(job)
+    assert job.status == 'running'
+    assert job.locked_by == 'worker-a'
+    assert job.attempts == 1
+
+
+def test_claim_skips_jobs_that_are_not_due(handlers):
+    JobQueue.enqueue('test_kind', delay=60)
+    db.session.commit()
+    
+    assert JobQueue.claim('worker-a', ['test_kind']) == []
+
+
+def test_claim_respects_concurrency_limits(app, handlers, monkeypatch):
+    monkeypatch.setitem(app.config, 'JOB_CONCURRENCY_LIMITS', {'test_kind': 1})
+    JobQueue.enqueue('test_kind')
+    JobQueue.enqueue('test_kind')
+    db.session.commit()
+    
+    assert len(JobQueue.claim('worker-a', ['test_kind'], limit=2)) == 1
+    assert JobQueue.claim('worker-b', ['test_kind'], limit=2) == []
+
+
+def test_expired_lock_is_reclaimed(handlers):
+    job = JobQueue.enqueue('test_kind')
+    db.session.commit()
+    JobQueue.claim('worker-a', ['test_kind'])
+    
+    # worker-a crashed: its visibility timeout ran out
+    job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    
+    assert JobQueue.claim('worker-b', ['test_kind']) == [job.id]
+    db.session.refresh(job)
+    assert job.locked_by == 'worker-b'
+    assert job.attempts == 2
+
+
+def test_execute_completes_job_with_handler_result(handlers):
+    handlers.handler('test_kind')(lambda payload, job: {'doubled': payload['n'] * 2})
+    job = JobQueue.enqueue('test_kind', {'n': 21})
+    db.session.commit()
+    JobQueue.claim('worker-a', ['test_kind'])
+    
+    JobQueue.execute(job.id, 'worker-a')
+    
+    db.session.refresh(job)
+    assert job.status == 'succeeded'
+    assert job.result == {'doubled': 42}
+    assert job.locked_by is None
+
+
+def test_failed_attempt_is_retried_with_exponential_backoff(app, handlers):
+    def flaky(payload, job):
+        raise RuntimeError('upstream down')
+    
+    handlers.handler('test_kind')(flaky)
+    job = JobQueue.enqueue('test_kind', max_attempts=3)
+    db.session.commit()
+    backoff = app.config['JOB_RETRY_BACKOFF']
+    
+    for attempt in (1, 2):
+        job.run_after = datetime.utcnow()
+        db.session.commit()
+        JobQueue.claim('worker-a', ['test_kind'])
+        before = datetime.utcnow()
+        JobQueue.execute(job.id, 'worker-a')
+        
+        db.session.refresh(job)
+        assert job.status == 'queued'
+        assert job.last_error == 'upstream down'
+        delay = (job.run_after - before).total_seconds()
+        assert backoff * 2 ** (attempt - 1) - 1 <= delay <= backoff * 2 ** (attempt - 1) + 1
+
+
+def test_final_failure_runs_failure_handler_once(handlers):
+    failed = []
+    
+    def broken(payload, job):
+        raise RuntimeError('still down')
+    
+    handlers.handler('test_kind', on_failure=lambda payload, job: failed.append(payload))(broken)
+    job = JobQueue.enqueue('test_kind', {'goal_id': 7}, max_attempts=1)
+    db.session.commit()
+    JobQueue.claim('worker-a', ['test_kind'])
+    
+    JobQueue.execute(job.id, 'worker-a')
+    
+    db.session.refresh(job)
+    assert job.status == 'failed'
+    assert job.finished_at is not None
+    assert failed == [{'goal_id': 7}]
+
+
+def test_unknown_kind_fails_without_retry(handlers):
+    job = JobQueue.enqueue('no_such_kind', max_attempts=3)
+    db.session.commit()
+    JobQueue.claim('worker-a', ['no_such_kind'])
+    
+    JobQueue.execute(job.id, 'worker-a')
+    
+    db.session.refresh(job)
+    assert job.status == 'failed'
+    assert 'No handler registered' in job.last_error
+
+
+def test_run_worker_once_drains_runnable_jobs(app, handlers):
+    handlers.handler('test_kind')(lambda payload, job: payload['n'])
+    jobs = [JobQueue.enqueue('test_kind', {'n': n}) for n in range(3)]
+    db.session.commit()
+    ids = [job.id for job in jobs]
+    
+    JobQueue.run_worker(app, concurrency=2, kinds=['test_kind'], once=True)
+    
+    db.session.expire_all()
+    assert {job.status for job in Job.query.filter(Job.id.in_(ids))} == {'succeeded'}
+
+
+def test_expired_final_attempt_runs_failure_handler(handlers):
+    failed = []
+    handlers.handler('test_kind', on_failure=lambda payload, job: failed.append(payload))(lambda payload, job: None)
+    job = JobQueue.enqueue('test_kind', {'goal_id': 7}, max_attempts=1)
+    db.session.commit()
+    JobQueue.claim('worker-a', ['test_kind'])
+    
+    # worker-a died during the last attempt
+    job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    
+    assert JobQueue.claim('worker-b', ['test_kind']) == []
+    assert JobQueue.claim('worker-c', ['test_kind']) == []
+    
+    db.session.refresh(job)
+    assert job.status == 'failed'
+    assert 'Visibility timeout' in job.last_error
+    assert failed == [{'goal_id': 7}]
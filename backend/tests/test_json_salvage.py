@@ -0,0 +1,58 @@
+"""Tests for tolerant parsing of model JSON output (services/json_salvage.py)"""
+from services.json_salvage import JSONArrayParser, repair_json, salvage_array, strip_code_fences
+
+
+DAYS = '[{"day": 1, "topic": "Variables"}, {"day": 2, "topic": "Loops"}, {"day": 3, "topic": "Functions"}]'
+
+
+def test_strip_code_fences():
+    assert strip_code_fences('```json\n{"a": 1}\n```') == '{"a": 1}\n'
+    assert strip_code_fences(None) == ''
+
+
+def test_repair_json_skips_chatter_and_fences():
+    assert repair_json('Sure! Here is the lesson:\n```json\n{"title": "Loops"}\n```') == {'title': 'Loops'}
+    assert repair_json('No JSON here') is None
+
+
+def test_repair_json_closes_truncated_value():
+    assert repair_json('{"title": "Loops", "points": ["for", "while"') == {'title': 'Loops', 'points': ['for', 'while']}
+    assert repair_json('{"title": "Loops", "summary": "Repeat') == {'title': 'Loops', 'summary': 'Repeat'}
+
+
+def test_repair_json_drops_dangling_key_and_partial_string():
+    assert repair_json('{"title": "Loops", "summary":') == {'title': 'Loops'}
+    assert repair_json('[{"topic": "Loops"}, {"topic": "Funct', partial_strings=False) == [{'topic': 'Loops'}]
+
+
+def test_salvage_array_reads_fenced_array():
+    assert [item['day'] for item in salvage_array(f'Here you go:\n```json\n{DAYS}\n```')] == [1, 2, 3]
+
+
+def test_salvage_array_keeps_complete_elements_of_truncated_array():
+    truncated = DAYS[:DAYS.index('"Functions"') + 5]
+    
+    # The cut-off topic is dropped rather than kept as "Func"
+    assert salvage_array(truncated) == [{'day': 1, 'topic': 'Variables'}, {'day': 2, 'topic': 'Loops'}, {'day': 3}]
+
+
+def test_salvage_array_skips_malformed_element():
+    malformed = '[{"day": 1, "topic": "Variables"},\n{"day": 2, topic: Loops},\n{"day": 3, "topic": "Functions"}]'
+    
+    assert [item['day'] for item in salvage_array(malformed)] == [1, 3]
+
+
+def test_salvage_array_without_array():
+    assert salvage_array('I cannot help with that.') == []
+
+
+def test_parser_yields_elements_as_they_complete():
+    parser = JSONArrayParser()
+    seen = []  # (day, characters received when it was parsed)
+    for end in range(7, len(DAYS) + 7, 7):
+        seen += [(item['day'], end) for item in parser.feed(DAYS[end - 7:end])]
+    
+    assert [day for day, _ in seen] == [1, 2, 3]
+    assert seen[0][1] < len(DAYS) // 2  # the first day arrives long before the stream ends
+    assert parser.done
+    assert parser.close() == []
@@ -0,0 +1,41 @@
+"""Tests for lesson generation routes (routes_lessons.py)"""
+from types import SimpleNamespace
+
+import pytest
+
+from models import Task, LessonContent
+from services.ai_service import AIService
+from services.rate_limiter import rate_limiter
+
+
+def test_regenerate_asks_the_ai_again(client, auth_headers, user, goal, fake_groq):
+    task = Task.query.filter_by(goal_id=goal.id, day_number=1).one()
+    assert client.get(f'/api/lessons/task/{task.id}', headers=auth_headers).status_code == 200
+    before = rate_limiter.get_usage(user.id)['user']['remaining']
+    
+    response = client.post(f'/api/lessons/task/{task.id}/generate', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert len(fake_groq.requests) == 2
+    # Buckets refill while the test runs
+    charged = before - rate_limiter.get_usage(user.id)['user']['remaining']
+    assert charged == pytest.approx(AIService.max_tokens('lesson'), abs=50)
+    assert LessonContent.query.filter_by(task_id=task.id).count() == 1
+
+
+def test_broken_lesson_stream_is_not_stored(client, auth_headers, goal, fake_groq, monkeypatch):
+    task = Task.query.filter_by(goal_id=goal.id, day_number=1).one()
+    
+    def broken_stream(*args, **kwargs):
+        for text in ('{"explanation": "A long explan', 'ation that'):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+        raise ConnectionError('connection reset')
+    
+    monkeypatch.setattr(fake_groq, 'create', broken_stream)
+    
+    response = client.get(f'/api/lessons/task/{task.id}?stream=1', headers=auth_headers)
+    body = response.get_data(as_text=True)
+    
+    assert 'event: error' in body
+    assert 'event: done' not in body
+    assert LessonContent.query.count() == 0
@@ -0,0 +1,106 @@
+"""Tests for model routing and SLO splitting (services/model_router.py)"""
+import types
+
+import pytest
+
+from services import model_router as router_module
+from services.circuit_breaker import CircuitBreaker
+from services.model_router import ModelRouter
+
+
+MESSAGES = [{'role': 'user', 'content': 'x' * 400}]  # about 104 prompt tokens
+
+
+@pytest.fixture
+def breakers():
+    breakers = {}
+    
+    def breaker_for(name):
+        if name not in breakers:
+            breakers[name] = CircuitBreaker(name, min_samples=1, min_timeout=1.0, default_timeout=30.0)
+        return breakers[name]
+    
+    return breaker_for
+
+
+@pytest.fixture
+def router():
+    router = ModelRouter()
+    router.routes = {'chat': {'models': ['big', 'small', 'tiny'], 'slo': 10.0}}
+    return router
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=0.0)
+    monkeypatch.setattr(router_module, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_plan_cascades_through_the_route(router, breakers):
+    assert router.plan('chat', 'big', MESSAGES, 500, breakers) == [('big', 'primary'), ('small', 'cascade'), ('tiny', 'cascade')]
+
+
+def test_unrouted_model_is_used_as_is(router, breakers):
+    assert router.plan('chat', 'other', MESSAGES, 500, breakers) == [('other', 'primary')]
+    assert router.plan('quiz', 'big', MESSAGES, 500, breakers) == [('big', 'primary')]
+
+
+def test_plan_skips_models_that_cannot_fit_the_request(router, breakers):
+    router.max_request_tokens = {'big': 400, 'tiny': 400}
+    
+    assert router.plan('chat', 'big', MESSAGES, 500, breakers) == [('small', 'too_large')]
+
+
+def test_plan_skips_slow_models_but_keeps_the_last_resort(router, breakers):
+    for name in ('big', 'small', 'tiny'):
+        breakers(name).record_success(12.0)
+    
+    assert router.plan('chat', 'big', MESSAGES, 500, breakers) == [('tiny', 'slow')]
+
+
+def test_slow_model_is_probed_now_and_then(router, breakers):
+    breakers('big').record_success(12.0)
+    
+    plans = [router.plan('chat', 'big', MESSAGES, 500, breakers)[0][0] for _ in range(ModelRouter.PROBE_EVERY)]
+    
+    assert plans.count('big') == 1
+    assert plans[-1] == 'big'
+
+
+def test_attempts_split_the_slo(router, breakers, clock):
+    reserve = ModelRouter.CASCADE_RESERVE
+    plan = router.plan('chat', 'big', MESSAGES, 500, breakers)
+    attempts = router.attempts('chat', plan, breakers)
+    
+    # Each attempt with fallbacks behind it leaves the reserve of what is left to them
+    name, _, timeout = next(attempts)
+    assert name == 'big'
+    assert timeout == pytest.approx(10.0 * (1 - reserve))
+    
+    clock.now += timeout
+    name, _, timeout = next(attempts)
+    assert name == 'small'
+    assert timeout == pytest.approx(10.0 * reserve * (1 - reserve))
+    
+    clock.now += timeout
+    name, reason, timeout = next(attempts)
+    assert (name, reason) == ('tiny', 'cascade')
+    assert timeout == pytest.approx(10.0 * reserve * reserve)
+
+
+def test_attempts_stop_when_the_slo_is_spent(router, breakers, clock):
+    attempts = router.attempts('chat', router.plan('chat', 'big', MESSAGES, 500, breakers), breakers)
+    
+    next(attempts)
+    clock.now += 9.5
+    
+    assert list(attempts) == []
+
+
+def test_attempt_timeout_is_capped_by_the_breaker(router, breakers, clock):
+    breakers('big').record_success(1.5)  # adaptive timeout 2 x p95 = 3s
+    
+    _, _, timeout = next(router.attempts('chat', [('big', 'primary'), ('small', 'cascade')], breakers))
+    
+    assert timeout == pytest.approx(3.0)
@@ -0,0 +1,118 @@
+"""Tests for the denormalized progress counters, day bitmaps and daily rollup"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Task, Progress, DailyCompletionStat
+
+
+def snapshot(goal_id):
+    """Counters, bitmaps and rollup rows of a goal, as stored"""
+    db.session.expire_all()
+    progress = Progress.query.filter_by(goal_id=goal_id).one()
+    rollup = sorted(
+        (row.date, row.completed)
+        for row in DailyCompletionStat.query.filter_by(goal_id=goal_id)
+        if row.completed
+    )
+    return (
+        progress.completed_count, progress.total_count, round(progress.completion_percentage, 2),
+        progress.task_bits, progress.activity_bits, progress.streak_length,
+        progress.longest_streak, progress.last_completion_date, rollup
+    )
+
+
+def assert_matches_rebuild(goal_id):
+    """The incrementally maintained state equals a full rebuild from the tasks"""
+    maintained = snapshot(goal_id)
+    Progress.query.filter_by(goal_id=goal_id).one().recompute()
+    DailyCompletionStat.rebuild(goal_id)
+    db.session.flush()
+    rebuilt = snapshot(goal_id)
+    db.session.rollback()
+    assert maintained == rebuilt
+
+
+@pytest.fixture
+def tasks(goal):
+    return Task.query.filter_by(goal_id=goal.id).order_by(Task.day_number).all()
+
+
+def test_mark_complete_updates_counters_once(goal, tasks):
+    tasks[0].mark_complete()
+    tasks[0].mark_complete()  # repeated toggle is not counted again
+    
+    progress = Progress.query.filter_by(goal_id=goal.id).one()
+    db.session.refresh(progress)
+    assert progress.completed_count == 1
+    assert progress.total_count == 30
+    assert progress.completion_percentage == pytest.approx(100 / 30)
+    assert progress.is_day_completed(1)
+    assert progress.streak == 1
+    assert_matches_rebuild(goal.id)
+
+
+def test_mark_pending_reverts_counters_and_rollup(goal, tasks):
+    tasks[0].mark_complete()
+    tasks[1].mark_complete()
+    tasks[0].mark_pending()
+    
+    progress = Progress.query.filter_by(goal_id=goal.id).one()
+    db.session.refresh(progress)
+    assert progress.completed_count == 1
+    assert not progress.is_day_completed(1)
+    assert progress.is_day_completed(2)
+    assert_matches_rebuild(goal.id)
+
+
+def test_bulk_set_status_applies_deltas(goal, tasks):
+    goal.created_at = datetime.utcnow() - timedelta(days=10)
+    db.session.commit()
+    start = goal.created_at.replace(hour=12)
+    
+    changes = {task.id: ('completed', start + timedelta(days=index // 2)) for index, task in enumerate(tasks[:6])}
+    assert Task.bulk_set_status(changes) == 6
+    db.session.commit()
+    assert_matches_rebuild(goal.id)
+    
+    # Only real changes count: tasks[0] is already completed
+    changes = {tasks[0].id: ('completed', start), tasks[2].id: ('pending', None), tasks[3].id: ('pending', None)}
+    assert Task.bulk_set_status(changes) == 2
+    db.session.commit()
+    
+    state = snapshot(goal.id)
+    assert state[0] == 4
+    assert_matches_rebuild(goal.id)
+
+
+def test_bulk_set_status_without_changes_is_a_no_op(goal, tasks):
+    assert Task.bulk_set_status({tasks[0].id: ('pending', None)}) == 0
+    assert Task.bulk_set_status({}) == 0
+
+
+def test_bulk_route_rejects_completion_before_goal_start(client, auth_headers, goal, tasks):
+    before_start = (goal.created_at - timedelta(days=1)).isoformat()
+    response = client.patch(
+        f'/api/goals/{goal.id}/tasks/status',
+        json={'updates': [{'task_id': tasks[0].id, 'status': 'completed', 'completed_at': before_start}]},
+        headers=auth_headers
+    )
+    
+    assert response.status_code == 400
+    assert response.json['task_ids'] == [tasks[0].id]
+    db.session.expire_all()
+    assert Progress.query.filter_by(goal_id=goal.id).one().completed_count == 0
+
+
+def test_bulk_route_reports_updated_progress(client, auth_headers, goal, tasks):
+    response = client.patch(
+        f'/api/goals/{goal.id}/tasks/status',
+        json={'updates': [{'task_id': task.id, 'status': 'completed'} for task in tasks[:3]]},
+        headers=auth_headers
+    )
+    
+    assert response.status_code == 200
+    assert response.json['updated'] == 3
+    assert response.json['progress']['completed_count'] == 3
+    assert response.json['progress']['completion_percentage'] == 10.0
+    assert_matches_rebuild(goal.id)
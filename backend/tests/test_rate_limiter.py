@@ -0,0 +1,84 @@
+"""Tests for AI quota charging (services/rate_limiter.py)"""
+import pytest
+
+from services.ai_service import AIService
+from services.rate_limiter import rate_limiter, RateLimitExceeded
+
+
+def remaining(user):
+    return rate_limiter.get_usage(user.id)['user']['remaining']
+
+
+def capacity():
+    return rate_limiter.limits['user'][0]
+
+
+def test_simplify_is_charged_on_a_cache_miss(client, auth_headers, user, fake_groq):
+    response = client.post('/api/ai/simplify', json={'concept': 'closures'}, headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert len(fake_groq.requests) == 1
+    assert remaining(user) == capacity() - AIService.max_tokens('simplify')
+
+
+@pytest.mark.parametrize('repeat', ['closures', 'What are closures?'])
+def test_simplify_cache_hits_are_refunded(client, auth_headers, user, fake_groq, repeat):
+    client.post('/api/ai/simplify', json={'concept': 'closures'}, headers=auth_headers)
+    after_first = remaining(user)
+    
+    response = client.post('/api/ai/simplify', json={'concept': repeat}, headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert len(fake_groq.requests) == 1
+    assert remaining(user) == after_first
+
+
+def test_example_cache_hit_is_refunded(client, auth_headers, user, fake_groq):
+    body = {'topic': 'list comprehensions', 'language': 'python'}
+    client.post('/api/ai/generate-example', json=body, headers=auth_headers)
+    after_first = remaining(user)
+    
+    client.post('/api/ai/generate-example', json=body, headers=auth_headers)
+    
+    assert len(fake_groq.requests) == 1
+    assert remaining(user) == after_first
+
+
+def test_invalid_request_is_refunded(client, auth_headers, user, fake_groq):
+    response = client.post('/api/ai/simplify', json={}, headers=auth_headers)
+    
+    assert response.status_code == 400
+    assert remaining(user) == capacity()
+
+
+def test_exhausted_quota_is_rejected_before_the_view(client, auth_headers, user, fake_groq):
+    for kind in ('roadmap', 'simplify', 'simplify'):
+        rate_limiter.consume(user.id, kind)  # 400 of the 5000 tokens left, an example costs 500
+    
+    response = client.post('/api/ai/generate-example', json={'topic': 'decorators'}, headers=auth_headers)
+    
+    assert response.status_code == 429
+    assert response.json['scope'] == 'user'
+    assert int(response.headers['Retry-After']) >= 1
+    assert fake_groq.requests == []
+
+
+def test_quiz_bank_cost_matches_its_max_tokens(app, user, fake_groq):
+    bank_size = app.config['QUIZ_BANK_SIZE']
+    
+    taken = rate_limiter.consume(user.id, 'quiz', count=bank_size)
+    AIService.generate_quiz_questions('Closures', 'beginner', count=bank_size)
+    
+    assert dict(taken)['user'] == fake_groq.requests[0]['max_tokens'] == AIService.max_tokens('quiz', bank_size)
+    assert AIService.max_tokens('quiz', bank_size) > AIService.max_tokens('quiz')
+
+
+def test_failed_consume_charges_nothing(user, monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'limits', dict(rate_limiter.limits, **{'global': (4400, 1 / 60.0)}))
+    rate_limiter.consume(None, 'roadmap', scopes=('global',))
+    
+    with pytest.raises(RateLimitExceeded) as error:
+        rate_limiter.consume(user.id, 'chat')
+    
+    assert error.value.scope == 'global'
+    assert remaining(user) == capacity()
@@ -0,0 +1,98 @@
+"""Tests for single-flight generation (services/single_flight.py)"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, GenerationLease
+from services.single_flight import SingleFlight, SingleFlightTimeout
+
+
+@pytest.fixture
+def flight(monkeypatch):
+    monkeypatch.setattr(SingleFlight, 'POLL_INTERVAL', 0.01)
+    return SingleFlight()
+
+
+def hold_lease(key, expires_in=60):
+    """A lease taken by a leader in another worker"""
+    now = datetime.utcnow()
+    db.session.add(GenerationLease(lease_key=key, owner='other-worker', expires_at=now + timedelta(seconds=expires_in), created_at=now))
+    db.session.commit()
+
+
+def test_followers_wait_for_the_leader(app, flight):
+    store = {}
+    calls = []
+    leading = threading.Event()
+    release = threading.Event()
+    
+    def generate():
+        calls.append(threading.current_thread())
+        leading.set()
+        release.wait(5)
+        store['lesson'] = 'generated'
+        return 'generated'
+    
+    results = []
+    
+    def request_lesson():
+        with app.app_context():
+            results.append(flight.do('lesson:1', generate, lambda: store.get('lesson')))
+    
+    leader = threading.Thread(target=request_lesson)
+    leader.start()
+    assert leading.wait(5)
+    followers = [threading.Thread(target=request_lesson) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    
+    assert results == ['generated'] * 4
+    assert calls == [leader]
+    assert GenerationLease.query.count() == 0
+
+
+def test_existing_result_skips_generation(flight):
+    assert flight.do('lesson:1', lambda: pytest.fail('generated again'), lambda: 'stored') == 'stored'
+
+
+def test_lease_of_another_worker_is_waited_for(flight):
+    hold_lease('lesson:1')
+    lookups = []
+    
+    def lookup():
+        lookups.append(1)
+        return 'from other worker' if len(lookups) > 3 else None
+    
+    assert flight.do('lesson:1', lambda: pytest.fail('generated twice'), lookup) == 'from other worker'
+
+
+def test_expired_lease_is_taken_over(flight):
+    hold_lease('lesson:1', expires_in=-1)
+    
+    assert flight.do('lesson:1', lambda: 'generated', lambda: None) == 'generated'
+    assert GenerationLease.query.count() == 0
+
+
+def test_follower_gives_up_after_the_wait_timeout(app, flight, monkeypatch):
+    monkeypatch.setitem(app.config, 'GENERATION_WAIT_TIMEOUT', 0.05)
+    hold_lease('lesson:1')
+    
+    with pytest.raises(SingleFlightTimeout):
+        flight.do('lesson:1', lambda: 'generated', lambda: None)
+    assert flight._calls == {}
+
+
+def test_failed_leader_releases_the_lease(flight):
+    def broken():
+        raise RuntimeError('upstream down')
+    
+    with pytest.raises(RuntimeError):
+        flight.do('lesson:1', broken, lambda: None)
+    
+    db.session.expire_all()
+    assert GenerationLease.query.count() == 0
+    assert flight.do('lesson:1', lambda: 'generated', lambda: None) == 'generated'
@@ -0,0 +1,88 @@
+"""Tests for matching rephrased topics (services/topic_cache.py)"""
+import threading
+
+import pytest
+
+from services.ai_service import AIService
+from services.topic_cache import TopicCache, topic_cache
+
+
+def shares_key(first, second):
+    return bool(set(TopicCache.make_keys('ns', first)) & set(TopicCache.make_keys('ns', second)))
+
+
+@pytest.mark.parametrize('first, second', [
+    ('What are closures?', 'closures'),
+    ('closures in javascript', 'JavaScript closures'),
+    ('closures in js', 'javascript closures'),
+    ('flexbox', 'Flexbox layout'),
+    ('flex box', 'flexbox'),
+    ('css flex box', 'CSS Flexbox'),
+    ('Linked Lists!', 'linked list'),
+])
+def test_rephrasings_share_a_key(first, second):
+    assert shares_key(first, second)
+
+
+@pytest.mark.parametrize('first, second', [
+    ('binary search', 'binary search tree'),
+    ('arrays in c', 'arrays in c#'),
+    ('c++ pointers', 'c pointers'),
+    ('css flex box', 'flexbox'),  # only through the language-free slot, see below
+])
+def test_different_topics_do_not_share_a_key(first, second):
+    assert not shares_key(first, second)
+
+
+def test_normalize_is_order_free():
+    assert TopicCache.normalize('Closures in JavaScript') == TopicCache.normalize('javascript closure') == 'javascript: closure'
+
+
+def test_rephrased_concept_is_served_from_the_topic_cache(fake_groq):
+    first = AIService.simplify_concept('What are closures in JavaScript?')
+    
+    assert AIService.simplify_concept('JavaScript closures') == first
+    assert len(fake_groq.requests) == 1
+
+
+def test_language_answer_fills_the_language_free_slot_only(fake_groq):
+    AIService.simplify_concept('css flex box')
+    AIService.simplify_concept('Flexbox layout')
+    assert len(fake_groq.requests) == 1
+    
+    AIService.simplify_concept('arrays in c')
+    AIService.simplify_concept('arrays in c#')
+    assert len(fake_groq.requests) == 3
+
+
+def test_language_free_slot_is_not_overwritten(fake_groq):
+    fake_groq.responder = lambda messages, max_tokens: f'Answer {len(fake_groq.requests)}'
+    AIService.simplify_concept('arrays')
+    AIService.simplify_concept('arrays in python')
+    
+    assert AIService.simplify_concept('arrays') == 'Answer 1'
+    assert AIService.simplify_concept('python arrays') == 'Answer 2'
+
+
+def test_async_variant_keeps_cache_calls_off_the_event_loop(fake_groq, monkeypatch):
+    threads = []
+    for name in ('lookup', 'add'):
+        original = getattr(topic_cache, name)
+        monkeypatch.setattr(topic_cache, name, lambda *args, original=original: threads.append(threading.current_thread()) or original(*args))
+    
+    upstream = []
+    
+    async def acomplete(**request):
+        upstream.append(request)
+        return 'Async answer'
+    
+    monkeypatch.setattr(AIService, '_acomplete', staticmethod(acomplete))
+    
+    async def simplify_twice():
+        return threading.current_thread(), [await AIService.asimplify_concept('closures') for _ in range(2)]
+    
+    loop_thread, answers = AIService.run_sync(simplify_twice())
+    
+    assert answers == ['Async answer', 'Async answer']
+    assert len(upstream) == 1
+    assert len(threads) == 3 and loop_thread not in threads
@@ -4,6 +4,21 @@ import GoalForm from '../components/GoalForm';
 import { generateRoadmap } from '../utils/aiGenerator';
 import { goalsAPI } from '../services/api';
 
+// Roadmaps generated by a background worker (202 response) are polled until ready
+const GENERATION_POLL_INTERVAL_MS = 2000;
+const GENERATION_POLL_MAX_ATTEMPTS = 90;
+
+const waitForRoadmap = async (goalId) => {
+  for (let attempt = 0; attempt < GENERATION_POLL_MAX_ATTEMPTS; attempt++) {
+    await new Promise((resolve) => setTimeout(resolve, GENERATION_POLL_INTERVAL_MS));
+    const { data } = await goalsAPI.getGeneration(goalId);
+    if (data.generation_status !== 'generating') {
+      return data.goal;
+    }
+  }
+  throw new Error('Your roadmap is taking longer than expected. It will appear on your dashboard once it is ready.');
+};
+
 const CreatePlan = () => {
   const navigate = useNavigate();
   const [isGenerating, setIsGenerating] = useState(false);
@@ -48,7 +63,10 @@ const CreatePlan = () => {
         generate_ai: true
       });
       
-      const goalData = response.data.goal;
+      let goalData = response.data.goal;
+      if (goalData.generation_status === 'generating') {
+        goalData = await waitForRoadmap(goalData.id);
+      }
       
       // Store goal ID and data locally for quick access
       localStorage.setItem('currentGoalId', goalData.id);
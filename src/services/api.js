@@ -149,7 +149,10 @@ export const goalsAPI = {
     apiClient.patch(`/tasks/${taskId}/update-status`, { status }),
 
   getProgress: (goalId) =>
-    apiClient.get(`/goals/${goalId}/progress`)
+    apiClient.get(`/goals/${goalId}/progress`),
+
+  getGeneration: (goalId) =>
+    apiClient.get(`/goals/${goalId}/generation`)
 };
 
 /**